@@ -1,24 +1,34 @@
+import asyncio
+import hashlib
 import json
 import os
-
-from langfuse import get_client, observe, propagate_attributes
-from langfuse.openai import openai
-
+import re
+from collections.abc import Awaitable, Callable
+
+from app import cassette
+from app.cache import TTLCache
+from app.clients import get_async_openai_client, get_openai_client
+from app.context import cache_bypassed
+from app.context_budget import (
+    REFINE_CONTEXT_TOKENS,
+    REPORT_CONTEXT_TOKENS,
+    apply_summary,
+    context_blob,
+    notes_to_fold,
+)
+from app.metrics import record_usage, track_stage
 from app.models import AgentState, Task
+from app.prompts import PromptRegistry
+from app.resilience import openai_upstream
 from app.security import (
     validate_search_results,
 )
-from app.tools import save_report, search_web
-
-# Initialize Langfuse with graceful fallback if credentials are missing
-try:
-    langfuse = get_client()
-except Exception:
-    # Langfuse is optional; falls back to inline prompts
-    langfuse = None
+from app.storage import DATA_DIR
+from app.tools import save_report, search_web, search_web_async
+from app.tracing import get_langfuse, observe, propagate_attributes
 
 # ---------------------------------------------------------------------------
-# Inline fallback prompts (used only if Langfuse is unreachable on cold start)
+# Inline fallback prompts (used until Langfuse or the prompt snapshot provides a version)
 # Keep in sync with Langfuse prompts (production label).
 # Author: niranjanxprt
 # ---------------------------------------------------------------------------
@@ -73,6 +83,38 @@ PROMPT_FALLBACKS: dict[str, list[dict]] = {
         },
         {"role": "user", "content": "Task: {{task_description}}\n\nFindings: {{findings}}"},
     ],
+    "legal-research/compress-and-reflect": [
+        {
+            "role": "system",
+            "content": (
+                "Summarize the search results in 2–3 sentences. Keep article/section refs exact (e.g. GDPR Article 5, BDSG §26); do not paraphrase. "
+                "Cite source in parentheses. Do not add content that wasn't in the results. "
+                "Then, in one sentence, judge whether the summary fully addresses the task or name what's missing; do not repeat the findings. "
+                'Return ONLY valid JSON: {"summary": "...", "reflection": "..."}'
+            ),
+        },
+        {
+            "role": "user",
+            "content": (
+                "Task: {{task_title}}\nDescription: {{task_description}}\n\n"
+                "Search results:\n{{search_results}}"
+            ),
+        },
+    ],
+    "legal-research/summarize-context": [
+        {
+            "role": "system",
+            "content": (
+                "Merge the earlier summary and the new research notes into one summary of at most 200 words. "
+                "Keep every article/section ref and source exactly as written; drop repetition, not findings. "
+                "Reply with only the summary."
+            ),
+        },
+        {
+            "role": "user",
+            "content": "Earlier summary:\n{{previous_summary}}\n\nNew notes:\n{{notes}}",
+        },
+    ],
     "legal-research/generate-report": [
         {
             "role": "system",
@@ -92,40 +134,92 @@ PROMPT_FALLBACKS: dict[str, list[dict]] = {
 }
 
 
-class FallbackPrompt:
-    """Mimics the Langfuse prompt interface when Langfuse is unreachable."""
-
-    is_fallback = True  # Langfuse OpenAI wrapper checks this to skip prompt linking
-
-    def __init__(self, messages: list[dict]) -> None:
-        self._messages = messages
-
-    def compile(self, **kwargs: str) -> list[dict]:
-        result = []
-        for msg in self._messages:
-            content = msg["content"]
-            for key, value in kwargs.items():
-                content = content.replace(f"{{{{{key}}}}}", str(value or ""))
-            result.append({"role": msg["role"], "content": content})
-        return result
+# In-memory prompts: fallbacks, then the disk snapshot, then Langfuse in the background
+PROMPT_REFRESH_INTERVAL = float(os.environ.get("LEXAGENT_PROMPT_REFRESH_INTERVAL", "60"))
+prompt_registry = PromptRegistry(
+    PROMPT_FALLBACKS,
+    get_langfuse,
+    snapshot_path=DATA_DIR / "cache" / "prompts.json",
+    refresh_interval=PROMPT_REFRESH_INTERVAL,
+)
 
 
 def get_prompt_safe(name: str, prompt_type: str = "chat"):
     """
-    Fetch prompt from Langfuse, fall back to inline copy on connectivity failure.
-    Normal operation: Langfuse SDK cache means zero extra latency.
-    Fallback fires only on cold-start connectivity failure — not on cache misses.
+    Return a prompt from the local registry (app/prompts.py) without waiting on
+    Langfuse: the latest version fetched in the background, else the last
+    snapshot on disk, else the inline fallback. All LexAgent prompts are chat
+    prompts; prompt_type is kept for the Langfuse-style call sites.
     """
-    try:
-        return langfuse.get_prompt(name, type=prompt_type)
-    except Exception:
-        return FallbackPrompt(PROMPT_FALLBACKS[name])
+    prompt_registry.start()
+    return prompt_registry.get(name)
 
 # ---------------------------------------------------------------------------
 # LLM wrapper
 # ---------------------------------------------------------------------------
 
 
+# Content-addressed response cache. Only stages listed in LEXAGENT_LLM_CACHE_STAGES
+# (trace_name values) are cached; an empty list disables it.
+llm_cache = TTLCache(
+    "llm",
+    max_entries=int(os.environ.get("LEXAGENT_LLM_CACHE_SIZE", "1024")),
+    ttl_seconds=float(os.environ.get("LEXAGENT_LLM_CACHE_TTL", "86400")),
+)
+LLM_CACHE_STAGES = frozenset(
+    stage.strip()
+    for stage in os.environ.get(
+        "LEXAGENT_LLM_CACHE_STAGES",
+        "refine-query,compress-results,reflect,compress-and-reflect,summarize-context",
+    ).split(",")
+    if stage.strip()
+)
+
+
+def _llm_cache_key(kwargs: dict, trace_name: str | None) -> str | None:
+    """Hash of (model, messages, response_format, prompt version), or None if the stage is not cached."""
+    if trace_name not in LLM_CACHE_STAGES:
+        return None
+    payload = {
+        "model": kwargs["model"],
+        "messages": kwargs["messages"],
+        "response_format": kwargs.get("response_format"),
+        "prompt_version": getattr(kwargs.get("langfuse_prompt"), "version", None),
+    }
+    encoded = json.dumps(payload, sort_keys=True, ensure_ascii=False).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
+
+
+def _llm_cache_get(key: str | None) -> str | None:
+    if key is None or cache_bypassed():
+        return None
+    return llm_cache.get(key)
+
+
+def _llm_cache_set(key: str | None, content: str | None) -> None:
+    if key is not None and content:
+        llm_cache.set(key, content)
+
+
+def _chat_kwargs(messages: list, use_json: bool, langfuse_prompt) -> dict:
+    """Build the chat.completions.create kwargs shared by the sync and async wrappers."""
+    kwargs = {
+        "model": os.environ.get("OPENAI_MODEL", "gpt-4o-mini"),
+        "messages": messages,
+    }
+    if use_json:
+        kwargs["response_format"] = {"type": "json_object"}
+
+    if langfuse_prompt:
+        kwargs["langfuse_prompt"] = langfuse_prompt
+    return kwargs
+
+
+def _cassette_request(kwargs: dict) -> dict:
+    """The part of a completion request that is recorded (and matched on replay)."""
+    return {key: kwargs.get(key) for key in ("model", "messages", "response_format")}
+
+
 @observe(name="call-llm", as_type="generation")
 def call_llm(
     messages: list,
@@ -144,23 +238,145 @@ def call_llm(
     Args:
         messages: List of message dicts for the LLM
         use_json: Whether to request JSON output format
-        trace_name: Optional name for tracing
+        trace_name: Optional name for tracing; also the stage name checked
+            against LEXAGENT_LLM_CACHE_STAGES for the response cache
         langfuse_prompt: Optional Langfuse prompt object for linking to traces
     """
-    # OpenAI client (including Langfuse wrapper) reads OPENAI_API_KEY from env.
-    # Per-request key from X-OpenAI-API-Key is applied in main._apply_api_key_headers.
-    kwargs = {
-        "model": os.environ.get("OPENAI_MODEL", "gpt-4o-mini"),
-        "messages": messages,
-    }
-    if use_json:
-        kwargs["response_format"] = {"type": "json_object"}
+    # Pooled, Langfuse-wrapped client for the request's key (X-OpenAI-API-Key or
+    # OPENAI_API_KEY); see app.clients.
+    stage = trace_name or "llm"
+    with track_stage(stage):
+        kwargs = _chat_kwargs(messages, use_json, langfuse_prompt)
+        cache_key = _llm_cache_key(kwargs, trace_name)
+        cached = _llm_cache_get(cache_key)
+        if cached is not None:
+            return cached
+
+        def complete() -> str:
+            response = openai_upstream.call(
+                stage,
+                lambda timeout: get_openai_client().chat.completions.create(
+                    **kwargs, timeout=timeout,
+                ),
+            )
+            record_usage(stage, response.usage)
+            return response.choices[0].message.content
+
+        content = cassette.call("llm", stage, _cassette_request(kwargs), complete)
+        _llm_cache_set(cache_key, content)
+        return content
 
-    if langfuse_prompt:
-        kwargs["langfuse_prompt"] = langfuse_prompt
 
-    response = openai.chat.completions.create(**kwargs)
-    return response.choices[0].message.content
+@observe(name="call-llm", as_type="generation")
+async def call_llm_async(
+    messages: list,
+    use_json: bool = False,
+    trace_name: str | None = None,
+    langfuse_prompt=None,
+) -> str:
+    """
+    Async variant of call_llm(), used by the FastAPI handlers.
+    Awaits the completion instead of blocking a threadpool worker.
+    """
+    stage = trace_name or "llm"
+    with track_stage(stage):
+        kwargs = _chat_kwargs(messages, use_json, langfuse_prompt)
+        cache_key = _llm_cache_key(kwargs, trace_name)
+        cached = _llm_cache_get(cache_key)
+        if cached is not None:
+            return cached
+
+        async def complete() -> str:
+            client = get_async_openai_client()
+            response = await openai_upstream.call_async(
+                stage,
+                lambda timeout: client.chat.completions.create(**kwargs, timeout=timeout),
+            )
+            record_usage(stage, response.usage)
+            return response.choices[0].message.content
+
+        content = await cassette.call_async("llm", stage, _cassette_request(kwargs), complete)
+        _llm_cache_set(cache_key, content)
+        return content
+
+
+# Progress callback used by the streaming endpoint: await on_event(event, data)
+EventCallback = Callable[[str, dict], Awaitable[None]]
+
+
+async def _emit(on_event: EventCallback | None, event: str, **data) -> None:
+    if on_event is not None:
+        await on_event(event, data)
+
+
+@observe(name="call-llm", as_type="generation")
+async def stream_llm_async(
+    messages: list,
+    on_token: Callable[[str], Awaitable[None]],
+    use_json: bool = False,
+    trace_name: str | None = None,
+    langfuse_prompt=None,
+) -> str:
+    """
+    Streaming variant of call_llm_async(): awaits on_token(text) for every
+    content delta as it arrives and returns the full completion at the end.
+    """
+    stage = trace_name or "llm"
+    with track_stage(stage):
+        kwargs = _chat_kwargs(messages, use_json, langfuse_prompt)
+        cache_key = _llm_cache_key(kwargs, trace_name)
+        cached = _llm_cache_get(cache_key)
+        if cached is not None:
+            await on_token(cached)
+            return cached
+
+        async def complete() -> str:
+            # Usage arrives in a final chunk without choices
+            stream_kwargs = {**kwargs, "stream": True, "stream_options": {"include_usage": True}}
+            client = get_async_openai_client()
+            # Deadline and retries cover opening the stream; once tokens have been
+            # forwarded a failure is not retried (the client timeout still bounds stalls).
+            stream = await openai_upstream.call_async(
+                stage,
+                lambda timeout: client.chat.completions.create(**stream_kwargs, timeout=timeout),
+            )
+            parts = []
+            async for chunk in stream:
+                if not chunk.choices:
+                    record_usage(stage, getattr(chunk, "usage", None))
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    parts.append(delta)
+                    await on_token(delta)
+            return "".join(parts)
+
+        content = await cassette.call_async("llm", stage, _cassette_request(kwargs), complete)
+        if cassette.replaying():
+            await on_token(content)
+        _llm_cache_set(cache_key, content)
+        return content
+
+
+async def _call_llm_maybe_streaming(
+    messages: list,
+    trace_name: str,
+    langfuse_prompt,
+    on_event: EventCallback | None,
+    **event_data,
+) -> str:
+    """Stream tokens as "token" events when someone is listening, else a plain call."""
+    if on_event is None:
+        return await call_llm_async(
+            messages, trace_name=trace_name, langfuse_prompt=langfuse_prompt,
+        )
+
+    async def _on_token(text: str) -> None:
+        await on_event("token", {"stage": trace_name, "text": text, **event_data})
+
+    return await stream_llm_async(
+        messages, _on_token, trace_name=trace_name, langfuse_prompt=langfuse_prompt,
+    )
 
 
 # ---------------------------------------------------------------------------
@@ -168,24 +384,204 @@ def call_llm(
 # ---------------------------------------------------------------------------
 
 
+# Plans keyed on the normalized goal, shared across sessions and persisted under
+# DATA_DIR/cache/plans so seeded plans survive restarts. TTL 0 disables it.
+plan_cache = TTLCache(
+    "plan",
+    max_entries=int(os.environ.get("LEXAGENT_PLAN_CACHE_SIZE", "256")),
+    ttl_seconds=float(os.environ.get("LEXAGENT_PLAN_CACHE_TTL", "604800")),
+    disk_dir=DATA_DIR / "cache" / "plans",
+)
+
+
+def normalize_goal(goal: str) -> str:
+    """Case-fold, drop punctuation and collapse whitespace so near-verbatim goals share a plan."""
+    return " ".join(re.findall(r"[\w§]+", goal.casefold()))
+
+
+def cache_plan(goal: str, tasks: list, ttl_seconds: float | None = None) -> str:
+    """
+    Store a plan (anything with title/description) for a goal and return its cache key.
+    Used after every generated plan and by POST /plans to pre-seed common goals.
+    """
+    key = normalize_goal(goal)
+    plan = [{"title": t.title, "description": t.description} for t in tasks]
+    plan_cache.set(key, plan, ttl_seconds)
+    return key
+
+
+def _cached_plan(goal: str) -> list[Task] | None:
+    """Fresh Task objects (new ids, status pending) from a cached plan, if any."""
+    if cache_bypassed():
+        return None
+    plan = plan_cache.get(normalize_goal(goal))
+    if plan is None:
+        return None
+    return [Task(title=t["title"], description=t["description"]) for t in plan]
+
+
+def _parse_plan(goal: str, raw: str) -> list[Task]:
+    data = json.loads(raw)
+    tasks = [Task(**t) for t in data["tasks"]]
+    cache_plan(goal, tasks)
+    return tasks
+
+
 @observe(name="generate-plan")
 def generate_plan(goal: str, session_id: str) -> list[Task]:
     """
     Decompose the legal research goal into 3–6 research tasks.
     Fetches prompt from Langfuse, falls back to inline copy if unavailable.
     session_id is used for Langfuse trace correlation (via propagate_attributes).
+    A cached plan for the same normalized goal is reused without an LLM call.
     """
+    cached = _cached_plan(goal)
+    if cached is not None:
+        return cached
     with propagate_attributes(session_id=session_id):
         prompt = get_prompt_safe("legal-research/generate-plan", prompt_type="chat")
         messages = prompt.compile(goal=goal)
         raw = call_llm(messages, use_json=True, trace_name="generate-plan", langfuse_prompt=prompt)
-        data = json.loads(raw)
-        return [Task(**t) for t in data["tasks"]]
+        return _parse_plan(goal, raw)
+
+
+@observe(name="generate-plan")
+async def generate_plan_async(goal: str, session_id: str) -> list[Task]:
+    """Async variant of generate_plan()."""
+    cached = _cached_plan(goal)
+    if cached is not None:
+        return cached
+    with propagate_attributes(session_id=session_id):
+        prompt = get_prompt_safe("legal-research/generate-plan", prompt_type="chat")
+        messages = prompt.compile(goal=goal)
+        raw = await call_llm_async(
+            messages, use_json=True, trace_name="generate-plan", langfuse_prompt=prompt,
+        )
+        return _parse_plan(goal, raw)
 
 
 # ---------------------------------------------------------------------------
 # Task executor
 # ---------------------------------------------------------------------------
+# execute_task() and execute_task_async() run the same five steps; the prompt
+# building and state updates live in the helpers below so the two stay in sync.
+
+
+def _summarize_context_prompt(state: AgentState, notes: list[str]):
+    """Inputs for folding `notes` into the rolling context summary."""
+    prompt = get_prompt_safe("legal-research/summarize-context", prompt_type="chat")
+    messages = prompt.compile(
+        previous_summary=state.context_summary or "None yet.",
+        notes="\n".join(notes),
+    )
+    return prompt, messages
+
+
+def fit_context(state: AgentState, budget: int) -> None:
+    """Fold older context_notes into state.context_summary until they fit `budget` tokens."""
+    notes = notes_to_fold(state, budget)
+    if not notes:
+        return
+    prompt, messages = _summarize_context_prompt(state, notes)
+    summary = call_llm(messages, trace_name="summarize-context", langfuse_prompt=prompt)
+    apply_summary(state, summary, len(notes))
+
+
+async def fit_context_async(state: AgentState, budget: int) -> None:
+    """Async variant of fit_context()."""
+    notes = notes_to_fold(state, budget)
+    if not notes:
+        return
+    prompt, messages = _summarize_context_prompt(state, notes)
+    summary = await call_llm_async(messages, trace_name="summarize-context", langfuse_prompt=prompt)
+    apply_summary(state, summary, len(notes))
+
+
+def _refine_query_prompt(task: Task, state: AgentState):
+    """Step 1 inputs: refine-query prompt and its compiled messages (call fit_context first)."""
+    # Note: task.title, task.description, and context_notes are LLM-generated,
+    # so they are not validated against injection patterns (only user input at API boundary is validated).
+    refine_prompt = get_prompt_safe("legal-research/refine-query", prompt_type="chat")
+    messages = refine_prompt.compile(
+        task_title=task.title,
+        task_description=task.description,
+        context_notes=context_blob(state, "\n") or "No prior context.",
+    )
+    return refine_prompt, messages
+
+
+def _result_snippets(raw_results: dict) -> tuple[str, list[str]]:
+    """Compact representation of raw content for the compression step, plus the source URLs."""
+    snippets = []
+    sources = []
+    for r in raw_results["results"]:
+        snippets.append(f"[{r['title']}]: {r['content'][:500]}")
+        sources.append(r["url"])
+    return "\n\n".join(snippets), sources
+
+
+def _compress_prompt(task: Task, raw_results: dict):
+    """Step 3 inputs: compress prompt, compiled messages and the result source URLs."""
+    search_results, sources = _result_snippets(raw_results)
+
+    # Isolation: compress sees ONLY raw Tavily output, not task goal or prior context,
+    # to avoid the model "confirming" findings not present in search results.
+    compress_prompt = get_prompt_safe("legal-research/compress-results", prompt_type="chat")
+    messages = compress_prompt.compile(
+        task_title=task.title,
+        search_results=search_results,
+    )
+    return compress_prompt, messages, sources
+
+
+def _reflect_prompt(task: Task, compressed_summary: str):
+    """Step 4 inputs: reflect prompt and its compiled messages."""
+    reflect_prompt = get_prompt_safe("legal-research/reflect", prompt_type="chat")
+    messages = reflect_prompt.compile(
+        task_description=task.description,
+        findings=compressed_summary,
+    )
+    return reflect_prompt, messages
+
+
+# Steps 3–4 as one JSON-mode call ({"summary", "reflection"}) instead of two round trips.
+# Off by default; the two-call path keeps compress isolated from the task description.
+COMBINE_COMPRESS_REFLECT = os.environ.get(
+    "LEXAGENT_COMBINE_COMPRESS_REFLECT", "0",
+).strip().lower() in ("1", "true", "yes")
+
+
+def _compress_and_reflect_prompt(task: Task, raw_results: dict):
+    """Combined steps 3–4 inputs: prompt, compiled messages and the result source URLs."""
+    search_results, sources = _result_snippets(raw_results)
+    prompt = get_prompt_safe("legal-research/compress-and-reflect", prompt_type="chat")
+    messages = prompt.compile(
+        task_title=task.title,
+        task_description=task.description,
+        search_results=search_results,
+    )
+    return prompt, messages, sources
+
+
+def _parse_compress_and_reflect(raw: str) -> tuple[str, str]:
+    data = json.loads(raw)
+    return data["summary"].strip(), data.get("reflection", "").strip()
+
+
+def _complete_task(
+    task: Task,
+    state: AgentState,
+    compressed_summary: str,
+    sources: list[str],
+    reflection: str,
+) -> Task:
+    """Steps 5–6: update the task object and append ONLY the compressed summary to context."""
+    task.result = compressed_summary
+    task.sources = sources
+    task.reflection = reflection
+    task.status = "done"
+    state.context_notes.append(f"[{task.title}]: {compressed_summary}")
+    return task
 
 
 @observe(name="execute-task")
@@ -199,22 +595,9 @@ def execute_task(task: Task, state: AgentState) -> Task:
     Raw search results are NEVER stored — only the compressed summary is kept.
     """
 
-    # Step 1 — Build search query from task context + prior notes
-    # Note: task.title, task.description, and context_notes are LLM-generated,
-    # so they are not validated against injection patterns (only user input at API boundary is validated).
-    task_title_safe = task.title
-    task_description_safe = task.description
-    context_notes_list = state.context_notes or []
-
-    context_blob = "\n".join(context_notes_list) if context_notes_list else "No prior context."
-    if len(context_blob) > 8000:
-        context_blob = "...[earlier context truncated]\n" + context_blob[-7500:]
-    refine_prompt = get_prompt_safe("legal-research/refine-query", prompt_type="chat")
-    query_prompt_messages = refine_prompt.compile(
-        task_title=task_title_safe,
-        task_description=task_description_safe,
-        context_notes=context_blob,
-    )
+    # Step 1 — Build search query from task context + prior notes (within the token budget)
+    fit_context(state, REFINE_CONTEXT_TOKENS)
+    refine_prompt, query_prompt_messages = _refine_query_prompt(task, state)
     search_query = call_llm(
         query_prompt_messages,
         trace_name="refine-query",
@@ -223,26 +606,22 @@ def execute_task(task: Task, state: AgentState) -> Task:
 
     # Step 2 — Execute web search
     task.tool_used = "search_web"
-    # TODO: Add exponential backoff retry. Tavily occasionally times out on
-    # multi-word legal queries. Documented in Known Limitations.
+    # Deadline, retries with backoff and the Tavily circuit breaker: see app.resilience
     raw_results = search_web(search_query)
-    raw_results = validate_search_results(raw_results)
-
-    # Build a compact representation of raw content for the compression step
-    snippets = []
-    sources = []
-    for r in raw_results["results"]:
-        snippets.append(f"[{r['title']}]: {r['content'][:500]}")
-        sources.append(r["url"])
+    with track_stage("validate-results"):
+        raw_results = validate_search_results(raw_results)
+
+    if COMBINE_COMPRESS_REFLECT:
+        # Steps 3–4 in one structured call
+        prompt, messages, sources = _compress_and_reflect_prompt(task, raw_results)
+        raw = call_llm(
+            messages, use_json=True, trace_name="compress-and-reflect", langfuse_prompt=prompt,
+        )
+        compressed_summary, reflection = _parse_compress_and_reflect(raw)
+        return _complete_task(task, state, compressed_summary, sources, reflection)
 
     # Step 3 — Compress raw results (NEVER stored in state).
-    # Isolation: compress sees ONLY raw Tavily output, not task goal or prior context,
-    # to avoid the model "confirming" findings not present in search results.
-    compress_prompt = get_prompt_safe("legal-research/compress-results", prompt_type="chat")
-    compression_messages = compress_prompt.compile(
-        task_title=task_title_safe,
-        search_results="\n\n".join(snippets),
-    )
+    compress_prompt, compression_messages, sources = _compress_prompt(task, raw_results)
     compressed_summary = call_llm(
         compression_messages,
         trace_name="compress-results",
@@ -250,27 +629,118 @@ def execute_task(task: Task, state: AgentState) -> Task:
     )
 
     # Step 4 — Reflect: did this task answer its goal?
-    reflect_prompt = get_prompt_safe("legal-research/reflect", prompt_type="chat")
-    reflection_messages = reflect_prompt.compile(
-        task_description=task_description_safe,
-        findings=compressed_summary,
-    )
+    reflect_prompt, reflection_messages = _reflect_prompt(task, compressed_summary)
     reflection = call_llm(
         reflection_messages,
         trace_name="reflect",
         langfuse_prompt=reflect_prompt,
     )
 
-    # Step 5 — Update task object
-    task.result = compressed_summary
-    task.sources = sources
-    task.reflection = reflection
-    task.status = "done"
+    # Steps 5–6 — Update task object and state context
+    return _complete_task(task, state, compressed_summary, sources, reflection)
 
-    # Step 6 — Append ONLY compressed summary to state context (not raw results)
-    state.context_notes.append(f"[{task.title}]: {compressed_summary}")
 
-    return task
+@observe(name="execute-task")
+async def execute_task_async(
+    task: Task,
+    state: AgentState,
+    on_event: EventCallback | None = None,
+) -> Task:
+    """
+    Async variant of execute_task(): same steps, but every LLM and search
+    round trip is awaited so the event loop can serve other sessions meanwhile.
+    If on_event is given, a stage event is emitted after each step and the
+    compress tokens are streamed as "token" events (not in combined
+    compress-and-reflect mode, whose output is JSON).
+    """
+    await fit_context_async(state, REFINE_CONTEXT_TOKENS)
+    refine_prompt, query_prompt_messages = _refine_query_prompt(task, state)
+    search_query = (
+        await call_llm_async(
+            query_prompt_messages,
+            trace_name="refine-query",
+            langfuse_prompt=refine_prompt,
+        )
+    ).strip()
+    await _emit(on_event, "query_refined", task_id=task.id, query=search_query)
+
+    task.tool_used = "search_web"
+    raw_results = await search_web_async(search_query)
+    with track_stage("validate-results"):
+        raw_results = validate_search_results(raw_results)
+    await _emit(on_event, "search_completed", task_id=task.id, results=len(raw_results["results"]))
+
+    if COMBINE_COMPRESS_REFLECT:
+        prompt, messages, sources = _compress_and_reflect_prompt(task, raw_results)
+        raw = await call_llm_async(
+            messages, use_json=True, trace_name="compress-and-reflect", langfuse_prompt=prompt,
+        )
+        compressed_summary, reflection = _parse_compress_and_reflect(raw)
+        await _emit(on_event, "compressed", task_id=task.id, summary=compressed_summary)
+        await _emit(on_event, "reflected", task_id=task.id, reflection=reflection)
+        return _complete_task(task, state, compressed_summary, sources, reflection)
+
+    compress_prompt, compression_messages, sources = _compress_prompt(task, raw_results)
+    compressed_summary = await _call_llm_maybe_streaming(
+        compression_messages,
+        "compress-results",
+        compress_prompt,
+        on_event,
+        task_id=task.id,
+    )
+    await _emit(on_event, "compressed", task_id=task.id, summary=compressed_summary)
+
+    reflect_prompt, reflection_messages = _reflect_prompt(task, compressed_summary)
+    reflection = await call_llm_async(
+        reflection_messages,
+        trace_name="reflect",
+        langfuse_prompt=reflect_prompt,
+    )
+    await _emit(on_event, "reflected", task_id=task.id, reflection=reflection)
+
+    return _complete_task(task, state, compressed_summary, sources, reflection)
+
+
+# Upper bound on tasks run at once by execute_tasks_async() (POST /execute-all).
+MAX_PARALLEL_TASKS = int(os.environ.get("LEXAGENT_MAX_PARALLEL_TASKS", "4"))
+
+
+async def execute_tasks_async(
+    tasks: list[Task],
+    state: AgentState,
+    parallelism: int | None = None,
+) -> list[BaseException | None]:
+    """
+    Run several plan tasks concurrently, at most `parallelism` at a time.
+    Every task refines its query against the context_notes that existed before
+    the batch started; the new notes are appended to state.context_notes in plan
+    order afterwards, so the result does not depend on which task finished first.
+    Returns one entry per task: None on success, or the exception it raised
+    (the task itself is marked "failed").
+    """
+    semaphore = asyncio.Semaphore(max(1, parallelism or MAX_PARALLEL_TASKS))
+    # Summarize once up front; the scratch copies below inherit the summary
+    await fit_context_async(state, REFINE_CONTEXT_TOKENS)
+    base_notes = list(state.context_notes)
+
+    async def _run(task: Task) -> list[str]:
+        async with semaphore:
+            # Shallow copy: tasks are shared, only the notes list is private to this task
+            scratch = state.model_copy(update={"context_notes": list(base_notes)})
+            await execute_task_async(task, scratch)
+            return scratch.context_notes[len(base_notes):]
+
+    outcomes = await asyncio.gather(*(_run(t) for t in tasks), return_exceptions=True)
+
+    errors: list[BaseException | None] = []
+    for task, outcome in zip(tasks, outcomes, strict=True):
+        if isinstance(outcome, BaseException):
+            task.status = "failed"
+            errors.append(outcome)
+        else:
+            state.context_notes.extend(outcome)
+            errors.append(None)
+    return errors
 
 
 # ---------------------------------------------------------------------------
@@ -278,16 +748,8 @@ def execute_task(task: Task, state: AgentState) -> Task:
 # ---------------------------------------------------------------------------
 
 
-@observe(name="generate-report")
-def generate_final_report(state: AgentState) -> str:
-    """
-    After all tasks are done, synthesize a comprehensive legal research report.
-    Fetches prompt from Langfuse for centralized management.
-    Saves it as a markdown file and returns the file path.
-    """
-    context_blob = "\n\n".join(state.context_notes)
-    if len(context_blob) > 12000:
-        context_blob = "...[earlier context truncated]\n" + context_blob[-11000:]
+def _report_prompt(state: AgentState):
+    """Report prompt and its compiled messages, built from the accumulated notes (call fit_context first)."""
     task_summaries = "\n".join(
         f"- **{t.title}**: {t.result or 'N/A'}" for t in state.tasks
     )
@@ -295,8 +757,20 @@ def generate_final_report(state: AgentState) -> str:
     messages = report_prompt.compile(
         goal=state.goal,
         task_summaries=task_summaries,
-        context_notes=context_blob,
+        context_notes=context_blob(state, "\n\n"),
     )
+    return report_prompt, messages
+
+
+@observe(name="generate-report")
+def generate_final_report(state: AgentState) -> str:
+    """
+    After all tasks are done, synthesize a comprehensive legal research report.
+    Fetches prompt from Langfuse for centralized management.
+    Saves it as a markdown file and returns the file path.
+    """
+    fit_context(state, REPORT_CONTEXT_TOKENS)
+    report_prompt, messages = _report_prompt(state)
     report_content = call_llm(
         messages,
         trace_name="final-report",
@@ -304,3 +778,22 @@ def generate_final_report(state: AgentState) -> str:
     )
     path = save_report(state.session_id, state.goal, report_content)
     return path
+
+
+@observe(name="generate-report")
+async def generate_final_report_async(
+    state: AgentState,
+    on_event: EventCallback | None = None,
+) -> str:
+    """Async variant of generate_final_report(); streams report tokens to on_event if given."""
+    await fit_context_async(state, REPORT_CONTEXT_TOKENS)
+    report_prompt, messages = _report_prompt(state)
+    report_content = await _call_llm_maybe_streaming(
+        messages,
+        "final-report",
+        report_prompt,
+        on_event,
+    )
+    # Writes the markdown plus its compressed copies: keep the disk I/O off the event loop
+    path = await asyncio.to_thread(save_report, state.session_id, state.goal, report_content)
+    return path
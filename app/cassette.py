@@ -0,0 +1,198 @@
+"""
+Record/replay of upstream calls (OpenAI completions and Tavily searches) for
+offline performance regression runs.
+LEXAGENT_CASSETTE_MODE=record appends every call that reaches an upstream
+(cache hits are not recorded) with its request, response and duration to
+LEXAGENT_CASSETTE_DIR/{session_id}.jsonl.gz, one gzip member per call.
+LEXAGENT_CASSETTE_MODE=replay never touches the network: each call is
+answered from the cassettes after the recorded duration times
+LEXAGENT_CASSETTE_LATENCY_SCALE (0 = no delay).
+
+Replayed sessions get new ids, so calls are matched by request: an identical
+request (same model, messages, response format or search query) anywhere in
+the cassettes is used first and binds the session to that cassette; after
+that (or when prompts changed in the new build) calls are served from the
+bound cassette in recorded order per stage. `benchmarks.replay` drives the
+recorded goals through a server in replay mode.
+"""
+
+import asyncio
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from collections.abc import Awaitable, Callable
+from datetime import datetime
+from pathlib import Path
+from typing import TypeVar
+
+from app.context import current_session_id
+from app.storage import DATA_DIR
+
+T = TypeVar("T")
+
+CASSETTE_MODE = os.environ.get("LEXAGENT_CASSETTE_MODE", "off").strip().lower()
+CASSETTE_DIR = Path(os.environ.get("LEXAGENT_CASSETTE_DIR", str(DATA_DIR / "cassettes")))
+CASSETTE_LATENCY_SCALE = float(os.environ.get("LEXAGENT_CASSETTE_LATENCY_SCALE", "1"))
+if CASSETTE_MODE not in ("off", "record", "replay"):
+    raise ValueError(f"LEXAGENT_CASSETTE_MODE must be off, record or replay, not {CASSETTE_MODE!r}")
+
+# Calls made outside a session (e.g. POST /plans has none) go to this cassette
+UNSCOPED = "_unscoped"
+
+
+class CassetteMissError(LookupError):
+    """Replay mode got a call for a stage the cassettes never recorded."""
+
+
+def request_key(kind: str, request: dict) -> str:
+    encoded = json.dumps([kind, request], sort_keys=True, ensure_ascii=False).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()[:32]
+
+
+def read_cassette(path: Path) -> list[dict]:
+    """Entries of one cassette file, in recorded order."""
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+class Recorder:
+    """Appends entries to one cassette file per session."""
+
+    def __init__(self, directory: Path) -> None:
+        self.directory = directory
+        self._lock = threading.Lock()
+
+    def write(self, session_id: str | None, entry: dict) -> None:
+        path = self.directory / f"{session_id or UNSCOPED}.jsonl.gz"
+        line = json.dumps(entry, ensure_ascii=False, separators=(",", ":")) + "\n"
+        data = gzip.compress(line.encode("utf-8"), mtime=0)
+        with self._lock:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            with open(path, "ab") as f:
+                f.write(data)
+
+
+class Player:
+    """Serves recorded responses; see the module docstring for how calls are matched."""
+
+    def __init__(self, directory: Path) -> None:
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._by_key: dict[str, list[dict]] = {}
+        # cassette -> stage -> entries in recorded order; cassette -> stage -> next index
+        self._by_stage: dict[str, dict[str, list[dict]]] = {}
+        self._cursor: dict[str, dict[str, int]] = {}
+        self._bound: dict[str, str] = {}
+        self._free: list[str] = []
+
+    def _load(self) -> None:
+        for path in sorted(self.directory.glob("*.jsonl.gz")):
+            name = path.name.removesuffix(".jsonl.gz")
+            stages = self._by_stage[name] = {}
+            self._cursor[name] = {}
+            for entry in read_cassette(path):
+                if entry["kind"] == "session":
+                    continue
+                entry["cassette"] = name
+                self._by_key.setdefault(entry["key"], []).append(entry)
+                stages.setdefault(entry["stage"], []).append(entry)
+            if name != UNSCOPED:
+                self._free.append(name)
+        self._loaded = True
+
+    def take(self, session_id: str | None, kind: str, stage: str, key: str) -> dict:
+        with self._lock:
+            if not self._loaded:
+                self._load()
+            session = session_id or UNSCOPED
+            cassette = self._bound.get(session)
+            for entry in self._by_key.get(key, ()):
+                if cassette is None or entry["cassette"] == cassette:
+                    if cassette is None and session_id is not None:
+                        self._bind(session, entry["cassette"])
+                    return entry
+            if cassette is None:
+                cassette = self._bind(session, self._free[0] if self._free else UNSCOPED)
+            entries = self._by_stage.get(cassette, {}).get(stage)
+            if not entries:
+                raise CassetteMissError(f"No recorded {kind} call for stage {stage!r} in {cassette}")
+            cursor = self._cursor[cassette]
+            index = cursor.get(stage, 0)
+            cursor[stage] = index + 1
+            # Past the end (the new build makes more calls): repeat the stage's calls
+            return entries[index % len(entries)]
+
+    def _bind(self, session: str, cassette: str) -> str:
+        self._bound[session] = cassette
+        if cassette in self._free:
+            self._free.remove(cassette)
+        return cassette
+
+
+_recorder = Recorder(CASSETTE_DIR) if CASSETTE_MODE == "record" else None
+_player = Player(CASSETTE_DIR) if CASSETTE_MODE == "replay" else None
+
+
+def replaying() -> bool:
+    return _player is not None
+
+
+def note_session(session_id: str, goal: str) -> None:
+    """Start a session's cassette with its goal, so benchmarks.replay can re-run it."""
+    if _recorder is not None:
+        _recorder.write(session_id, {"kind": "session", "goal": goal, "at": _now()})
+
+
+def _now() -> str:
+    return datetime.utcnow().isoformat(timespec="milliseconds")
+
+
+def _record(kind: str, stage: str, request: dict, key: str, response, elapsed: float) -> None:
+    _recorder.write(current_session_id(), {
+        "kind": kind,
+        "stage": stage,
+        "key": key,
+        "at": _now(),
+        "elapsed": round(elapsed, 4),
+        "request": request,
+        "response": response,
+    })
+
+
+def _replay(kind: str, stage: str, key: str) -> tuple[object, float]:
+    entry = _player.take(current_session_id(), kind, stage, key)
+    return entry["response"], entry["elapsed"] * CASSETTE_LATENCY_SCALE
+
+
+def call(kind: str, stage: str, request: dict, fn: Callable[[], T]) -> T:
+    """fn() (the upstream call), recorded or answered from the cassettes per the mode."""
+    if _recorder is None and _player is None:
+        return fn()
+    key = request_key(kind, request)
+    if _player is not None:
+        response, delay = _replay(kind, stage, key)
+        time.sleep(delay)
+        return response
+    started = time.perf_counter()
+    response = fn()
+    _record(kind, stage, request, key, response, time.perf_counter() - started)
+    return response
+
+
+async def call_async(kind: str, stage: str, request: dict, fn: Callable[[], Awaitable[T]]) -> T:
+    """Async variant of call()."""
+    if _recorder is None and _player is None:
+        return await fn()
+    key = request_key(kind, request)
+    if _player is not None:
+        response, delay = _replay(kind, stage, key)
+        await asyncio.sleep(delay)
+        return response
+    started = time.perf_counter()
+    response = await fn()
+    _record(kind, stage, request, key, response, time.perf_counter() - started)
+    return response
@@ -0,0 +1,161 @@
+"""
+Pooled OpenAI and Tavily clients, one per API key.
+Each client owns a keep-alive HTTP connection pool, so reusing it skips the
+TCP/TLS setup a fresh client pays on every call. The key comes from the
+request-scoped override in app.context (falling back to the environment) and
+is passed to the client explicitly; nothing writes os.environ, so requests
+with different keys can run concurrently.
+Async clients are bound to the serving event loop.
+The SDKs are imported when the first client is created (or by the warm-up,
+see app.tracing), not when this module is imported.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from collections.abc import Callable
+from typing import TYPE_CHECKING
+
+from app.context import get_api_keys
+
+if TYPE_CHECKING:
+    from tavily import AsyncTavilyClient, TavilyClient
+
+# Distinct API keys (per client type) whose clients stay pooled
+CLIENT_POOL_SIZE = int(os.environ.get("LEXAGENT_CLIENT_POOL_SIZE", "32"))
+# Tavily endpoint override (e.g. the local stand-in used by benchmarks.load_test);
+# the OpenAI SDK reads OPENAI_BASE_URL itself
+TAVILY_BASE_URL = os.environ.get("TAVILY_BASE_URL") or None
+
+
+class ClientRegistry:
+    """Bounded LRU of clients keyed by API key, created on first use by factory(api_key)."""
+
+    def __init__(self, factory: Callable, max_entries: int) -> None:
+        self.factory = factory
+        self.max_entries = max_entries
+        self._clients: OrderedDict[str | None, object] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, api_key: str | None):
+        with self._lock:
+            client = self._clients.get(api_key)
+            if client is not None:
+                self._clients.move_to_end(api_key)
+                return client
+            # Construction failures (e.g. missing key) raise here and are not cached
+            client = self.factory(api_key)
+            self._clients[api_key] = client
+            while len(self._clients) > self.max_entries:
+                # Not closed: a request may still be using it. Its pool is released
+                # once the last reference goes away.
+                self._clients.popitem(last=False)
+            return client
+
+    def drain(self) -> list:
+        """Remove and return every pooled client (for shutdown)."""
+        with self._lock:
+            clients = list(self._clients.values())
+            self._clients.clear()
+        return clients
+
+
+_sdk_lock = threading.Lock()
+_sdks_imported = False
+
+
+def import_sdks() -> None:
+    """Import Langfuse, the (Langfuse-wrapped) OpenAI SDK and Tavily; about a second when cold.
+
+    Every lazy import of them goes through here first: the warm-up thread and a
+    request importing the same packages concurrently can otherwise see a
+    partially initialised module (import cycles inside langfuse).
+    """
+    global _sdks_imported
+    if _sdks_imported:
+        return
+    with _sdk_lock:
+        if not _sdks_imported:
+            import langfuse.openai  # noqa: F401
+            import tavily  # noqa: F401
+
+            _sdks_imported = True
+
+
+# Retries are done by app.resilience (with deadlines and the circuit breaker), not the SDK
+def _openai_client(key: str | None):
+    import_sdks()
+    from langfuse.openai import openai
+
+    return openai.OpenAI(api_key=key, max_retries=0)
+
+
+def _async_openai_client(key: str | None):
+    import_sdks()
+    from langfuse.openai import openai
+
+    return openai.AsyncOpenAI(api_key=key, max_retries=0)
+
+
+def _tavily_client(key: str) -> "TavilyClient":
+    import_sdks()
+    from tavily import TavilyClient
+
+    return TavilyClient(api_key=key, api_base_url=TAVILY_BASE_URL)
+
+
+def _async_tavily_client(key: str) -> "AsyncTavilyClient":
+    import_sdks()
+    from tavily import AsyncTavilyClient
+
+    return AsyncTavilyClient(api_key=key, api_base_url=TAVILY_BASE_URL)
+
+
+_openai_clients = ClientRegistry(_openai_client, CLIENT_POOL_SIZE)
+_async_openai_clients = ClientRegistry(_async_openai_client, CLIENT_POOL_SIZE)
+_tavily_clients = ClientRegistry(_tavily_client, CLIENT_POOL_SIZE)
+_async_tavily_clients = ClientRegistry(_async_tavily_client, CLIENT_POOL_SIZE)
+
+
+def openai_api_key() -> str | None:
+    """Request-scoped OpenAI key (X-OpenAI-API-Key), else OPENAI_API_KEY."""
+    return get_api_keys().get("openai") or os.environ.get("OPENAI_API_KEY")
+
+
+def tavily_api_key() -> str:
+    """Request-scoped Tavily key (X-Tavily-API-Key), else TAVILY_API_KEY."""
+    return get_api_keys().get("tavily") or os.environ.get("TAVILY_API_KEY", "")
+
+
+def get_openai_client():
+    """Langfuse-wrapped OpenAI client for the current request's key."""
+    return _openai_clients.get(openai_api_key())
+
+
+def get_async_openai_client():
+    """Langfuse-wrapped AsyncOpenAI client for the current request's key."""
+    return _async_openai_clients.get(openai_api_key())
+
+
+def get_tavily_client() -> "TavilyClient":
+    return _tavily_clients.get(tavily_api_key())
+
+
+def get_async_tavily_client() -> "AsyncTavilyClient":
+    return _async_tavily_clients.get(tavily_api_key())
+
+
+def warm_clients() -> None:
+    """Create the async clients for the environment's API keys (skipped where a key is unset)."""
+    if openai_api_key():
+        get_async_openai_client()
+    if tavily_api_key():
+        get_async_tavily_client()
+
+
+async def close_clients() -> None:
+    """Close every pooled client's connections (application shutdown)."""
+    for client in _openai_clients.drain() + _tavily_clients.drain():
+        client.close()
+    for client in _async_openai_clients.drain() + _async_tavily_clients.drain():
+        await client.close()
@@ -1,6 +1,7 @@
 """
 Request-scoped API key overrides from frontend.
 When set, these override env vars for the current request.
+Also carries the per-request cache bypass flag and the session being worked on.
 Author: niranjanxprt (https://github.com/niranjanxprt)
 """
 from contextvars import ContextVar
@@ -21,3 +22,28 @@ def set_api_keys(openai_key: str | None = None, tavily_key: str | None = None) -
     if tavily_key and tavily_key.strip():
         ctx["tavily"] = tavily_key.strip()
     api_keys_ctx.set(ctx)
+
+
+cache_bypass_ctx: ContextVar[bool] = ContextVar("cache_bypass", default=False)
+
+
+def cache_bypassed() -> bool:
+    """True if the current request asked to skip cached results (Cache-Control: no-cache)."""
+    return cache_bypass_ctx.get()
+
+
+def set_cache_bypass(bypass: bool = True) -> None:
+    """Skip cache reads for the current request; fresh results are still written back."""
+    cache_bypass_ctx.set(bypass)
+
+
+session_id_ctx: ContextVar[str | None] = ContextVar("session_id", default=None)
+
+
+def current_session_id() -> str | None:
+    """Session the current request works on, if any (used to file recorded upstream calls)."""
+    return session_id_ctx.get()
+
+
+def set_session_id(session_id: str) -> None:
+    session_id_ctx.set(session_id)
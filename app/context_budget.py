@@ -0,0 +1,89 @@
+"""
+Token budgets for the context notes fed into prompts.
+Instead of cutting the notes at a character offset (which silently drops the
+earliest findings), older notes are folded into a rolling summary once a
+stage's notes exceed its token budget. The summary and the number of leading
+notes it covers live on AgentState (context_summary / summarized_notes), so a
+fold only ever summarizes notes added since the previous one.
+The LLM call itself is made by app.agent (fit_context / fit_context_async).
+"""
+
+import logging
+import os
+from functools import cache, lru_cache
+
+from app.models import AgentState
+
+logger = logging.getLogger(__name__)
+
+# "estimate" (default): ~4 characters per token, no dependencies.
+# "tiktoken": the model's own tokenizer (needs tiktoken and its encoding file;
+# falls back to the estimate if either is unavailable).
+TOKENIZER = os.environ.get("LEXAGENT_TOKENIZER", "estimate").strip().lower()
+
+# Token budgets for the context notes in each prompt
+REFINE_CONTEXT_TOKENS = int(os.environ.get("LEXAGENT_REFINE_CONTEXT_TOKENS", "2000"))
+REPORT_CONTEXT_TOKENS = int(os.environ.get("LEXAGENT_REPORT_CONTEXT_TOKENS", "3000"))
+
+
+@cache
+def _encoding():
+    if TOKENIZER != "tiktoken":
+        return None
+    try:
+        import tiktoken
+
+        return tiktoken.encoding_for_model(os.environ.get("OPENAI_MODEL", "gpt-4o-mini"))
+    except Exception:
+        logger.warning("tiktoken unavailable; estimating token counts from length")
+        return None
+
+
+@lru_cache(maxsize=4096)
+def count_tokens(text: str) -> int:
+    """Token count of text (cached: notes are re-counted on every step)."""
+    encoding = _encoding()
+    if encoding is None:
+        return (len(text) + 3) // 4
+    return len(encoding.encode(text))
+
+
+def _unsummarized(state: AgentState) -> list[str]:
+    if state.summarized_notes > len(state.context_notes):
+        # Notes were replaced underneath the summary; start over
+        state.context_summary = None
+        state.summarized_notes = 0
+    return state.context_notes[state.summarized_notes:]
+
+
+def notes_to_fold(state: AgentState, budget: int) -> list[str]:
+    """
+    The oldest unsummarized notes to fold into the summary so the stage fits
+    `budget` tokens ([] if it already fits). Folds down to half the budget so
+    the next few notes fit without another summarization call; the newest
+    note is always kept verbatim.
+    """
+    notes = _unsummarized(state)
+    total = count_tokens(state.context_summary or "") + sum(count_tokens(n) for n in notes)
+    if total <= budget:
+        return []
+    fold = 0
+    while fold < len(notes) - 1 and total > budget // 2:
+        total -= count_tokens(notes[fold])
+        fold += 1
+    return notes[:fold]
+
+
+def apply_summary(state: AgentState, summary: str, folded: int) -> None:
+    """Record a new rolling summary covering `folded` more notes."""
+    state.context_summary = summary.strip()
+    state.summarized_notes += folded
+
+
+def context_blob(state: AgentState, separator: str) -> str:
+    """Rolling summary (if any) followed by the notes it does not cover yet."""
+    parts = []
+    if state.context_summary:
+        parts.append(f"[Summary of earlier findings]: {state.context_summary}")
+    parts.extend(_unsummarized(state))
+    return separator.join(parts)
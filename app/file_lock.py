@@ -0,0 +1,43 @@
+"""
+Advisory file locks shared by every process on this host (fcntl.flock).
+Without fcntl (Windows) a process-wide lock is used instead, so locking then
+only serializes the threads of one process.
+"""
+
+import os
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+_fallback_lock = threading.Lock()
+
+
+@contextmanager
+def exclusive(path: Path):
+    """Hold an exclusive lock on path (created if missing) while the block runs."""
+    if fcntl is None:
+        with _fallback_lock:
+            yield
+        return
+    path.parent.mkdir(parents=True, exist_ok=True)
+    while True:
+        f = open(path, "a")
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            current = os.stat(path).st_ino
+        except FileNotFoundError:
+            current = None
+        if current == os.fstat(f.fileno()).st_ino:
+            break
+        # Unlinked (or replaced) while we waited: lock the file now at path instead
+        f.close()
+    with f:
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
@@ -100,6 +100,58 @@ PROMPTS = [
         ],
         "labels": ["production"],
     },
+    {
+        "name": "legal-research/compress-and-reflect",
+        "type": "chat",
+        "prompt": [
+            {
+                "role": "system",
+                "content": (
+                    "You're summarizing search results for a legal research memo and then checking the result in the same pass. "
+                    "First, in 2–3 sentences, capture what matters most for the task. "
+                    "Keep article and section references exactly as they appear — e.g. 'GDPR Article 5', 'BDSG §26' — do not paraphrase or renumber them. "
+                    "Mention the source (in parentheses) so we can trace back. Do not add anything that wasn't in the search results. "
+                    "Then, in one sentence, judge whether that summary answers the task. If it does, say so clearly; if not, name what's still missing. "
+                    "Do not repeat the findings in the judgement. "
+                    "Reply with only a valid JSON object in this exact shape, no other text:\n"
+                    '{"summary": "...", "reflection": "..."}'
+                ),
+            },
+            {
+                "role": "user",
+                "content": (
+                    "Task: {{task_title}}\n"
+                    "Description: {{task_description}}\n\n"
+                    "Search results:\n{{search_results}}"
+                ),
+            },
+        ],
+        "labels": ["production"],
+    },
+    {
+        "name": "legal-research/summarize-context",
+        "type": "chat",
+        "prompt": [
+            {
+                "role": "system",
+                "content": (
+                    "You're keeping a running summary of a legal research session so later steps don't have to reread every note. "
+                    "Merge the earlier summary and the new notes into a single summary of at most 200 words. "
+                    "Keep article and section references and source names exactly as they appear — e.g. 'GDPR Article 5', 'BDSG §26'. "
+                    "Drop repetition, not findings: every distinct finding should survive in some form. "
+                    "Reply with only the summary itself, no preamble."
+                ),
+            },
+            {
+                "role": "user",
+                "content": (
+                    "Earlier summary:\n{{previous_summary}}\n\n"
+                    "New notes:\n{{notes}}"
+                ),
+            },
+        ],
+        "labels": ["production"],
+    },
     {
         "name": "legal-research/generate-report",
         "type": "chat",
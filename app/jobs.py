@@ -0,0 +1,597 @@
+"""
+Persistent job queue for execution steps, and the worker pool that drains it.
+POST /agent/{id}/execute enqueues a job and returns 202; workers (asyncio tasks
+in the API process and/or `python -m app.worker` processes) claim jobs from one
+SQLite database, so queued work survives restarts and API replicas and
+research workers can be sized independently.
+A running job holds a lease that its worker keeps renewing. If the worker dies
+the lease runs out and another worker picks the job up again, up to
+LEXAGENT_JOB_MAX_ATTEMPTS attempts.
+Steps that run inside their request (streamed, execute-all) are recorded as
+inline jobs: created running with a lease held by the API process, never
+queued or retried, and failed once their lease runs out. Every step of a
+session therefore owns the session's one active job while it runs.
+Async code (workers, lease keeping, the API endpoints) goes through
+AsyncJobStore, so a locked jobs.db never stalls the event loop.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+import weakref
+from collections.abc import Awaitable, Callable
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from app.models import Job
+from app.storage import DATA_DIR
+from app.timing import profile_path, profiled, start_timings
+
+logger = logging.getLogger(__name__)
+
+JOBS_DB_PATH = Path(os.environ.get("LEXAGENT_JOBS_DB", str(DATA_DIR / "jobs.db")))
+# Worker tasks started inside the API process (0: only enqueue; run `python -m app.worker`)
+JOB_WORKERS = int(os.environ.get("LEXAGENT_JOB_WORKERS", "2"))
+JOB_LEASE_SECONDS = float(os.environ.get("LEXAGENT_JOB_LEASE", "60"))
+JOB_MAX_ATTEMPTS = int(os.environ.get("LEXAGENT_JOB_MAX_ATTEMPTS", "3"))
+JOB_POLL_INTERVAL = float(os.environ.get("LEXAGENT_JOB_POLL_INTERVAL", "0.5"))
+# Finished jobs older than this are deleted when a worker pool starts
+JOB_RETENTION_SECONDS = float(os.environ.get("LEXAGENT_JOB_RETENTION", "604800"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id TEXT PRIMARY KEY,
+    session_id TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    no_cache INTEGER NOT NULL DEFAULT 0,
+    result TEXT,
+    error TEXT,
+    status_code INTEGER,
+    created_at TEXT NOT NULL,
+    started_at TEXT,
+    finished_at TEXT,
+    worker TEXT,
+    lease_expires_at REAL,
+    idempotency_key TEXT,
+    profile INTEGER NOT NULL DEFAULT 0,
+    timings TEXT,
+    request_keys INTEGER NOT NULL DEFAULT 0,
+    inline INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status, created_at);
+CREATE INDEX IF NOT EXISTS idx_jobs_session ON jobs(session_id, created_at);
+"""
+# Columns added after the first release: (name, definition) for ALTER TABLE on older databases
+_ADDED_JOB_COLUMNS = (
+    ("idempotency_key", "TEXT"),
+    ("profile", "INTEGER NOT NULL DEFAULT 0"),
+    ("timings", "TEXT"),
+    ("request_keys", "INTEGER NOT NULL DEFAULT 0"),
+    ("inline", "INTEGER NOT NULL DEFAULT 0"),
+)
+_INDEXES_ON_ADDED_COLUMNS = """
+CREATE UNIQUE INDEX IF NOT EXISTS idx_jobs_idempotency
+    ON jobs(session_id, idempotency_key) WHERE idempotency_key IS NOT NULL;
+"""
+# Idempotency keys of requests that were answered with a job created by an
+# earlier request (the session's queued or running job); a job's own key is
+# in jobs.idempotency_key
+_KEYS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS job_idempotency_keys (
+    session_id TEXT NOT NULL,
+    idempotency_key TEXT NOT NULL,
+    job_id TEXT NOT NULL,
+    PRIMARY KEY (session_id, idempotency_key)
+);
+CREATE INDEX IF NOT EXISTS idx_job_idempotency_keys_job ON job_idempotency_keys(job_id);
+"""
+
+_JOB_COLUMNS = (
+    "job_id, session_id, status, attempts, no_cache, result, error, status_code, "
+    "created_at, started_at, finished_at, profile, timings, request_keys"
+)
+
+
+def _utcnow() -> str:
+    return datetime.utcnow().isoformat()
+
+
+def _row_to_job(row: tuple) -> Job:
+    (
+        job_id, session_id, status, attempts, no_cache, result, error, status_code,
+        created_at, started_at, finished_at, profile, timings, request_keys,
+    ) = row
+    return Job(
+        job_id=job_id,
+        session_id=session_id,
+        status=status,
+        attempts=attempts,
+        no_cache=bool(no_cache),
+        profile=bool(profile),
+        request_keys=bool(request_keys),
+        result=json.loads(result) if result else None,
+        error=error,
+        status_code=status_code,
+        timings=json.loads(timings) if timings else None,
+        created_at=created_at,
+        started_at=started_at,
+        finished_at=finished_at,
+    )
+
+
+class JobStore:
+    """Job rows in a SQLite (WAL) database shared by every API and worker process."""
+
+    def __init__(self, db_path: Path) -> None:
+        self.db_path = db_path
+        self._local = threading.local()
+        self._init_lock = threading.Lock()
+        self._initialized = False
+
+    def _connect(self) -> sqlite3.Connection:
+        """One connection per thread, as in app.sqlite_store."""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            return conn
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA busy_timeout=30000")
+        with self._init_lock:
+            if not self._initialized:
+                conn.executescript(_SCHEMA)
+                existing = {row[1] for row in conn.execute("PRAGMA table_info(jobs)")}
+                for name, definition in _ADDED_JOB_COLUMNS:
+                    if name not in existing:
+                        conn.execute(f"ALTER TABLE jobs ADD COLUMN {name} {definition}")
+                conn.executescript(_INDEXES_ON_ADDED_COLUMNS)
+                conn.executescript(_KEYS_SCHEMA)
+                self._initialized = True
+        self._local.conn = conn
+        return conn
+
+    def enqueue(
+        self,
+        session_id: str,
+        no_cache: bool = False,
+        idempotency_key: str | None = None,
+        profile: bool = False,
+        request_keys: bool = False,
+    ) -> tuple[Job, bool]:
+        """
+        Queue the next step of a session. Steps of one session run one at a
+        time, so if it already has a queued or running job that job is
+        returned instead (and the idempotency key is recorded for it), as is
+        the job returned earlier for the same idempotency key. The flag is
+        True only for a new job.
+        """
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = self._by_idempotency_key(conn, session_id, idempotency_key)
+            if row is None:
+                self._fail_abandoned_inline(conn, time.time())
+                row = self._active(conn, session_id)
+                if row is not None and idempotency_key is not None:
+                    # A retry with this key must get this job, even after it has finished
+                    conn.execute(
+                        "INSERT INTO job_idempotency_keys (session_id, idempotency_key, job_id) "
+                        "VALUES (?, ?, ?)",
+                        (session_id, idempotency_key, row[0]),
+                    )
+            if row is not None:
+                conn.execute("COMMIT")
+                return _row_to_job(row), False
+            job = Job(
+                job_id=str(uuid.uuid4()),
+                session_id=session_id,
+                status="queued",
+                no_cache=no_cache,
+                profile=profile,
+                request_keys=request_keys,
+                created_at=_utcnow(),
+            )
+            conn.execute(
+                "INSERT INTO jobs "
+                "(job_id, session_id, status, no_cache, created_at, idempotency_key, profile, "
+                "request_keys) VALUES (?, ?, 'queued', ?, ?, ?, ?, ?)",
+                (job.job_id, session_id, int(no_cache), job.created_at, idempotency_key,
+                 int(profile), int(request_keys)),
+            )
+            conn.execute("COMMIT")
+            return job, True
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def start_inline(self, session_id: str, worker: str, lease_seconds: float) -> Job | None:
+        """
+        Record a step that `worker` runs right away (not queued): a running
+        inline job holding a lease. None if the session already has an active job.
+        """
+        conn = self._connect()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._fail_abandoned_inline(conn, now)
+            if self._active(conn, session_id) is not None:
+                conn.execute("COMMIT")
+                return None
+            created_at = _utcnow()
+            job = Job(
+                job_id=str(uuid.uuid4()),
+                session_id=session_id,
+                status="running",
+                attempts=1,
+                created_at=created_at,
+                started_at=created_at,
+            )
+            conn.execute(
+                "INSERT INTO jobs (job_id, session_id, status, attempts, created_at, started_at, "
+                "worker, lease_expires_at, inline) VALUES (?, ?, 'running', 1, ?, ?, ?, ?, 1)",
+                (job.job_id, session_id, created_at, created_at, worker, now + lease_seconds),
+            )
+            conn.execute("COMMIT")
+            return job
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def find(self, session_id: str, idempotency_key: str) -> Job | None:
+        """The job returned for this session and Idempotency-Key, if any."""
+        row = self._by_idempotency_key(self._connect(), session_id, idempotency_key)
+        return _row_to_job(row) if row is not None else None
+
+    def active(self, session_id: str) -> Job | None:
+        """The session's queued or running job (an inline one only while leased), if any."""
+        row = self._active(self._connect(), session_id)
+        return _row_to_job(row) if row is not None else None
+
+    def get(self, job_id: str) -> Job | None:
+        row = self._connect().execute(
+            f"SELECT {_JOB_COLUMNS} FROM jobs WHERE job_id = ?", (job_id,)
+        ).fetchone()
+        return _row_to_job(row) if row is not None else None
+
+    def list_for_session(self, session_id: str, limit: int = 20) -> list[Job]:
+        """Most recent jobs of a session, newest first."""
+        rows = self._connect().execute(
+            f"SELECT {_JOB_COLUMNS} FROM jobs WHERE session_id = ? "
+            "ORDER BY created_at DESC LIMIT ?",
+            (session_id, limit),
+        ).fetchall()
+        return [_row_to_job(row) for row in rows]
+
+    def counts(self) -> dict[str, int]:
+        """Number of jobs per status."""
+        rows = self._connect().execute("SELECT status, COUNT(*) FROM jobs GROUP BY status")
+        return dict(rows.fetchall())
+
+    def claim(self, worker: str, lease_seconds: float, max_attempts: int) -> Job | None:
+        """
+        Take the oldest queued job (or a running one whose lease expired) and
+        mark it running for `worker`. Jobs that already used max_attempts are
+        failed instead of being run again.
+        """
+        conn = self._connect()
+        while True:
+            now = time.time()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._fail_abandoned_inline(conn, now)
+                row = conn.execute(
+                    "SELECT job_id, attempts FROM jobs WHERE status = 'queued' "
+                    "OR (status = 'running' AND inline = 0 AND lease_expires_at < ?) "
+                    "ORDER BY created_at LIMIT 1",
+                    (now,),
+                ).fetchone()
+                if row is None:
+                    conn.execute("COMMIT")
+                    return None
+                job_id, attempts = row
+                if attempts >= max_attempts:
+                    conn.execute(
+                        "UPDATE jobs SET status = 'failed', status_code = 500, error = ?, "
+                        "finished_at = ?, worker = NULL, lease_expires_at = NULL WHERE job_id = ?",
+                        (f"Job abandoned after {attempts} interrupted attempt(s)", _utcnow(), job_id),
+                    )
+                    conn.execute("COMMIT")
+                    continue
+                conn.execute(
+                    "UPDATE jobs SET status = 'running', attempts = attempts + 1, started_at = ?, "
+                    "worker = ?, lease_expires_at = ? WHERE job_id = ?",
+                    (_utcnow(), worker, now + lease_seconds, job_id),
+                )
+                job_row = conn.execute(
+                    f"SELECT {_JOB_COLUMNS} FROM jobs WHERE job_id = ?", (job_id,)
+                ).fetchone()
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            return _row_to_job(job_row)
+
+    def renew(self, job_id: str, worker: str, lease_seconds: float) -> bool:
+        """Extend the lease; False if the job is no longer this worker's."""
+        cur = self._connect().execute(
+            "UPDATE jobs SET lease_expires_at = ? "
+            "WHERE job_id = ? AND worker = ? AND status = 'running'",
+            (time.time() + lease_seconds, job_id, worker),
+        )
+        return cur.rowcount == 1
+
+    def complete(
+        self, job_id: str, worker: str, result: dict, timings: dict | None = None,
+    ) -> None:
+        self._finish(job_id, worker, "succeeded", json.dumps(result), None, None, timings)
+
+    def fail(
+        self, job_id: str, worker: str, status_code: int, error: str, timings: dict | None = None,
+    ) -> None:
+        self._finish(job_id, worker, "failed", None, error, status_code, timings)
+
+    def release(self, job_id: str, worker: str) -> None:
+        """Put an interrupted job back in the queue (worker shutdown)."""
+        self._connect().execute(
+            "UPDATE jobs SET status = 'queued', worker = NULL, lease_expires_at = NULL "
+            "WHERE job_id = ? AND worker = ? AND status = 'running'",
+            (job_id, worker),
+        )
+
+    def prune(self, older_than_seconds: float) -> int:
+        """Delete finished jobs older than the retention period; returns how many."""
+        cutoff = (datetime.utcnow() - timedelta(seconds=older_than_seconds)).isoformat()
+        conn = self._connect()
+        cur = conn.execute(
+            "DELETE FROM jobs WHERE status IN ('succeeded', 'failed') AND finished_at < ?",
+            (cutoff,),
+        )
+        conn.execute(
+            "DELETE FROM job_idempotency_keys WHERE job_id NOT IN (SELECT job_id FROM jobs)"
+        )
+        return cur.rowcount
+
+    @staticmethod
+    def _active(conn: sqlite3.Connection, session_id: str) -> tuple | None:
+        # A queued job's expired lease only means another worker takes it over;
+        # an inline job's means the process running it is gone
+        return conn.execute(
+            f"SELECT {_JOB_COLUMNS} FROM jobs WHERE session_id = ? "
+            "AND (status = 'queued' OR (status = 'running' "
+            "AND (inline = 0 OR lease_expires_at >= ?))) ORDER BY created_at LIMIT 1",
+            (session_id, time.time()),
+        ).fetchone()
+
+    @staticmethod
+    def _fail_abandoned_inline(conn: sqlite3.Connection, now: float) -> None:
+        """Fail inline jobs whose process stopped renewing the lease (they cannot be rerun)."""
+        conn.execute(
+            "UPDATE jobs SET status = 'failed', status_code = 500, error = ?, finished_at = ?, "
+            "worker = NULL, lease_expires_at = NULL "
+            "WHERE inline = 1 AND status = 'running' AND lease_expires_at < ?",
+            ("Step interrupted: the process running it stopped", _utcnow(), now),
+        )
+
+    @staticmethod
+    def _by_idempotency_key(
+        conn: sqlite3.Connection, session_id: str, idempotency_key: str | None,
+    ) -> tuple | None:
+        if idempotency_key is None:
+            return None
+        return conn.execute(
+            f"SELECT {_JOB_COLUMNS} FROM jobs WHERE session_id = ? AND (idempotency_key = ? "
+            "OR job_id IN (SELECT job_id FROM job_idempotency_keys "
+            "WHERE session_id = ? AND idempotency_key = ?))",
+            (session_id, idempotency_key, session_id, idempotency_key),
+        ).fetchone()
+
+    def _finish(
+        self,
+        job_id: str,
+        worker: str,
+        status: str,
+        result: str | None,
+        error: str | None,
+        status_code: int | None,
+        timings: dict | None,
+    ) -> None:
+        # Ignored if the lease was lost and another worker took the job over
+        self._connect().execute(
+            "UPDATE jobs SET status = ?, result = ?, error = ?, status_code = ?, finished_at = ?, "
+            "timings = ?, worker = NULL, lease_expires_at = NULL "
+            "WHERE job_id = ? AND worker = ? AND status = 'running'",
+            (status, result, error, status_code, _utcnow(),
+             json.dumps(timings) if timings else None, job_id, worker),
+        )
+
+
+class AsyncJobStore:
+    """
+    JobStore calls as coroutines, run on a few dedicated threads: sqlite3
+    blocks (up to busy_timeout) while another process holds the write lock,
+    and the event loop must keep serving requests meanwhile.
+    """
+
+    def __init__(self, store: JobStore, threads: int = 4) -> None:
+        self.store = store
+        self._executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="jobs-db")
+
+    async def _call(self, fn: Callable, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, lambda: fn(*args, **kwargs))
+
+    async def enqueue(self, session_id: str, **kwargs) -> tuple[Job, bool]:
+        return await self._call(self.store.enqueue, session_id, **kwargs)
+
+    async def start_inline(self, session_id: str, worker: str, lease_seconds: float) -> Job | None:
+        return await self._call(self.store.start_inline, session_id, worker, lease_seconds)
+
+    async def find(self, session_id: str, idempotency_key: str) -> Job | None:
+        return await self._call(self.store.find, session_id, idempotency_key)
+
+    async def active(self, session_id: str) -> Job | None:
+        return await self._call(self.store.active, session_id)
+
+    async def get(self, job_id: str) -> Job | None:
+        return await self._call(self.store.get, job_id)
+
+    async def claim(self, worker: str, lease_seconds: float, max_attempts: int) -> Job | None:
+        return await self._call(self.store.claim, worker, lease_seconds, max_attempts)
+
+    async def renew(self, job_id: str, worker: str, lease_seconds: float) -> bool:
+        return await self._call(self.store.renew, job_id, worker, lease_seconds)
+
+    async def complete(self, job_id: str, worker: str, result: dict, timings: dict | None) -> None:
+        await self._call(self.store.complete, job_id, worker, result, timings)
+
+    async def fail(
+        self, job_id: str, worker: str, status_code: int, error: str, timings: dict | None,
+    ) -> None:
+        await self._call(self.store.fail, job_id, worker, status_code, error, timings)
+
+    async def release(self, job_id: str, worker: str) -> None:
+        await self._call(self.store.release, job_id, worker)
+
+
+JobHandler = Callable[[Job], Awaitable[dict]]
+
+
+class JobWorkerPool:
+    """
+    `concurrency` asyncio workers that claim jobs from the store and run
+    handler(job). Each job runs in its own task, so request-scoped context
+    (API keys, cache bypass) set by the handler never leaks into the next job.
+    A handler exception with status_code/detail (HTTPException) fails the job
+    with that status; anything else fails it with 500.
+    """
+
+    def __init__(
+        self,
+        store: JobStore,
+        handler: JobHandler,
+        concurrency: int,
+        poll_interval: float = JOB_POLL_INTERVAL,
+        lease_seconds: float = JOB_LEASE_SECONDS,
+        max_attempts: int = JOB_MAX_ATTEMPTS,
+    ) -> None:
+        self.store = store
+        self.db = AsyncJobStore(store)
+        self.handler = handler
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self._workers: list[asyncio.Task] = []
+        self._wakeup: asyncio.Event | None = None
+        self._running: set[str] = set()
+        # Held by the requests waiting for a job; set when a worker here finishes it
+        self._finished: weakref.WeakValueDictionary[str, asyncio.Event] = (
+            weakref.WeakValueDictionary()
+        )
+
+    def start(self) -> None:
+        """Start the workers on the running event loop (no-op with concurrency 0 or if started)."""
+        if self._workers or self.concurrency <= 0:
+            return
+        removed = self.store.prune(JOB_RETENTION_SECONDS)
+        if removed:
+            logger.info("Pruned %d finished job(s)", removed)
+        self._wakeup = asyncio.Event()
+        prefix = f"{socket.gethostname()}:{os.getpid()}"
+        self._workers = [
+            asyncio.create_task(self._work(f"{prefix}:{i}"), name=f"job-worker-{i}")
+            for i in range(self.concurrency)
+        ]
+
+    def notify(self) -> None:
+        """Wake idle workers now instead of at their next poll (a job was just queued)."""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def finished_event(self, job_id: str) -> asyncio.Event:
+        """
+        Event set when a worker of this pool finishes (or releases) the job.
+        Take it before reading the job's status, so a finish in between is not missed.
+        """
+        event = self._finished.get(job_id)
+        if event is None:
+            event = self._finished[job_id] = asyncio.Event()
+        return event
+
+    def running(self, job_id: str) -> bool:
+        """True while a worker of this pool runs the job."""
+        return job_id in self._running
+
+    async def stop(self) -> None:
+        """Cancel the workers; jobs they were running go back to the queue."""
+        workers, self._workers = self._workers, []
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+
+    async def run_forever(self) -> None:
+        self.start()
+        await asyncio.gather(*self._workers)
+
+    async def _work(self, worker: str) -> None:
+        while True:
+            self._wakeup.clear()
+            job = await self.db.claim(worker, self.lease_seconds, self.max_attempts)
+            if job is None:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+                except TimeoutError:
+                    pass
+                continue
+            await self._run(job, worker)
+
+    async def _run(self, job: Job, worker: str) -> None:
+        # Set before the handler task is created, so the task records into it
+        timings = start_timings()
+        lease = asyncio.create_task(self._keep_lease(job, worker))
+        self._running.add(job.job_id)
+        try:
+            with profiled(profile_path(f"job-{job.job_id}") if job.profile else None):
+                result = await asyncio.create_task(self.handler(job))
+        except asyncio.CancelledError:
+            await self.db.release(job.job_id, worker)
+            raise
+        except Exception as e:
+            status_code = getattr(e, "status_code", 500)
+            if status_code >= 500:
+                logger.exception("Job %s failed", job.job_id)
+            detail = getattr(e, "detail", None) or str(e) or "Job failed"
+            await self.db.fail(job.job_id, worker, status_code, str(detail), timings.as_dict())
+        else:
+            await self.db.complete(job.job_id, worker, result, timings.as_dict())
+        finally:
+            lease.cancel()
+            self._running.discard(job.job_id)
+            event = self._finished.get(job.job_id)
+            if event is not None:
+                event.set()
+
+    async def _keep_lease(self, job: Job, worker: str) -> None:
+        await keep_lease(self.db, job.job_id, worker, self.lease_seconds)
+
+
+async def keep_lease(db: AsyncJobStore, job_id: str, worker: str, lease_seconds: float) -> None:
+    """Renew a running job's lease until cancelled (or until it is lost)."""
+    while True:
+        await asyncio.sleep(lease_seconds / 3)
+        if not await db.renew(job_id, worker, lease_seconds):
+            logger.warning("Lost the lease on job %s", job_id)
+            return
+
+
+job_store = JobStore(JOBS_DB_PATH)
+async_job_store = AsyncJobStore(job_store)
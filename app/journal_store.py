@@ -0,0 +1,293 @@
+"""
+Event-sourced session store (selected with LEXAGENT_STORAGE=journal).
+Instead of rewriting the whole document, each save appends the small events
+that turn the last persisted state into the new one (task_started,
+task_completed, note_appended, report_generated, ...) to
+DATA_DIR/journal/{session_id}.log. A session is rebuilt from its latest
+snapshot plus the events after it; a background thread folds the log into a
+new snapshot once it grows past LEXAGENT_JOURNAL_COMPACT_EVENTS events.
+Saves and compaction hold an advisory lock on the session's log (see
+app.file_lock), so several processes can share the journal: each cached head
+remembers the files' stat and is replayed again when another process wrote.
+"""
+
+import json
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+from app.file_lock import exclusive
+from app.models import AgentState, SessionConflictError, SessionSummary
+from app.serialization import state_from_dict
+from app.session_index import SessionIndex, filter_summaries, summarize
+
+_SCALAR_FIELDS = (
+    "goal", "current_step", "is_active", "mode", "created_at", "context_summary", "summarized_notes",
+    "version",
+)
+
+
+def diff_events(old: dict | None, new: dict) -> list[dict]:
+    """Events that turn the model_dump() `old` into `new` (all of it, if old is None)."""
+    if old is None:
+        return [{"type": "session_created", "state": new}]
+
+    events: list[dict] = []
+    if [t["id"] for t in old["tasks"]] != [t["id"] for t in new["tasks"]]:
+        events.append({"type": "tasks_replaced", "tasks": new["tasks"]})
+    else:
+        for prev, task in zip(old["tasks"], new["tasks"], strict=True):
+            if task == prev:
+                continue
+            changed = {k: v for k, v in task.items() if prev.get(k) != v}
+            if changed == {"status": "in_progress"}:
+                events.append({"type": "task_started", "task_id": task["id"]})
+            elif changed == {"status": "failed"}:
+                events.append({"type": "task_failed", "task_id": task["id"]})
+            elif task["status"] == "done" and prev["status"] != "done":
+                events.append({"type": "task_completed", "task": task})
+            else:
+                events.append({"type": "task_updated", "task_id": task["id"], "fields": changed})
+
+    old_notes, new_notes = old["context_notes"], new["context_notes"]
+    if new_notes[: len(old_notes)] == old_notes:
+        events.extend({"type": "note_appended", "note": n} for n in new_notes[len(old_notes):])
+    else:
+        events.append({"type": "notes_replaced", "notes": new_notes})
+
+    if new["final_report_path"] != old["final_report_path"]:
+        events.append({"type": "report_generated", "path": new["final_report_path"]})
+
+    # .get(): snapshots written before a field existed do not have it
+    fields = {k: new[k] for k in _SCALAR_FIELDS if new[k] != old.get(k)}
+    if fields:
+        events.append({"type": "session_updated", "fields": fields})
+    return events
+
+
+def apply_event(state: dict | None, event: dict) -> dict:
+    """Replay one event onto a model_dump()-shaped dict."""
+    kind = event["type"]
+    if kind == "session_created":
+        return event["state"]
+    tasks = {t["id"]: t for t in state["tasks"]}
+    if kind == "tasks_replaced":
+        state["tasks"] = event["tasks"]
+    elif kind == "task_started":
+        tasks[event["task_id"]]["status"] = "in_progress"
+    elif kind == "task_failed":
+        tasks[event["task_id"]]["status"] = "failed"
+    elif kind == "task_completed":
+        tasks[event["task"]["id"]].update(event["task"])
+    elif kind == "task_updated":
+        tasks[event["task_id"]].update(event["fields"])
+    elif kind == "note_appended":
+        state["context_notes"].append(event["note"])
+    elif kind == "notes_replaced":
+        state["context_notes"] = event["notes"]
+    elif kind == "report_generated":
+        state["final_report_path"] = event["path"]
+    elif kind == "session_updated":
+        state.update(event["fields"])
+    return state
+
+
+def _truncate_torn_tail(path: Path) -> None:
+    """Cut an incomplete last line (a crash mid-append) so the next event starts a line of its own."""
+    try:
+        f = open(path, "rb+")
+    except FileNotFoundError:
+        return
+    with f:
+        end = f.seek(0, os.SEEK_END)
+        if end == 0:
+            return
+        f.seek(end - 1)
+        if f.read(1) == b"\n":
+            return
+        pos = end
+        while pos > 0:
+            start = max(pos - 4096, 0)
+            f.seek(start)
+            newline = f.read(pos - start).rfind(b"\n")
+            if newline != -1:
+                f.truncate(start + newline + 1)
+                return
+            pos = start
+        f.truncate(0)
+
+
+class JournalSessionStore:
+    """save/load/list_all/delete for AgentState as per-session event logs plus snapshots."""
+
+    def __init__(self, journal_dir: Path, compact_after: int, max_cached: int = 512) -> None:
+        self.journal_dir = journal_dir
+        self.compact_after = compact_after
+        self.max_cached = max_cached
+        self.index = SessionIndex(journal_dir / "index" / "sessions.log", self._scan_summaries)
+        # Last persisted state, seq, events-since-snapshot and stamp() per session, so a
+        # save can be diffed without replaying the log. Bounded; misses (and heads whose
+        # files another process changed) replay from disk.
+        self._heads: OrderedDict[str, tuple[dict, int, int, tuple | None]] = OrderedDict()
+        self._lock = threading.RLock()
+        self._compactor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="journal-compact")
+        self._compacting: set[str] = set()
+
+    def save(self, state: AgentState) -> None:
+        new = state.model_dump()
+        sid = state.session_id
+        with exclusive(self._log_path(sid)):
+            # Under the log lock the head is current, also across processes
+            old, seq, pending = self._head(sid)
+            if old is not None and old.get("version", 0) != state.version:
+                raise SessionConflictError(sid)
+            events = diff_events(old, new)
+            if not events:
+                return
+            new["version"] = state.version + 1
+            if old is not None:
+                events.append({"type": "session_updated", "fields": {"version": new["version"]}})
+            ts = datetime.utcnow().isoformat()
+            _truncate_torn_tail(self._log_path(sid))
+            with open(self._log_path(sid), "a", encoding="utf-8") as f:
+                for event in events:
+                    seq += 1
+                    f.write(json.dumps({"seq": seq, "ts": ts, **event}) + "\n")
+            pending += len(events)
+            self._remember(sid, new, seq, pending, self.stamp(sid))
+            state.version = new["version"]
+            with self._lock:
+                compact = pending >= self.compact_after and sid not in self._compacting
+                if compact:
+                    self._compacting.add(sid)
+            if compact:
+                self._compactor.submit(self._compact, sid)
+        self.index.upsert(summarize(state))
+
+    def load(self, session_id: str) -> AgentState | None:
+        data, _, _ = self._head(session_id)
+        if data is None:
+            return None
+        return state_from_dict(data)
+
+    def stamp(self, session_id: str) -> tuple | None:
+        """Log and snapshot mtime and size (change with every save or compaction)."""
+        stamp = []
+        for path in (self._log_path(session_id), self._snapshot_path(session_id)):
+            try:
+                st = path.stat()
+            except FileNotFoundError:
+                stamp.append(None)
+                continue
+            stamp.append((st.st_mtime_ns, st.st_size))
+        return tuple(stamp) if any(stamp) else None
+
+    def list_all(self) -> list[AgentState]:
+        sessions = []
+        for session_id in self._session_ids():
+            state = self.load(session_id)
+            if state is not None:
+                sessions.append(state)
+        return sessions
+
+    def list_summaries(self, limit: int, **query) -> list[SessionSummary]:
+        return filter_summaries(self.index.summaries(), limit, **query)
+
+    def delete(self, session_id: str) -> bool:
+        with self._lock:
+            self._heads.pop(session_id, None)
+            existed = False
+            for path in (self._log_path(session_id), self._snapshot_path(session_id)):
+                if path.exists():
+                    path.unlink()
+                    existed = True
+        if existed:
+            self.index.remove(session_id)
+        return existed
+
+    # -- internals ----------------------------------------------------------
+
+    def _log_path(self, session_id: str) -> Path:
+        return self.journal_dir / f"{session_id}.log"
+
+    def _snapshot_path(self, session_id: str) -> Path:
+        return self.journal_dir / f"{session_id}.snap.json"
+
+    def _session_ids(self) -> list[str]:
+        if not self.journal_dir.exists():
+            return []
+        ids = {p.name.removesuffix(".log") for p in self.journal_dir.glob("*.log")}
+        ids |= {p.name.removesuffix(".snap.json") for p in self.journal_dir.glob("*.snap.json")}
+        return sorted(ids)
+
+    def _scan_summaries(self) -> list[SessionSummary]:
+        return [summarize(state) for state in self.list_all()]
+
+    def _head(self, session_id: str) -> tuple[dict | None, int, int]:
+        """(state, last seq, events since snapshot). Callers must not mutate state."""
+        # Stat before replaying: if a write lands during the replay the next call replays again
+        stamp = self.stamp(session_id)
+        with self._lock:
+            head = self._heads.get(session_id)
+            if head is not None and head[3] == stamp:
+                self._heads.move_to_end(session_id)
+                return head[:3]
+        state, seq, pending = self._replay(session_id)
+        if state is not None:
+            self._remember(session_id, state, seq, pending, stamp)
+        return state, seq, pending
+
+    def _remember(self, session_id: str, state: dict, seq: int, pending: int, stamp) -> None:
+        with self._lock:
+            self._heads[session_id] = (state, seq, pending, stamp)
+            self._heads.move_to_end(session_id)
+            while len(self._heads) > self.max_cached:
+                self._heads.popitem(last=False)
+
+    def _replay(self, session_id: str) -> tuple[dict | None, int, int]:
+        """Rebuild state from the snapshot plus the events logged after it."""
+        state, seq, pending = None, 0, 0
+        snapshot = self._snapshot_path(session_id)
+        if snapshot.exists():
+            with open(snapshot, encoding="utf-8") as f:
+                data = json.load(f)
+            state, seq = data["state"], data["seq"]
+        log = self._log_path(session_id)
+        if log.exists():
+            with open(log, encoding="utf-8") as f:
+                for line in f:
+                    if not line.endswith("\n"):
+                        # Torn by a crash mid-append, or still being written: not committed
+                        break
+                    if not line.strip():
+                        continue
+                    event = json.loads(line)
+                    if event["seq"] <= seq:
+                        continue  # already folded into the snapshot
+                    state = apply_event(state, event)
+                    seq = event["seq"]
+                    pending += 1
+        return state, seq, pending
+
+    def _compact(self, session_id: str) -> None:
+        """Write a snapshot at the current seq and truncate the log (background thread)."""
+        try:
+            # Only this session's log lock: saves of other sessions carry on meanwhile
+            with exclusive(self._log_path(session_id)):
+                state, seq, _ = self._replay(session_id)
+                if state is None:
+                    return
+                snapshot = self._snapshot_path(session_id)
+                tmp = snapshot.with_suffix(f".{os.getpid()}.tmp")
+                with open(tmp, "w", encoding="utf-8") as f:
+                    json.dump({"seq": seq, "state": state}, f)
+                os.replace(tmp, snapshot)
+                # A crash here is harmless: replay skips events at or below the snapshot seq
+                open(self._log_path(session_id), "w").close()
+                self._remember(session_id, state, seq, 0, self.stamp(session_id))
+        finally:
+            with self._lock:
+                self._compacting.discard(session_id)
@@ -1,30 +1,166 @@
+import asyncio
+import json
+import math
 import os
+import re
+import secrets
+import socket
+import sys
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable
+from contextlib import asynccontextmanager
+from datetime import UTC, datetime
+from email.utils import formatdate, parsedate_to_datetime
 from pathlib import Path
+from typing import Literal
 
 from dotenv import load_dotenv
-from fastapi import FastAPI, HTTPException, Request
+from fastapi import FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse, JSONResponse, Response
+from fastapi.responses import FileResponse, JSONResponse, Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
-from openai import APIError, AuthenticationError
 
-from app.agent import execute_task, generate_final_report, generate_plan
-from app.context import set_api_keys
-from app.models import AgentState, ExecuteResponse, GoalRequest
-from app.security import PromptInjectionError, validate_goal
-from app.storage import delete_session, list_sessions, load_session, save_session
-from app.tools import REPORTS_DIR
+from app import cassette
+from app.agent import (
+    EventCallback,
+    cache_plan,
+    execute_task_async,
+    execute_tasks_async,
+    generate_final_report_async,
+    generate_plan_async,
+    llm_cache,
+    plan_cache,
+    prompt_registry,
+)
+from app.clients import close_clients
+from app.context import set_api_keys, set_cache_bypass, set_session_id
+from app.jobs import (
+    JOB_LEASE_SECONDS,
+    JOB_POLL_INTERVAL,
+    JOB_WORKERS,
+    JobWorkerPool,
+    async_job_store,
+    job_store,
+    keep_lease,
+)
+from app.metrics import (
+    CallbackMetric,
+    registry,
+    render_metrics,
+    step_in_flight,
+)
+from app.models import (
+    AgentState,
+    ExecuteAllResponse,
+    ExecuteResponse,
+    GoalRequest,
+    Job,
+    PlanSeedRequest,
+    SessionConflictError,
+    SessionPage,
+)
+from app.resilience import CircuitOpenError, resilience_stats
+from app.security import PromptInjectionError, validate_goal, validate_task_description
+from app.serialization import dump_state
+from app.storage import (
+    close_sessions,
+    delete_session,
+    list_session_summaries,
+    load_session,
+    load_session_async,
+    save_session_async,
+)
+from app.timing import ProfiledRoute, ServerTimingMiddleware, profile_requested, record_job
+from app.tools import REPORT_ENCODINGS, REPORTS_DIR, search_cache
+from app.tracing import warm_up
 
 # Load .env explicitly with override
 env_file = Path(__file__).parent.parent / ".env"
 load_dotenv(env_file, override=True)
 
+# Import the SDKs and create the Langfuse client in the background at startup
+# (0: the first request that needs them does it)
+WARM_UP = os.environ.get("LEXAGENT_WARMUP", "1") != "0"
+
+# POST /plans requires X-Admin-Token: <LEXAGENT_ADMIN_TOKEN>; unset, the endpoint is disabled
+ADMIN_TOKEN = os.environ.get("LEXAGENT_ADMIN_TOKEN", "")
+
+
+def _openai_error_response(exc: Exception) -> JSONResponse | None:
+    openai = sys.modules.get("openai")
+    if openai is None:
+        return None  # the SDK was never imported, so this cannot be one of its errors
+    if isinstance(exc, openai.AuthenticationError):
+        return JSONResponse(
+            status_code=401,
+            content={"detail": "Invalid or expired OpenAI API key. Check OPENAI_API_KEY or X-OpenAI-API-Key header."},
+        )
+    if isinstance(exc, openai.APIError):
+        return JSONResponse(
+            status_code=503,
+            content={"detail": f"OpenAI API error: {getattr(exc, 'message', str(exc))}"},
+        )
+    return None
+
+
+class OpenAIErrorMiddleware:
+    """
+    Maps OpenAI SDK errors to 401/503. A middleware rather than exception
+    handlers, which would need the SDK's classes (a slow import) when this
+    module is imported.
+    """
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        started = False
+
+        async def send_tracking(message) -> None:
+            nonlocal started
+            started = started or message["type"] == "http.response.start"
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_tracking)
+        except Exception as exc:
+            response = _openai_error_response(exc)
+            if response is None or started:
+                raise
+            await response(scope, receive, send)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Prompts are served from memory; refresh them from Langfuse in the background
+    prompt_registry.start()
+    job_pool.start()
+    if WARM_UP:
+        # Import the SDKs off the request path while the server starts listening
+        asyncio.get_running_loop().run_in_executor(None, warm_up)
+    yield
+    # Steps still running go back to the queue and resume after the restart
+    await job_pool.stop()
+    prompt_registry.stop()
+    # Write out any session changes still held by the write-behind cache
+    close_sessions()
+    await close_clients()
+
+
 app = FastAPI(
     title="LexAgent API",
     description="Legal Research AI Agent",
     version="0.1.0",
+    lifespan=lifespan,
 )
+app.router.route_class = ProfiledRoute
 
+app.add_middleware(OpenAIErrorMiddleware)
+app.add_middleware(ServerTimingMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=[
@@ -45,25 +181,25 @@ app.add_middleware(
 
 @app.exception_handler(HTTPException)
 async def _http_exception_handler(request: Request, exc: HTTPException):
-    return JSONResponse(status_code=exc.status_code, content={"detail": exc.detail})
-
-
-@app.exception_handler(AuthenticationError)
-async def _openai_auth_handler(request: Request, exc: AuthenticationError):
     return JSONResponse(
-        status_code=401,
-        content={"detail": "Invalid or expired OpenAI API key. Check OPENAI_API_KEY or X-OpenAI-API-Key header."},
+        status_code=exc.status_code, content={"detail": exc.detail}, headers=exc.headers,
     )
 
 
-@app.exception_handler(APIError)
-async def _openai_api_handler(request: Request, exc: APIError):
+@app.exception_handler(CircuitOpenError)
+async def _circuit_open_handler(request: Request, exc: CircuitOpenError):
     return JSONResponse(
         status_code=503,
-        content={"detail": f"OpenAI API error: {getattr(exc, 'message', str(exc))}"},
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(math.ceil(exc.retry_after))},
     )
 
 
+@app.exception_handler(SessionConflictError)
+async def _session_conflict_handler(request: Request, exc: SessionConflictError):
+    return JSONResponse(status_code=409, content={"detail": str(exc)})
+
+
 # ---------------------------------------------------------------------------
 # GET /health
 # ---------------------------------------------------------------------------
@@ -81,25 +217,34 @@ def health_check():
 
 
 def _apply_api_key_headers(req: Request) -> None:
-    """Read optional API key headers and set request-scoped context and env for OpenAI client."""
+    """
+    Read optional API key headers into request-scoped context. app.clients
+    picks the pooled OpenAI/Tavily client for that key; the environment is
+    never modified, so concurrent requests with different keys do not race.
+    """
     openai_key = req.headers.get("X-OpenAI-API-Key")
     tavily_key = req.headers.get("X-Tavily-API-Key")
     if openai_key or tavily_key:
         set_api_keys(openai_key=openai_key, tavily_key=tavily_key)
-    # So Langfuse/OpenAI client uses per-request key (client reads OPENAI_API_KEY from env).
-    if openai_key and openai_key.strip():
-        os.environ["OPENAI_API_KEY"] = openai_key.strip()
+
+
+def _apply_request_headers(req: Request) -> None:
+    """Apply all request-scoped headers: API key overrides and Cache-Control: no-cache."""
+    _apply_api_key_headers(req)
+    if "no-cache" in req.headers.get("Cache-Control", "").lower():
+        set_cache_bypass()
 
 
 @app.post("/agent/start", response_model=AgentState, status_code=201)
-def start_agent(body: GoalRequest, req: Request):
+async def start_agent(body: GoalRequest, req: Request):
     """
     Initialize a new agent session and generate the research plan.
     Validates research goal for prompt injection attacks.
     Returns the full AgentState with tasks populated.
-    Optional headers: X-OpenAI-API-Key, X-Tavily-API-Key (override env vars).
+    Optional headers: X-OpenAI-API-Key, X-Tavily-API-Key (override env vars),
+    Cache-Control: no-cache (skip cached results).
     """
-    _apply_api_key_headers(req)
+    _apply_request_headers(req)
     try:
         validated_goal = validate_goal(body.goal)
     except PromptInjectionError as e:
@@ -107,10 +252,12 @@ def start_agent(body: GoalRequest, req: Request):
 
     state = AgentState(goal=validated_goal)
     state.mode = "plan"
-    tasks = generate_plan(validated_goal, state.session_id)
+    set_session_id(state.session_id)
+    cassette.note_session(state.session_id, validated_goal)
+    tasks = await generate_plan_async(validated_goal, state.session_id)
     state.tasks = tasks
     state.mode = "execute"
-    save_session(state)
+    await save_session_async(state, flush=True)
     return state
 
 
@@ -125,7 +272,8 @@ def get_session(session_id: str):
     state = load_session(session_id)
     if state is None:
         raise HTTPException(status_code=404, detail="Session not found")
-    return state
+    # Polled by the UI: serialize once in pydantic-core instead of re-validating via response_model
+    return Response(content=dump_state(state), media_type="application/json")
 
 
 # ---------------------------------------------------------------------------
@@ -133,20 +281,97 @@ def get_session(session_id: str):
 # ---------------------------------------------------------------------------
 
 
-@app.get("/agent/{session_id}/report")
-def get_report(session_id: str):
-    """Return raw markdown content for a completed session's report."""
+_SESSION_ID = re.compile(r"[\w-]+")
+
+
+def _report_file(session_id: str) -> Path:
+    """The report on disk: REPORTS_DIR/{id}.md, else the session's recorded path (older sessions)."""
+    if _SESSION_ID.fullmatch(session_id):
+        path = REPORTS_DIR / f"{session_id}.md"
+        if path.is_file():
+            return path
     state = load_session(session_id)
     if state is None:
         raise HTTPException(status_code=404, detail="Session not found")
     if not state.final_report_path:
         raise HTTPException(status_code=404, detail="Report not yet generated")
-    report_paths = [Path(state.final_report_path), REPORTS_DIR / f"{session_id}.md"]
-    for path in report_paths:
-        if path.exists():
-            content = path.read_text(encoding="utf-8")
-            return Response(content=content, media_type="text/markdown")
-    raise HTTPException(status_code=404, detail="Report file not found")
+    path = Path(state.final_report_path)
+    if not path.is_file():
+        raise HTTPException(status_code=404, detail="Report file not found")
+    return path
+
+
+def _report_etag(stat: os.stat_result, encoding: str | None = None) -> str:
+    # Reports are written once, atomically: size + mtime identify the bytes
+    tag = f"{stat.st_size:x}-{stat.st_mtime_ns:x}"
+    return f'"{tag}-{encoding}"' if encoding else f'"{tag}"'
+
+
+def _accepted_encodings(accept_encoding: str) -> set[str]:
+    """Codings the client accepts (q > 0) from an Accept-Encoding header."""
+    accepted = set()
+    for item in accept_encoding.split(","):
+        coding, _, params = item.strip().partition(";")
+        q = params.strip().removeprefix("q=")
+        try:
+            if params and float(q) <= 0:
+                continue
+        except ValueError:
+            continue
+        accepted.add(coding.strip().lower())
+    return accepted
+
+
+def _etag_matches(if_none_match: str, etags: list[str]) -> bool:
+    """If-None-Match uses weak comparison: W/ prefixes are ignored."""
+    if if_none_match.strip() == "*":
+        return True
+    candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return any(etag in candidates for etag in etags)
+
+
+@app.get("/agent/{session_id}/report")
+def get_report(session_id: str, req: Request):
+    """
+    Return raw markdown content for a completed session's report, streamed
+    from REPORTS_DIR without loading the session. Sends a strong ETag and
+    Last-Modified, answers If-None-Match/If-Modified-Since with 304, serves
+    the precompressed gzip/brotli copy when Accept-Encoding allows, and
+    supports Range requests (on the uncompressed file).
+    """
+    path = _report_file(session_id)
+    stat = path.stat()
+    variants: list[tuple[str | None, Path, os.stat_result]] = []
+    if "range" not in req.headers:
+        accepted = _accepted_encodings(req.headers.get("Accept-Encoding", ""))
+        for encoding, suffix in REPORT_ENCODINGS.items():
+            copy = path.with_name(path.name + suffix)
+            if encoding in accepted and copy.is_file():
+                copy_stat = copy.stat()
+                if copy_stat.st_mtime_ns >= stat.st_mtime_ns:
+                    variants.append((encoding, copy, copy_stat))
+    variants.append((None, path, stat))
+    encoding, served, served_stat = variants[0]
+
+    headers = {
+        "ETag": _report_etag(stat, encoding),
+        "Last-Modified": formatdate(stat.st_mtime, usegmt=True),
+        "Cache-Control": "no-cache",
+        "Vary": "Accept-Encoding",
+    }
+    if_none_match = req.headers.get("If-None-Match")
+    if if_none_match is not None:
+        if _etag_matches(if_none_match, [_report_etag(stat, e) for e, _, _ in variants]):
+            return Response(status_code=304, headers=headers)
+    elif (since := req.headers.get("If-Modified-Since")) is not None:
+        try:
+            if int(stat.st_mtime) <= parsedate_to_datetime(since).timestamp():
+                return Response(status_code=304, headers=headers)
+        except (TypeError, ValueError):
+            pass
+    if encoding is not None:
+        headers["Content-Encoding"] = encoding
+    return FileResponse(served, media_type="text/markdown", headers=headers, stat_result=served_stat)
 
 
 # ---------------------------------------------------------------------------
@@ -154,30 +379,67 @@ def get_report(session_id: str):
 # ---------------------------------------------------------------------------
 
 
-@app.post("/agent/{session_id}/execute", response_model=ExecuteResponse)
-def execute_step(session_id: str, req: Request):
+async def _finish_session(state: AgentState, on_event: EventCallback | None = None) -> str:
+    """Generate the final report, mark the session done and persist it."""
+    report_path = await generate_final_report_async(state, on_event)
+    state.final_report_path = report_path
+    state.is_active = False
+    state.mode = "done"
+    await _save_results(state)
+    return report_path
+
+
+async def _save_results(state: AgentState) -> None:
     """
-    Execute the next pending task in the session.
-    Designed for step-by-step execution (the frontend calls this repeatedly).
-    Optional headers: X-OpenAI-API-Key, X-Tavily-API-Key (override env vars).
+    Write a save that records step results before the step reports success:
+    a deferred save could still be lost to a conflict or a crash after the
+    client saw the result. A conflict (another request or worker saved the
+    session meanwhile) is a 409.
     """
-    _apply_api_key_headers(req)
-    state = load_session(session_id)
+    try:
+        await save_session_async(state, flush=True)
+    except SessionConflictError as e:
+        raise HTTPException(status_code=409, detail=str(e)) from e
+
+
+async def _load_active_session(session_id: str) -> AgentState:
+    state = await load_session_async(session_id)
     if state is None:
         raise HTTPException(status_code=404, detail="Session not found")
     if not state.is_active:
         raise HTTPException(status_code=400, detail="Session is already complete")
+    return state
+
+
+async def _reset_interrupted_tasks(state: AgentState, job_id: str) -> None:
+    """
+    Put tasks left in_progress by a step that died (crash, restart) back to
+    pending, so the next step runs them again instead of skipping them. Only
+    when job_id (the job about to run, queued or inline) is the session's one
+    active job: every step holds a job lease while it runs, in any process.
+    """
+    active = await async_job_store.active(state.session_id)
+    if active is not None and active.job_id != job_id:
+        return
+    for task in state.tasks:
+        if task.status == "in_progress":
+            task.status = "pending"
 
+
+async def _execute_next(state: AgentState, on_event: EventCallback | None = None) -> ExecuteResponse:
+    """Run the next pending task (or the final report) for an active session."""
+    set_session_id(state.session_id)
+    with step_in_flight(state.session_id):
+        return await _run_next(state, on_event)
+
+
+async def _run_next(state: AgentState, on_event: EventCallback | None) -> ExecuteResponse:
     # Find the next pending task
     pending_tasks = [t for t in state.tasks if t.status == "pending"]
 
     if not pending_tasks:
         # All tasks done — generate report
-        report_path = generate_final_report(state)
-        state.final_report_path = report_path
-        state.is_active = False
-        state.mode = "done"
-        save_session(state)
+        report_path = await _finish_session(state, on_event)
         return ExecuteResponse(
             session_id=state.session_id,
             current_step=state.current_step,
@@ -191,15 +453,26 @@ def execute_step(session_id: str, req: Request):
     # Set in_progress and save BEFORE executing search. A crash during search_web()
     # leaves the task in a recoverable in_progress state, not a phantom "pending".
     task.status = "in_progress"
-    save_session(state)
+    try:
+        await save_session_async(state, flush=True)
+    except SessionConflictError as e:
+        # Another request or worker already started a step from the same version
+        raise HTTPException(status_code=409, detail=str(e)) from e
 
     try:
-        executed_task = execute_task(task, state)
+        executed_task = await execute_task_async(task, state, on_event)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e)) from e
+    except CircuitOpenError as e:
+        # Failed fast before the upstream was called: the task can simply run again later
+        task.status = "pending"
+        await save_session_async(state, flush=True)
+        raise HTTPException(
+            status_code=503, detail=str(e), headers={"Retry-After": str(math.ceil(e.retry_after))},
+        ) from e
     except Exception as e:
         task.status = "failed"
-        save_session(state)
+        await save_session_async(state, flush=True)
         msg = str(e) if str(e) else "Task execution failed"
         raise HTTPException(status_code=500, detail=f"Task execution failed: {msg}") from e
 
@@ -210,7 +483,7 @@ def execute_step(session_id: str, req: Request):
             break
 
     state.current_step += 1
-    save_session(state)
+    await _save_results(state)
 
     return ExecuteResponse(
         session_id=state.session_id,
@@ -221,15 +494,454 @@ def execute_step(session_id: str, req: Request):
     )
 
 
+# Header API keys of jobs queued by this process. They are never written to the job
+# database, only job.request_keys is: a job run by another process (or after a
+# restart) fails instead of silently using that process's env keys. Entries of
+# jobs that another process claimed are dropped once the job is seen finished,
+# or when the map is full (oldest first).
+_job_api_keys: OrderedDict[str, dict] = OrderedDict()
+_MAX_JOB_API_KEYS = 10_000
+
+_MISSING_REQUEST_KEYS = (
+    "This step was queued with API keys from request headers, which only the API process "
+    "that queued it holds (it restarted, or a separate worker took the job). Send it again."
+)
+
+
+async def run_step_job(job: Job) -> dict:
+    """Job handler (see app.jobs): run one execution step and return its ExecuteResponse."""
+    try:
+        if job.request_keys:
+            keys = _job_api_keys.get(job.job_id)
+            if keys is None:
+                raise HTTPException(status_code=409, detail=_MISSING_REQUEST_KEYS)
+            set_api_keys(openai_key=keys.get("openai"), tavily_key=keys.get("tavily"))
+        set_cache_bypass(job.no_cache)
+        state = await _load_active_session(job.session_id)
+        # An earlier attempt (or a step whose process died) was interrupted mid-step
+        await _reset_interrupted_tasks(state, job.job_id)
+        try:
+            result = await _execute_next(state)
+        except SessionConflictError as e:
+            raise HTTPException(status_code=409, detail=str(e)) from e
+        return result.model_dump()
+    finally:
+        _job_api_keys.pop(job.job_id, None)
+
+
+job_pool = JobWorkerPool(job_store, run_step_job, JOB_WORKERS)
+
+
+@app.post("/agent/{session_id}/execute", response_model=Job, status_code=202)
+async def execute_step(session_id: str, req: Request, response: Response):
+    """
+    Queue the next pending task in the session (or the final report) and
+    return 202 with the job; poll GET /jobs/{job_id} for its result (an
+    ExecuteResponse). A session runs one step at a time: while a job is
+    queued or running, the same job is returned.
+    Designed for step-by-step execution (the frontend calls this repeatedly).
+    Optional headers: X-OpenAI-API-Key, X-Tavily-API-Key (override env vars),
+    Cache-Control: no-cache (skip cached results), Idempotency-Key (a retried
+    request with the same key returns the job it got the first time, with its
+    stored result, instead of running another step), X-Profile (profile the
+    step; see app.timing).
+    """
+    idempotency_key = req.headers.get("Idempotency-Key") or None
+    job = await async_job_store.find(session_id, idempotency_key) if idempotency_key else None
+    if job is not None:
+        response.headers["Location"] = f"/jobs/{job.job_id}"
+        return job
+    await _load_active_session(session_id)
+    keys = {
+        "openai": req.headers.get("X-OpenAI-API-Key"),
+        "tavily": req.headers.get("X-Tavily-API-Key"),
+    }
+    request_keys = any(keys.values())
+    if request_keys and JOB_WORKERS <= 0:
+        raise HTTPException(
+            status_code=400,
+            detail="API key headers need in-process job workers (LEXAGENT_JOB_WORKERS > 0); "
+            "separate workers only use the keys in their environment",
+        )
+    no_cache = "no-cache" in req.headers.get("Cache-Control", "").lower()
+    job, created = await async_job_store.enqueue(
+        session_id,
+        no_cache=no_cache,
+        idempotency_key=idempotency_key,
+        profile=profile_requested(req.headers),
+        request_keys=request_keys,
+    )
+    if created:
+        if request_keys:
+            _job_api_keys[job.job_id] = keys
+            while len(_job_api_keys) > _MAX_JOB_API_KEYS:
+                _job_api_keys.popitem(last=False)
+        job_pool.notify()
+    response.headers["Location"] = f"/jobs/{job.job_id}"
+    return job
+
+
+# ---------------------------------------------------------------------------
+# GET /jobs/{job_id}
+# ---------------------------------------------------------------------------
+
+
+@app.get("/jobs/{job_id}", response_model=Job)
+async def get_job(job_id: str, wait: float = Query(default=0, ge=0, le=30)):
+    """
+    Status of a queued step: queued, running, succeeded (result holds the
+    ExecuteResponse) or failed (status_code and error). With wait=N the
+    request is held up to N seconds until the job finishes (long polling).
+    A finished job's per-stage durations are added to Server-Timing as job-<stage>.
+    """
+    deadline = time.monotonic() + wait
+    while True:
+        finished = job_pool.finished_event(job_id)
+        job = await async_job_store.get(job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail="Job not found")
+        if job.status in ("succeeded", "failed"):
+            _job_api_keys.pop(job_id, None)  # in case another process ran it
+        if job.status in ("succeeded", "failed") or time.monotonic() >= deadline:
+            if job.timings:
+                record_job(job.timings)
+            return job
+        remaining = max(deadline - time.monotonic(), 0)
+        # A worker of this process wakes us as soon as the job finishes; a job that
+        # another process (python -m app.worker) may run is polled
+        timeout = remaining if job_pool.running(job_id) else min(JOB_POLL_INTERVAL, remaining)
+        try:
+            await asyncio.wait_for(finished.wait(), timeout)
+        except TimeoutError:
+            pass
+
+
+@app.get("/agent/{session_id}/jobs", response_model=list[Job])
+def list_session_jobs(session_id: str, limit: int = Query(default=20, ge=1, le=200)):
+    """Most recent jobs of a session, newest first."""
+    return job_store.list_for_session(session_id, limit=limit)
+
+
+# ---------------------------------------------------------------------------
+# Steps run inside the request (stream, execute-all)
+# ---------------------------------------------------------------------------
+
+# Holder of this process's inline job leases (see app.jobs)
+_INLINE_WORKER = f"{socket.gethostname()}:{os.getpid()}:inline"
+
+
+async def _start_inline_step(session_id: str) -> Job:
+    """Record a step run by this request as the session's active job; 409 if it has one."""
+    job = await async_job_store.start_inline(session_id, _INLINE_WORKER, JOB_LEASE_SECONDS)
+    if job is None:
+        raise HTTPException(
+            status_code=409,
+            detail="Another step of this session is queued or running; retry when it has finished",
+        )
+    return job
+
+
+async def _run_inline_step(job: Job, step: Awaitable) -> ExecuteResponse | ExecuteAllResponse:
+    """Await the step while keeping the inline job's lease, then finish the job with its outcome."""
+    lease = asyncio.create_task(
+        keep_lease(async_job_store, job.job_id, _INLINE_WORKER, JOB_LEASE_SECONDS),
+    )
+    try:
+        result = await step
+    except Exception as e:
+        await _fail_inline_step(job, e)
+        raise
+    finally:
+        lease.cancel()
+    await async_job_store.complete(job.job_id, _INLINE_WORKER, result.model_dump(), None)
+    return result
+
+
+async def _fail_inline_step(job: Job, error: Exception) -> None:
+    detail = getattr(error, "detail", None) or str(error) or "Step execution failed"
+    status_code = getattr(error, "status_code", 500)
+    await async_job_store.fail(job.job_id, _INLINE_WORKER, status_code, str(detail), None)
+
+
+# ---------------------------------------------------------------------------
+# POST /agent/{session_id}/execute/stream
+# ---------------------------------------------------------------------------
+
+# Strong references to in-flight streamed steps, so a client disconnect does not
+# let the step be garbage-collected half way through.
+_stream_tasks: set[asyncio.Task] = set()
+
+
+def _sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@app.post("/agent/{session_id}/execute/stream")
+async def execute_step_stream(session_id: str, req: Request):
+    """
+    Same as POST /execute, but responds with Server-Sent Events as the step runs:
+    query_refined, search_completed, compressed, reflected, token (compress and
+    report output as it is generated), then a final done (ExecuteResponse) or
+    error ({status_code, detail}) event.
+    The step runs to completion even if the client disconnects.
+    Optional headers: X-OpenAI-API-Key, X-Tavily-API-Key (override env vars),
+    Cache-Control: no-cache (skip cached results). Idempotency-Key is not
+    supported: the step is not queued, so a retry runs another step.
+    409 while another step of the session is queued or running.
+    """
+    _apply_request_headers(req)
+    job = await _start_inline_step(session_id)
+    try:
+        state = await _load_active_session(session_id)
+        await _reset_interrupted_tasks(state, job.job_id)
+    except Exception as e:
+        await _fail_inline_step(job, e)
+        raise
+    queue: asyncio.Queue[tuple[str, dict] | None] = asyncio.Queue()
+
+    async def on_event(event: str, data: dict) -> None:
+        await queue.put((event, data))
+
+    async def run_step() -> None:
+        try:
+            result = await _run_inline_step(job, _execute_next(state, on_event))
+            await queue.put(("done", result.model_dump()))
+        except HTTPException as e:
+            await queue.put(("error", {"status_code": e.status_code, "detail": e.detail}))
+        except Exception as e:
+            detail = str(e) or "Step execution failed"
+            await queue.put(("error", {"status_code": 500, "detail": detail}))
+        finally:
+            await queue.put(None)
+
+    step = asyncio.create_task(run_step())
+    _stream_tasks.add(step)
+    step.add_done_callback(_stream_tasks.discard)
+
+    async def events():
+        while (item := await queue.get()) is not None:
+            yield _sse_event(*item)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+# ---------------------------------------------------------------------------
+# POST /agent/{session_id}/execute-all
+# ---------------------------------------------------------------------------
+
+
+@app.post("/agent/{session_id}/execute-all", response_model=ExecuteAllResponse)
+async def execute_all(
+    session_id: str,
+    req: Request,
+    parallelism: int | None = Query(default=None, ge=1, le=16),
+):
+    """
+    Execute every pending task concurrently (at most `parallelism` at a time,
+    default LEXAGENT_MAX_PARALLEL_TASKS), then generate the final report.
+    Wall time is close to the slowest task rather than the sum of all tasks.
+    Optional headers: X-OpenAI-API-Key, X-Tavily-API-Key (override env vars),
+    Cache-Control: no-cache (skip cached results). Idempotency-Key is not
+    supported; a retry after the report is written gets 400 (session complete).
+    409 while another step of the session is queued or running.
+    """
+    _apply_request_headers(req)
+    job = await _start_inline_step(session_id)
+    return await _run_inline_step(job, _execute_all(session_id, job, parallelism))
+
+
+async def _execute_all(session_id: str, job: Job, parallelism: int | None) -> ExecuteAllResponse:
+    state = await _load_active_session(session_id)
+    await _reset_interrupted_tasks(state, job.job_id)
+
+    set_session_id(state.session_id)
+    pending_tasks = [t for t in state.tasks if t.status == "pending"]
+    # Same crash-safety as execute_step: persist in_progress before any search runs.
+    for task in pending_tasks:
+        task.status = "in_progress"
+    await save_session_async(state, flush=True)
+
+    with step_in_flight(state.session_id, steps=len(pending_tasks) + 1):
+        errors = await execute_tasks_async(pending_tasks, state, parallelism=parallelism)
+        state.current_step += sum(1 for e in errors if e is None)
+        await _save_results(state)
+
+        if pending_tasks and all(e is not None for e in errors):
+            msg = str(errors[0]) or "Task execution failed"
+            raise HTTPException(status_code=500, detail=f"Task execution failed: {msg}")
+
+        report_path = await _finish_session(state)
+    failed = sum(1 for e in errors if e is not None)
+    message = f"Executed {len(pending_tasks) - failed} task(s). Report saved to {report_path}"
+    if failed:
+        message += f" ({failed} failed)"
+    return ExecuteAllResponse(
+        session_id=state.session_id,
+        current_step=state.current_step,
+        tasks_executed=pending_tasks,
+        is_done=True,
+        message=message,
+    )
+
+
+# ---------------------------------------------------------------------------
+# POST /plans
+# ---------------------------------------------------------------------------
+
+
+@app.post("/plans", status_code=201)
+def seed_plan(body: PlanSeedRequest, req: Request):
+    """
+    Pre-seed the plan cache for a common goal, so POST /agent/start for that
+    goal (or a near-verbatim copy) skips the planning LLM call.
+    Requires X-Admin-Token: <LEXAGENT_ADMIN_TOKEN> (404 when that is unset).
+    Seeded tasks reach the executor and report prompts of every matching
+    session, so their titles and descriptions are validated like user input.
+    """
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    token = req.headers.get("X-Admin-Token", "").encode("utf-8")
+    if not secrets.compare_digest(token, ADMIN_TOKEN.encode("utf-8")):
+        raise HTTPException(status_code=401, detail="Invalid or missing X-Admin-Token")
+    try:
+        validated_goal = validate_goal(body.goal)
+    except PromptInjectionError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid goal: {str(e)}") from e
+    for i, task in enumerate(body.tasks, start=1):
+        try:
+            task.title = validate_task_description(task.title)
+            task.description = validate_task_description(task.description)
+        except PromptInjectionError as e:
+            raise HTTPException(status_code=400, detail=f"Invalid task {i}: {str(e)}") from e
+    key = cache_plan(validated_goal, body.tasks, ttl_seconds=body.ttl_seconds)
+    return {"goal_key": key, "tasks": len(body.tasks)}
+
+
+# ---------------------------------------------------------------------------
+# GET /cache/stats
+# ---------------------------------------------------------------------------
+
+
+@app.get("/cache/stats")
+def cache_stats():
+    """Hit/miss counters and size of the in-process caches."""
+    return {
+        "search": search_cache.stats(),
+        "llm": llm_cache.stats(),
+        "plan": plan_cache.stats(),
+    }
+
+
+# ---------------------------------------------------------------------------
+# GET /resilience/stats
+# ---------------------------------------------------------------------------
+
+
+@app.get("/resilience/stats")
+def get_resilience_stats():
+    """Circuit breaker state per upstream; calls, retries, hedges and p95 latency per stage."""
+    return resilience_stats()
+
+
+# ---------------------------------------------------------------------------
+# GET /metrics
+# ---------------------------------------------------------------------------
+
+
+def _cache_requests():
+    for name, cache in _METRIC_CACHES.items():
+        stats = cache.stats()
+        yield {"cache": name, "result": "hit"}, stats["hits"]
+        yield {"cache": name, "result": "miss"}, stats["misses"]
+
+
+def _upstream_calls():
+    for stage, stats in resilience_stats()["stages"].items():
+        for outcome in ("retries", "hedges", "deadline_exceeded", "failures", "rejected"):
+            yield {"stage": stage, "outcome": outcome}, stats[outcome]
+
+
+_METRIC_CACHES = {"search": search_cache, "llm": llm_cache, "plan": plan_cache}
+_BREAKER_STATES = {"closed": 0, "half-open": 1, "open": 2}
+
+registry.register(CallbackMetric(
+    "lexagent_cache_requests_total", "Cache lookups by cache and result", "counter",
+    _cache_requests,
+))
+registry.register(CallbackMetric(
+    "lexagent_cache_entries", "Entries held per cache", "gauge",
+    lambda: (({"cache": name}, c.stats()["size"]) for name, c in _METRIC_CACHES.items()),
+))
+registry.register(CallbackMetric(
+    "lexagent_upstream_events_total",
+    "Retries, hedges, deadline misses, failures and breaker rejections per stage", "counter",
+    _upstream_calls,
+))
+registry.register(CallbackMetric(
+    "lexagent_circuit_state", "Circuit breaker state per upstream (0 closed, 1 half-open, 2 open)",
+    "gauge",
+    lambda: (
+        ({"upstream": name}, _BREAKER_STATES[b["state"]])
+        for name, b in resilience_stats()["breakers"].items()
+    ),
+))
+registry.register(CallbackMetric(
+    "lexagent_jobs", "Jobs in the queue database by status", "gauge",
+    lambda: (({"status": status}, n) for status, n in sorted(job_store.counts().items())),
+))
+
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    """Prometheus text exposition of this process's stage latencies, tokens, caches and queue."""
+    return Response(render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
 # ---------------------------------------------------------------------------
 # GET /sessions
 # ---------------------------------------------------------------------------
 
 
-@app.get("/sessions", response_model=list[AgentState])
-def get_sessions():
-    """List all stored agent sessions."""
-    return list_sessions()
+def _iso_utc(value: datetime | None) -> str | None:
+    """Match the naive-UTC isoformat used for AgentState.created_at."""
+    if value is None:
+        return None
+    if value.tzinfo is not None:
+        value = value.astimezone(UTC).replace(tzinfo=None)
+    return value.isoformat()
+
+
+@app.get("/sessions", response_model=SessionPage)
+def get_sessions(
+    limit: int = Query(default=50, ge=1, le=200),
+    cursor: str | None = None,
+    order: Literal["asc", "desc"] = "desc",
+    mode: Literal["plan", "execute", "done"] | None = None,
+    active: bool | None = None,
+    created_after: datetime | None = None,
+    created_before: datetime | None = None,
+):
+    """
+    List stored agent sessions as lightweight summaries, one page at a time
+    (sorted by created_at). Pass next_cursor back as cursor for the next page.
+    Filters: mode, active, created_after (inclusive), created_before (exclusive).
+    """
+    try:
+        return list_session_summaries(
+            limit=limit,
+            cursor=cursor,
+            order=order,
+            mode=mode,
+            is_active=active,
+            created_after=_iso_utc(created_after),
+            created_before=_iso_utc(created_before),
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
 
 
 # ---------------------------------------------------------------------------
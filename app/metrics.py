@@ -0,0 +1,232 @@
+"""
+In-process metrics in the Prometheus text format, served by GET /metrics.
+Works without Langfuse (or any network): counters, gauges and histograms live
+in memory and are rendered on scrape. Values are per process; with several
+uvicorn workers or `python -m app.worker` processes, scrape each one.
+"""
+
+import threading
+import time
+from collections.abc import Callable, Iterable
+from contextlib import contextmanager
+
+from app import timing
+
+# Seconds; covers cache hits and disk I/O up to a slow report generation
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+
+Sample = tuple[dict[str, str], float]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(str(v))}"' for k, v in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labelnames: tuple[str, ...] = ()) -> None:
+        self.name = name
+        self.help = help_text
+        self.labelnames = labelnames
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def header(self) -> list[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labelnames: tuple[str, ...] = ()) -> None:
+        super().__init__(name, help_text, labelnames)
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> list[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return self.header() + [
+            f"{self.name}{_format_labels(dict(zip(self.labelnames, key, strict=True)))} "
+            f"{_format_value(value)}"
+            for key, value in items
+        ]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, amount: float = 1, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # per label set: [count per bucket..., sum, count]
+        self._values: dict[tuple[str, ...], list[float]] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            row = self._values.get(key)
+            if row is None:
+                row = self._values[key] = [0.0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    row[i] += 1
+                    break
+            row[-2] += value
+            row[-1] += 1
+
+    def render(self) -> list[str]:
+        with self._lock:
+            items = sorted((key, list(row)) for key, row in self._values.items())
+        lines = self.header()
+        for key, row in items:
+            labels = dict(zip(self.labelnames, key, strict=True))
+            cumulative = 0.0
+            for bound, count in zip(self.buckets, row, strict=False):
+                cumulative += count
+                bucket = _format_labels({**labels, "le": _format_value(bound)})
+                lines.append(f"{self.name}_bucket{bucket} {_format_value(cumulative)}")
+            bucket = _format_labels({**labels, "le": "+Inf"})
+            lines.append(f"{self.name}_bucket{bucket} {_format_value(row[-1])}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {_format_value(row[-2])}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {_format_value(row[-1])}")
+        return lines
+
+
+class CallbackMetric(_Metric):
+    """A counter or gauge read from elsewhere (cache stats, the job queue) at scrape time."""
+
+    def __init__(self, name: str, help_text: str, kind: str, collect: Callable[[], Iterable[Sample]]):
+        super().__init__(name, help_text)
+        self.kind = kind
+        self.collect = collect
+
+    def render(self) -> list[str]:
+        return self.header() + [
+            f"{self.name}{_format_labels(labels)} {_format_value(value)}"
+            for labels, value in self.collect()
+        ]
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        lines: list[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+stage_seconds = registry.register(Histogram(
+    "lexagent_stage_duration_seconds",
+    "Latency of agent stages (LLM prompts by trace name, search, session storage)",
+    ("stage",),
+))
+stage_errors = registry.register(Counter(
+    "lexagent_stage_errors_total", "Stage calls that raised, by exception type", ("stage", "error"),
+))
+llm_tokens = registry.register(Counter(
+    "lexagent_llm_tokens_total", "OpenAI token usage by stage", ("stage", "kind"),
+))
+sessions_in_flight = registry.register(Gauge(
+    "lexagent_sessions_in_flight", "Sessions with a step or report currently running",
+))
+steps_in_flight = registry.register(Gauge(
+    "lexagent_steps_in_flight", "Tasks and reports currently executing",
+))
+
+
+@contextmanager
+def track_stage(stage: str):
+    """
+    Time a stage into lexagent_stage_duration_seconds (and the request's
+    Server-Timing, see app.timing) and count its exceptions.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception as e:
+        stage_errors.inc(stage=stage, error=type(e).__name__)
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        stage_seconds.observe(elapsed, stage=stage)
+        timing.record(stage, elapsed)
+
+
+def record_usage(stage: str, usage) -> None:
+    """Add an OpenAI response's usage (prompt/completion tokens) to lexagent_llm_tokens_total."""
+    if usage is None:
+        return
+    llm_tokens.inc(getattr(usage, "prompt_tokens", 0) or 0, stage=stage, kind="prompt")
+    llm_tokens.inc(getattr(usage, "completion_tokens", 0) or 0, stage=stage, kind="completion")
+
+
+_running: dict[str, int] = {}
+_running_lock = threading.Lock()
+
+
+@contextmanager
+def step_in_flight(session_id: str, steps: int = 1):
+    """Count `steps` running steps of a session in the in-flight gauges."""
+    with _running_lock:
+        _running[session_id] = _running.get(session_id, 0) + 1
+        sessions_in_flight.set(len(_running))
+    steps_in_flight.inc(steps)
+    try:
+        yield
+    finally:
+        steps_in_flight.dec(steps)
+        with _running_lock:
+            _running[session_id] -= 1
+            if not _running[session_id]:
+                del _running[session_id]
+            sessions_in_flight.set(len(_running))
+
+
+def render_metrics() -> str:
+    return registry.render()
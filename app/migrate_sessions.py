@@ -0,0 +1,45 @@
+"""
+One-shot migration of JSON session files into the SQLite session store.
+Reads every DATA_DIR/*.json and upserts it into LEXAGENT_DB_PATH, so it is
+safe to re-run. The JSON files are left in place.
+
+Usage:
+    uv run python -m app.migrate_sessions
+    # then run the server with LEXAGENT_STORAGE=sqlite
+"""
+
+import json
+
+from app.models import AgentState
+from app.sqlite_store import SqliteSessionStore
+from app.storage import DATA_DIR, DB_PATH
+
+
+def migrate_json_sessions() -> tuple[int, list[str]]:
+    """Copy all JSON sessions into SQLite. Returns (migrated count, files that failed)."""
+    store = SqliteSessionStore(DB_PATH)
+    migrated = 0
+    failed = []
+    for file in sorted(DATA_DIR.glob("*.json")):
+        try:
+            with open(file, encoding="utf-8") as f:
+                state = AgentState(**json.load(f))
+        except (OSError, ValueError) as e:
+            failed.append(f"{file.name}: {e}")
+            continue
+        existing = store.load(state.session_id)
+        if existing is not None:
+            # Re-run: the JSON copy deliberately overwrites the migrated one
+            state.version = existing.version
+        store.save(state)
+        migrated += 1
+    return migrated, failed
+
+
+if __name__ == "__main__":
+    print(f"Migrating sessions from {DATA_DIR} to {DB_PATH} ...")
+    count, errors = migrate_json_sessions()
+    print(f"✅ Migrated {count} session(s)")
+    for err in errors:
+        print(f"❌ Skipped {err}")
+    print("Set LEXAGENT_STORAGE=sqlite to use the SQLite store.")
@@ -21,6 +21,9 @@ class AgentState(BaseModel):
     goal: str
     tasks: list[Task] = Field(default_factory=list)
     context_notes: list[str] = Field(default_factory=list)
+    # Rolling summary of the first `summarized_notes` context_notes (see app/context_budget.py)
+    context_summary: str | None = None
+    summarized_notes: int = 0
     current_step: int = 0
     is_active: bool = True
     mode: Literal["plan", "execute", "done"] = "plan"
@@ -28,15 +31,81 @@ class AgentState(BaseModel):
     created_at: str = Field(
         default_factory=lambda: datetime.utcnow().isoformat()
     )
+    # Number of times the session has been saved; a save is rejected with
+    # SessionConflictError if the stored version moved on since this copy was loaded.
+    version: int = 0
+
+
+class SessionConflictError(Exception):
+    """The session was saved by another request (or worker) after this copy was loaded."""
+
+    def __init__(self, session_id: str) -> None:
+        super().__init__(f"Session {session_id} was modified by another request; reload and retry")
+        self.session_id = session_id
+
+
+class SessionSummary(BaseModel):
+    """Lightweight projection of AgentState used by GET /sessions."""
+
+    session_id: str
+    goal: str
+    mode: Literal["plan", "execute", "done"]
+    current_step: int
+    is_active: bool
+    created_at: str
+
+
+class SessionPage(BaseModel):
+    items: list[SessionSummary]
+    next_cursor: str | None = None
 
 
 class GoalRequest(BaseModel):
     goal: str
 
 
+class PlanTask(BaseModel):
+    title: str
+    description: str
+
+
+class PlanSeedRequest(BaseModel):
+    goal: str
+    tasks: list[PlanTask] = Field(min_length=1)
+    ttl_seconds: float | None = None
+
+
 class ExecuteResponse(BaseModel):
     session_id: str
     current_step: int
     task_executed: Task | None = None
     is_done: bool
     message: str
+
+
+class ExecuteAllResponse(BaseModel):
+    session_id: str
+    current_step: int
+    tasks_executed: list[Task] = Field(default_factory=list)
+    is_done: bool
+    message: str
+
+
+class Job(BaseModel):
+    """A queued execution step (POST /agent/{id}/execute); see app.jobs."""
+
+    job_id: str
+    session_id: str
+    status: Literal["queued", "running", "succeeded", "failed"]
+    attempts: int = 0
+    no_cache: bool = False
+    profile: bool = False
+    # Queued with API keys from request headers (held only by the queuing process)
+    request_keys: bool = False
+    result: ExecuteResponse | None = None
+    error: str | None = None
+    status_code: int | None = None
+    timings: dict[str, float] | None = None  # milliseconds per stage of the last attempt
+    created_at: str
+    started_at: str | None = None
+    finished_at: str | None = None
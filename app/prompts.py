@@ -0,0 +1,189 @@
+"""
+Local registry of the chat prompts used by the agent.
+Requests only ever read prompts from memory. The registry starts from the
+inline fallbacks, overlays the last-known-good snapshot on disk (so a cold
+start never waits on Langfuse), and a background thread re-fetches every
+prompt from Langfuse and rewrites the snapshot when something changed.
+Templates are precompiled: compile() splices the variables into pre-split
+message parts with one join, instead of a str.replace per variable per message.
+"""
+
+import json
+import logging
+import os
+import re
+import threading
+from collections.abc import Callable
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+_VARIABLE = re.compile(r"\{\{(\w+)\}\}")
+
+
+class PromptTemplate:
+    """One message template, pre-split into literal text and {{variable}} slots."""
+
+    __slots__ = ("_literals", "_names")
+
+    def __init__(self, text: str) -> None:
+        parts = _VARIABLE.split(text)
+        self._literals = parts[0::2]
+        self._names = parts[1::2]
+
+    def render(self, values: dict) -> str:
+        """Substitute variables (None -> ""); variables without a value are left as {{name}}."""
+        out = [self._literals[0]]
+        for name, literal in zip(self._names, self._literals[1:], strict=True):
+            out.append(str(values[name] or "") if name in values else f"{{{{{name}}}}}")
+            out.append(literal)
+        return "".join(out)
+
+
+class RegisteredPrompt:
+    """
+    A chat prompt with precompiled templates. Exposes what the agent and the
+    Langfuse OpenAI wrapper use from a Langfuse prompt: name, version,
+    is_fallback and compile().
+    """
+
+    def __init__(
+        self,
+        name: str,
+        messages: list[dict],
+        version: int | None = None,
+        is_fallback: bool = False,
+    ) -> None:
+        self.name = name
+        self.version = version
+        self.is_fallback = is_fallback  # Langfuse OpenAI wrapper checks this to skip prompt linking
+        self.messages = messages
+        self._templates = [(m["role"], PromptTemplate(m["content"])) for m in messages]
+
+    def compile(self, **kwargs) -> list[dict]:
+        return [{"role": role, "content": t.render(kwargs)} for role, t in self._templates]
+
+
+class PromptRegistry:
+    """In-memory prompts by name, refreshed from Langfuse off the request path."""
+
+    def __init__(
+        self,
+        fallbacks: dict[str, list[dict]],
+        get_langfuse: Callable[[], object | None],
+        snapshot_path: Path,
+        refresh_interval: float,
+    ) -> None:
+        # Called on the first fetch, not here: creating the client imports Langfuse (slow)
+        self.get_langfuse = get_langfuse
+        self.snapshot_path = snapshot_path
+        self.refresh_interval = refresh_interval
+        self._prompts: dict[str, RegisteredPrompt] = {
+            name: RegisteredPrompt(name, messages, is_fallback=True)
+            for name, messages in fallbacks.items()
+        }
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._refresher: threading.Thread | None = None
+        self._load_snapshot()
+
+    def get(self, name: str) -> RegisteredPrompt:
+        """Current prompt for name; never touches the network for known prompts."""
+        prompt = self._prompts.get(name)
+        if prompt is None:
+            # Not a known prompt: fetch it once synchronously, then it is refreshed like the rest
+            prompt = self._fetch(name)
+            if prompt is None:
+                raise KeyError(name)
+            with self._lock:
+                self._prompts[name] = prompt
+        return prompt
+
+    def refresh(self) -> bool:
+        """Re-fetch every prompt from Langfuse; returns True if any changed (and were snapshotted)."""
+        changed = False
+        for name in list(self._prompts):
+            fetched = self._fetch(name)
+            if fetched is None:
+                continue  # keep the last known good version
+            current = self._prompts[name]
+            if (
+                current.is_fallback
+                or current.version != fetched.version
+                or current.messages != fetched.messages
+            ):
+                with self._lock:
+                    self._prompts[name] = fetched
+                changed = True
+        if changed:
+            self._write_snapshot()
+        return changed
+
+    def start(self) -> None:
+        """Start the background refresher (idempotent; no-op with interval 0 or after stop())."""
+        if self._refresher is not None or self.refresh_interval <= 0:
+            return
+        with self._lock:
+            if self._refresher is not None or self._stop.is_set():
+                return
+            self._refresher = threading.Thread(
+                target=self._run_refresher, name="prompt-refresher", daemon=True,
+            )
+            self._refresher.start()
+
+    def stop(self) -> None:
+        """Stop refreshing for good (application shutdown); prompts stay readable."""
+        self._stop.set()
+
+    # -- internals ----------------------------------------------------------
+
+    def _fetch(self, name: str) -> RegisteredPrompt | None:
+        langfuse = self.get_langfuse()
+        if langfuse is None:
+            return None
+        try:
+            prompt = langfuse.get_prompt(name, type="chat", cache_ttl_seconds=0)
+        except Exception as e:
+            logger.debug("Prompt refresh failed for %s: %s", name, e)
+            return None
+        messages = [
+            {"role": m["role"], "content": m["content"]}
+            for m in prompt.prompt
+            if m.get("type", "message") == "message"
+        ]
+        return RegisteredPrompt(name, messages, version=prompt.version)
+
+    def _run_refresher(self) -> None:
+        if self.get_langfuse() is None:
+            return  # Langfuse not configured: the fallbacks and snapshot stay in use
+        while True:
+            try:
+                self.refresh()
+            except Exception:
+                logger.exception("Prompt refresh failed; keeping current prompts")
+            if self._stop.wait(self.refresh_interval):
+                return
+
+    def _load_snapshot(self) -> None:
+        try:
+            with open(self.snapshot_path, encoding="utf-8") as f:
+                snapshot = json.load(f)
+        except (OSError, ValueError):
+            return
+        for name, entry in snapshot.items():
+            self._prompts[name] = RegisteredPrompt(name, entry["messages"], version=entry["version"])
+
+    def _write_snapshot(self) -> None:
+        snapshot = {
+            name: {"version": p.version, "messages": p.messages}
+            for name, p in self._prompts.items()
+            if not p.is_fallback
+        }
+        try:
+            self.snapshot_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.snapshot_path.with_suffix(f".{os.getpid()}.tmp")
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(snapshot, f, ensure_ascii=False)
+            os.replace(tmp, self.snapshot_path)
+        except OSError as e:
+            logger.warning("Could not write prompt snapshot %s: %s", self.snapshot_path, e)
@@ -0,0 +1,351 @@
+"""
+Deadlines, retries, hedging and circuit breakers around the OpenAI and Tavily calls.
+Every call runs under a per-stage deadline (also passed to the client as its
+request timeout). Transient failures (timeouts, connection errors, 429/5xx)
+are retried with full-jitter exponential backoff; anything else (bad key, bad
+request) is raised at once. Hedged stages send a duplicate request once the
+first has been outstanding longer than the stage's recent p95 latency and keep
+whichever answers first. Each upstream has a circuit breaker: after
+LEXAGENT_BREAKER_FAILURES consecutive transient failures calls fail fast with
+CircuitOpenError until a probe succeeds after the cooldown.
+Per-stage counters are served by GET /resilience/stats.
+"""
+
+import asyncio
+import math
+import os
+import random
+import threading
+import time
+from collections import deque
+from collections.abc import Awaitable, Callable
+from typing import TypeVar
+
+T = TypeVar("T")
+
+
+def _stage_map(raw: str) -> dict[str, float]:
+    """Parse "stage=seconds,stage=seconds"."""
+    mapping = {}
+    for item in raw.split(","):
+        stage, _, seconds = item.partition("=")
+        if stage.strip() and seconds.strip():
+            mapping[stage.strip()] = float(seconds)
+    return mapping
+
+
+# Seconds one attempt may take before it is abandoned (and retried)
+STAGE_DEADLINE = float(os.environ.get("LEXAGENT_STAGE_DEADLINE", "60"))
+STAGE_DEADLINES = _stage_map(
+    os.environ.get("LEXAGENT_STAGE_DEADLINES", "search=20,final-report=180")
+)
+# Extra attempts after a transient failure, and the backoff window
+RETRY_ATTEMPTS = int(os.environ.get("LEXAGENT_RETRY_ATTEMPTS", "2"))
+RETRY_BASE_DELAY = float(os.environ.get("LEXAGENT_RETRY_BASE_DELAY", "0.5"))
+RETRY_MAX_DELAY = float(os.environ.get("LEXAGENT_RETRY_MAX_DELAY", "8"))
+# Stages that send a duplicate request after their p95 latency (async calls only).
+# Search is cheap and idempotent; hedging LLM stages doubles their token spend.
+HEDGE_STAGES = frozenset(
+    stage.strip()
+    for stage in os.environ.get("LEXAGENT_HEDGE_STAGES", "search").split(",")
+    if stage.strip()
+)
+HEDGE_MIN_SAMPLES = 20
+LATENCY_WINDOW = 200
+BREAKER_FAILURES = int(os.environ.get("LEXAGENT_BREAKER_FAILURES", "5"))
+BREAKER_COOLDOWN = float(os.environ.get("LEXAGENT_BREAKER_COOLDOWN", "30"))
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling an upstream whose circuit breaker is open."""
+
+    def __init__(self, upstream: str, retry_after: float) -> None:
+        super().__init__(f"{upstream} is unavailable; retry in {math.ceil(retry_after)}s")
+        self.upstream = upstream
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """
+    Closed: calls pass, consecutive transient failures are counted.
+    Open: calls are rejected until the cooldown has passed.
+    Half-open: one probe call is let through; success closes, failure re-opens.
+    """
+
+    def __init__(self, name: str, failure_threshold: int, cooldown: float) -> None:
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened = 0
+        self._opened_at: float | None = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at < self.cooldown:
+            return "open"
+        return "half-open"
+
+    def before_call(self) -> None:
+        """Raise CircuitOpenError unless a call may go through now."""
+        if self.failure_threshold <= 0:
+            return
+        with self._lock:
+            if self._opened_at is None:
+                return
+            remaining = self._opened_at + self.cooldown - time.monotonic()
+            if remaining > 0 or self._probing:
+                raise CircuitOpenError(self.name, max(remaining, 0.0))
+            self._probing = True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self._probing or (
+                self._opened_at is None and 0 < self.failure_threshold <= self.failures
+            ):
+                self._opened_at = time.monotonic()
+                self.opened += 1
+            self._probing = False
+
+    def abandon(self) -> None:
+        """
+        The call was cancelled, or failed in a way that says nothing about the
+        upstream's health: let the next call probe instead.
+        """
+        with self._lock:
+            self._probing = False
+
+    def stats(self) -> dict:
+        return {"state": self.state, "consecutive_failures": self.failures, "opened": self.opened}
+
+
+class StageStats:
+    """Counters and a rolling latency window for one stage."""
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.retries = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.deadline_exceeded = 0
+        self.failures = 0
+        self.rejected = 0
+        self._latencies: deque[float] = deque(maxlen=LATENCY_WINDOW)
+
+    def observe(self, seconds: float) -> None:
+        self._latencies.append(seconds)
+
+    def p95(self) -> float | None:
+        if len(self._latencies) < HEDGE_MIN_SAMPLES:
+            return None
+        ordered = sorted(self._latencies)
+        return ordered[math.ceil(0.95 * len(ordered)) - 1]
+
+    def as_dict(self) -> dict:
+        p95 = self.p95()
+        return {
+            "calls": self.calls,
+            "retries": self.retries,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "deadline_exceeded": self.deadline_exceeded,
+            "failures": self.failures,
+            "rejected": self.rejected,
+            "p95_ms": round(p95 * 1000, 1) if p95 is not None else None,
+        }
+
+
+_stages: dict[str, StageStats] = {}
+_stages_lock = threading.Lock()
+
+
+def stage_stats(stage: str) -> StageStats:
+    with _stages_lock:
+        stats = _stages.get(stage)
+        if stats is None:
+            stats = _stages[stage] = StageStats()
+        return stats
+
+
+def deadline_for(stage: str) -> float:
+    return STAGE_DEADLINES.get(stage, STAGE_DEADLINE)
+
+
+def backoff_delay(attempt: int) -> float:
+    """Full jitter: uniform in [0, min(max delay, base * 2**attempt)]."""
+    return random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2**attempt))
+
+
+class Upstream:
+    """
+    One external service: its circuit breaker and which of its errors are
+    transient (worth a retry, and counted against the breaker).
+    """
+
+    def __init__(self, name: str, is_transient: Callable[[BaseException], bool]) -> None:
+        self.name = name
+        self.is_transient = is_transient
+        self.breaker = CircuitBreaker(name, BREAKER_FAILURES, BREAKER_COOLDOWN)
+
+    def _failed(self, exc: BaseException, stats: StageStats, attempt: int) -> bool:
+        """Record a failed attempt; True if it should be retried."""
+        if not self.is_transient(exc):
+            # The upstream answered (e.g. 401/400): the request is wrong, which says
+            # nothing about its health, so the breaker is left as it is (a probe slot
+            # is freed for the next call)
+            self.breaker.abandon()
+            stats.failures += 1
+            return False
+        self.breaker.record_failure()
+        if attempt >= RETRY_ATTEMPTS:
+            stats.failures += 1
+            return False
+        stats.retries += 1
+        return True
+
+    def _admit(self, stats: StageStats) -> None:
+        try:
+            self.breaker.before_call()
+        except CircuitOpenError:
+            stats.rejected += 1
+            raise
+
+    def call(self, stage: str, fn: Callable[[float], T]) -> T:
+        """Run fn(timeout) with retries and the breaker (no hedging: it would need a thread)."""
+        stats = stage_stats(stage)
+        stats.calls += 1
+        timeout = deadline_for(stage)
+        attempt = 0
+        while True:
+            self._admit(stats)
+            started = time.monotonic()
+            try:
+                result = fn(timeout)
+            except Exception as e:
+                if not self._failed(e, stats, attempt):
+                    raise
+            else:
+                self.breaker.record_success()
+                stats.observe(time.monotonic() - started)
+                return result
+            time.sleep(backoff_delay(attempt))
+            attempt += 1
+
+    async def call_async(self, stage: str, fn: Callable[[float], Awaitable[T]]) -> T:
+        """Run fn(timeout) under the stage deadline, with retries, hedging and the breaker."""
+        stats = stage_stats(stage)
+        stats.calls += 1
+        timeout = deadline_for(stage)
+        attempt = 0
+        while True:
+            self._admit(stats)
+            started = time.monotonic()
+            try:
+                if stage in HEDGE_STAGES:
+                    call = _hedged(fn, timeout, stats)
+                else:
+                    call = fn(timeout)
+                result = await asyncio.wait_for(call, timeout)
+            except asyncio.CancelledError:
+                self.breaker.abandon()
+                raise
+            except TimeoutError as e:
+                # asyncio.wait_for's deadline (the client's own timeout raises its own type)
+                stats.deadline_exceeded += 1
+                if not self._failed(e, stats, attempt):
+                    raise
+            except Exception as e:
+                if not self._failed(e, stats, attempt):
+                    raise
+            else:
+                self.breaker.record_success()
+                stats.observe(time.monotonic() - started)
+                return result
+            await asyncio.sleep(backoff_delay(attempt))
+            attempt += 1
+
+
+async def _hedged(fn: Callable[[float], Awaitable[T]], timeout: float, stats: StageStats) -> T:
+    """fn(timeout), plus a duplicate if the first is still running after the stage's p95."""
+    delay = stats.p95()
+    if delay is None or delay >= timeout:
+        return await fn(timeout)
+    primary = asyncio.ensure_future(fn(timeout))
+    pending = {primary}
+    try:
+        done, pending = await asyncio.wait(pending, timeout=delay)
+        if done:
+            return primary.result()
+        stats.hedges += 1
+        hedge = asyncio.ensure_future(fn(timeout - delay))
+        pending.add(hedge)
+        error: BaseException | None = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    if task is hedge:
+                        stats.hedge_wins += 1
+                    return task.result()
+                error = task.exception()
+        raise error
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+# The SDKs are imported only when an error has to be classified: by then the
+# failing client has imported them anyway (see app.clients)
+
+
+def _openai_transient(exc: BaseException) -> bool:
+    import openai
+
+    # APIConnectionError includes APITimeoutError
+    return isinstance(
+        exc,
+        TimeoutError
+        | openai.APIConnectionError
+        | openai.RateLimitError
+        | openai.InternalServerError,
+    )
+
+
+def _tavily_transient(exc: BaseException) -> bool:
+    import httpx
+    import requests
+    from tavily.errors import TimeoutError as TavilyTimeoutError
+
+    if isinstance(exc, TimeoutError | TavilyTimeoutError | httpx.TransportError):
+        return True
+    if isinstance(exc, requests.ConnectionError | requests.Timeout):
+        return True
+    response = getattr(exc, "response", None)  # httpx / requests HTTP status errors
+    return isinstance(exc, httpx.HTTPStatusError | requests.HTTPError) and (
+        response is not None and response.status_code >= 500
+    )
+
+
+openai_upstream = Upstream("openai", _openai_transient)
+tavily_upstream = Upstream("tavily", _tavily_transient)
+
+
+def resilience_stats() -> dict:
+    """Breaker state per upstream and counters per stage."""
+    with _stages_lock:
+        stages = {stage: stats.as_dict() for stage, stats in sorted(_stages.items())}
+    return {
+        "breakers": {u.name: u.breaker.stats() for u in (openai_upstream, tavily_upstream)},
+        "stages": stages,
+    }
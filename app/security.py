@@ -12,6 +12,122 @@ class PromptInjectionError(Exception):
     pass
 
 
+# Regex alternations used by the scanner below. No keyword contains another, so the
+# leftmost match of a group is also the one that ends first.
+_IGNORE = re.compile(r"(?i)ignore|disregard|forget")
+_PRIOR = re.compile(r"(?i)previous|prior|above|all")
+_INSTRUCTION = re.compile(r"(?i)instruction|prompt|message|rule")
+_SYSTEM = re.compile(r"(?i)system|admin")
+_PROMPT = re.compile(r"(?i)prompt")
+_JAILBREAK = re.compile(r"(?i)jailbreak|bypass|override|circumvent")
+_RESTRICTION = re.compile(r"(?i)restriction|safeguard|filter|guideline")
+_ASSIGNMENT = re.compile(r"(?<!\w)(\w+)\s*=")
+_ON = re.compile(r"(?i)on")
+_CONTROL_CHARS = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+
+def _keywords_in_order(*groups: re.Pattern[str]):
+    """
+    Linear-time equivalent of re.search("(a).*?(b).*?(c)"): each group must match
+    after the previous one on the same line ('.' stops at newlines). Taking the
+    earliest match of each group leaves the most room for the rest, so one scan
+    per line is enough instead of backtracking from every start position.
+    """
+    head, rest = groups[0], groups[1:]
+
+    def matches(text: str) -> bool:
+        pos = 0
+        while (m := head.search(text, pos)) is not None:
+            line_end = text.find("\n", m.end())
+            if line_end == -1:
+                line_end = len(text)
+            end = m.end()
+            for group in rest:
+                found = group.search(text, end, line_end)
+                if found is None:
+                    break
+                end = found.end()
+            else:
+                return True
+            pos = line_end + 1
+        return False
+
+    return matches
+
+
+def _event_handler_assignment(text: str) -> bool:
+    r"""
+    Linear-time equivalent of re.search(r"(?i)on\w+\s*=") — a word containing "on"
+    (with at least one word character after it) followed by "=". Matching whole
+    words avoids re-scanning a long word from every "on" inside it.
+    """
+    for m in _ASSIGNMENT.finditer(text):
+        word = m.group(1)
+        if _ON.search(word, 0, len(word) - 1):
+            return True
+    return False
+
+
+# (pattern reported in PromptInjectionError, keyword prefilter, matcher with the same result
+# as re.search(pattern)). A pattern can only match if, for every keyword group, one of its
+# keywords occurs in the lower-cased text; plain substring tests rule most patterns out far
+# faster than case-insensitive regex alternations. None means the pattern is already linear
+# and is used as-is, precompiled.
+# Patterns are kept specific to actual injection attempts, not legitimate legal language.
+_INJECTION_PATTERNS = (
+    # Clear instruction override attempts
+    (
+        r"(?i)(ignore|disregard|forget).*?(previous|prior|above|all).*?(instruction|prompt|message|rule)",
+        (("ignore", "disregard", "forget"), ("previous", "prior", "above", "all"),
+         ("instruction", "prompt", "message", "rule")),
+        _keywords_in_order(_IGNORE, _PRIOR, _INSTRUCTION),
+    ),
+    (
+        r"(?i)(system|admin).*?prompt",
+        (("system", "admin"), ("prompt",)),
+        _keywords_in_order(_SYSTEM, _PROMPT),
+    ),
+    # Jailbreak attempts
+    (
+        r"(?i)(jailbreak|bypass|override|circumvent).*?(restriction|safeguard|filter|guideline)",
+        (("jailbreak", "bypass", "override", "circumvent"),
+         ("restriction", "safeguard", "filter", "guideline")),
+        _keywords_in_order(_JAILBREAK, _RESTRICTION),
+    ),
+    # You are now prompts
+    (r"(?i)you\s+are\s+now\s+", (("you",), ("are",), ("now",)), None),
+    # Do anything now patterns
+    (r"(?i)do\s+(anything|whatever)\s+now", (("do",), ("anything", "whatever"), ("now",)), None),
+    # HTML/XML injection
+    (r"(?i)<\s*(script|iframe|embed|object)", (("<",), ("script", "iframe", "embed", "object")), None),
+    # Event handler injection
+    (r"(?i)on\w+\s*=", (("on",), ("=",)), _event_handler_assignment),
+    # Command injection with shell operators
+    (
+        r"(?i)(;|&&|\|\|)\s*(curl|wget|exec|sh|bash)",
+        ((";", "&&", "||"), ("curl", "wget", "exec", "sh")),  # "sh" also covers "bash"
+        None,
+    ),
+)
+_INJECTION_CHECKS = tuple(
+    (pattern, keywords, matcher or re.compile(pattern).search)
+    for pattern, keywords, matcher in _INJECTION_PATTERNS
+)
+
+# The only non-ASCII characters re.IGNORECASE matches against ASCII letters (besides the
+# Kelvin sign, which str.lower() already maps to "k").
+_ASCII_FOLD = (("\u0130", "i"), ("\u0131", "i"), ("\u017f", "s"))
+
+
+def _keyword_view(text: str) -> str:
+    """Lower-cased text in which every keyword the patterns could match appears verbatim."""
+    if not text.isascii():
+        for char, letter in _ASCII_FOLD:
+            if char in text:
+                text = text.replace(char, letter)
+    return text.lower()
+
+
 def sanitize_user_input(text: str, max_length: int = 2000) -> str:
     """
     Sanitize user input to prevent prompt injection attacks.
@@ -42,34 +158,17 @@ def sanitize_user_input(text: str, max_length: int = 2000) -> str:
             f"Got {len(text)} characters."
         )
 
-    # Check for common prompt injection patterns
-    # Note: Patterns are kept specific to actual injection attempts, not legitimate legal language
-    injection_patterns = [
-        # Clear instruction override attempts
-        r"(?i)(ignore|disregard|forget).*?(previous|prior|above|all).*?(instruction|prompt|message|rule)",
-        r"(?i)(system|admin).*?prompt",
-        # Jailbreak attempts
-        r"(?i)(jailbreak|bypass|override|circumvent).*?(restriction|safeguard|filter|guideline)",
-        # You are now prompts
-        r"(?i)you\s+are\s+now\s+",
-        # Do anything now patterns
-        r"(?i)do\s+(anything|whatever)\s+now",
-        # HTML/XML injection
-        r"(?i)<\s*(script|iframe|embed|object)",
-        r"(?i)on\w+\s*=",  # Event handler injection
-        # Command injection with shell operators
-        r"(?i)(;|&&|\|\|)\s*(curl|wget|exec|sh|bash)",
-    ]
-
-    for pattern in injection_patterns:
-        if re.search(pattern, text):
+    # Check for common prompt injection patterns (precompiled, linear time; see _INJECTION_CHECKS)
+    view = _keyword_view(text)
+    for pattern, keywords, matches in _INJECTION_CHECKS:
+        if all(any(k in view for k in group) for group in keywords) and matches(text):
             raise PromptInjectionError(
                 f"Potentially malicious input detected. "
-                f"Pattern: {pattern.pattern if hasattr(pattern, 'pattern') else pattern}"
+                f"Pattern: {pattern}"
             )
 
     # Check for excessive control characters
-    control_char_count = sum(1 for c in text if ord(c) < 32 and c not in '\n\t\r')
+    control_char_count = len(_CONTROL_CHARS.findall(text))
     if control_char_count > 5:
         raise PromptInjectionError(
             f"Excessive control characters detected ({control_char_count})"
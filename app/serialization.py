@@ -0,0 +1,25 @@
+"""
+Compact AgentState serialization for persistence and API responses.
+Dumps go through pydantic-core's serializer (model_dump_json, no indentation);
+loads parse and validate in one pass with model_validate_json. Both stay in
+Rust, which beats json.dumps/json.loads plus model construction in Python —
+and beats skipping validation with model_construct, which is slower than
+validating on current pydantic.
+"""
+
+from app.models import AgentState
+
+
+def dump_state(state: AgentState) -> bytes:
+    """Compact JSON bytes for a session."""
+    return state.model_dump_json().encode("utf-8")
+
+
+def load_state(data: bytes | str) -> AgentState:
+    """Parse a session document written by dump_state() (or the older pretty-printed format)."""
+    return AgentState.model_validate_json(data)
+
+
+def state_from_dict(data: dict) -> AgentState:
+    """Build an AgentState from a model_dump()-shaped dict without aliasing its lists."""
+    return AgentState.model_validate(data)
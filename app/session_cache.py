@@ -0,0 +1,144 @@
+"""
+Process-local write-behind cache of live AgentState objects.
+Reads (UI polling) are served from memory; saves only mark the session dirty
+and a background thread coalesces them into one write per flush interval.
+Callers request a synchronous flush at important transitions (task in_progress,
+a step's results, session done) and everything dirty is flushed on shutdown.
+Each entry remembers the store's stamp(session_id) (file mtime/size or stored
+version) from when it was read or written; a load whose stamp no longer
+matches re-reads the session, so saves by other processes are not hidden
+behind a stale copy. Entries with unflushed changes are served as they are.
+"""
+
+import logging
+import threading
+from collections import OrderedDict
+
+from app.models import AgentState, SessionConflictError
+
+logger = logging.getLogger(__name__)
+
+
+class WriteBehindSessionCache:
+    """Bounded LRU of AgentState in front of a session store (save/load/delete/stamp)."""
+
+    def __init__(self, store, max_entries: int, flush_interval: float) -> None:
+        self.store = store
+        self.max_entries = max_entries
+        self.flush_interval = flush_interval
+        self._entries: OrderedDict[str, AgentState] = OrderedDict()
+        self._dirty: set[str] = set()
+        self._stamps: dict[str, object] = {}
+        self._lock = threading.RLock()
+        self._stop = threading.Event()
+        self._flusher: threading.Thread | None = None
+
+    def save(self, state: AgentState, flush: bool = False) -> None:
+        with self._lock:
+            self._put(state)
+            self._dirty.add(state.session_id)
+            if flush:
+                self._write(state.session_id)
+                return
+        self._ensure_flusher()
+
+    def load(self, session_id: str) -> AgentState | None:
+        with self._lock:
+            state = self._entries.get(session_id)
+            if state is not None and session_id in self._dirty:
+                # Our unflushed changes are the latest we know of (a conflict shows on flush)
+                self._entries.move_to_end(session_id)
+                return state
+            remembered = self._stamps.get(session_id)
+        stamp = self.store.stamp(session_id)
+        if state is not None and stamp == remembered:
+            with self._lock:
+                if session_id in self._entries:
+                    self._entries.move_to_end(session_id)
+            return state
+        # Not cached, or saved by another process since we last read or wrote it
+        fresh = self.store.load(session_id)
+        with self._lock:
+            cached = self._entries.get(session_id)
+            if cached is not None and (cached is not state or session_id in self._dirty):
+                # A save in this process raced the read; the in-memory copy wins
+                return cached
+            if fresh is None:
+                self._entries.pop(session_id, None)
+                self._stamps.pop(session_id, None)
+                return None
+            self._put(fresh)
+            self._stamps[session_id] = stamp
+        return fresh
+
+    def delete(self, session_id: str) -> bool:
+        with self._lock:
+            self._entries.pop(session_id, None)
+            self._dirty.discard(session_id)
+            self._stamps.pop(session_id, None)
+        return self.store.delete(session_id)
+
+    def flush(self) -> None:
+        """Write every dirty session now."""
+        with self._lock:
+            for session_id in list(self._dirty):
+                try:
+                    self._write(session_id)
+                except SessionConflictError:
+                    pass  # logged and evicted by _write
+
+    def close(self) -> None:
+        self._stop.set()
+        self.flush()
+
+    # -- internals ----------------------------------------------------------
+
+    def _put(self, state: AgentState) -> None:
+        """Insert/refresh an entry, evicting LRU entries (flushing them first if dirty). Caller holds the lock."""
+        self._entries[state.session_id] = state
+        self._entries.move_to_end(state.session_id)
+        while len(self._entries) > self.max_entries:
+            session_id = next(iter(self._entries))
+            if session_id in self._dirty:
+                try:
+                    self._write(session_id)
+                except SessionConflictError:
+                    continue  # already evicted
+            self._entries.pop(session_id)
+            self._stamps.pop(session_id, None)
+
+    def _write(self, session_id: str) -> None:
+        """Persist one dirty session. Caller holds the lock; a failed write stays dirty."""
+        state = self._entries.get(session_id)
+        if state is None:
+            self._dirty.discard(session_id)
+            return
+        try:
+            self.store.save(state)
+        except SessionConflictError:
+            # Another process saved a newer version: drop ours so the next load reads theirs
+            logger.warning("Discarding cached changes to session %s: saved elsewhere", session_id)
+            self._entries.pop(session_id, None)
+            self._stamps.pop(session_id, None)
+            self._dirty.discard(session_id)
+            raise
+        self._dirty.discard(session_id)
+        self._stamps[session_id] = self.store.stamp(session_id)
+
+    def _ensure_flusher(self) -> None:
+        if self._flusher is not None and self._flusher.is_alive():
+            return
+        with self._lock:
+            if self._flusher is not None and self._flusher.is_alive():
+                return
+            self._flusher = threading.Thread(
+                target=self._run_flusher, name="session-flusher", daemon=True,
+            )
+            self._flusher.start()
+
+    def _run_flusher(self) -> None:
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Background session flush failed; will retry")
@@ -0,0 +1,178 @@
+"""
+Session listing helpers shared by the storage backends: summary projection,
+keyset cursors, in-memory filtering and the append-only summary index used by
+file-based backends.
+"""
+
+import base64
+import json
+import os
+import threading
+from collections.abc import Callable, Iterable
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Literal
+
+from app.models import AgentState, SessionSummary
+
+try:
+    import fcntl
+except ImportError:  # Windows: index writes are only serialized within the process
+    fcntl = None
+
+SortOrder = Literal["asc", "desc"]
+
+
+def summarize(state: AgentState) -> SessionSummary:
+    return SessionSummary(
+        session_id=state.session_id,
+        goal=state.goal,
+        mode=state.mode,
+        current_step=state.current_step,
+        is_active=state.is_active,
+        created_at=state.created_at,
+    )
+
+
+def encode_cursor(summary: SessionSummary) -> str:
+    raw = json.dumps([summary.created_at, summary.session_id]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> tuple[str, str]:
+    """Return (created_at, session_id) of the last item of the previous page. Raises ValueError."""
+    try:
+        created_at, session_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    except Exception as e:
+        raise ValueError("Invalid cursor") from e
+    return str(created_at), str(session_id)
+
+
+def filter_summaries(
+    summaries: Iterable[SessionSummary],
+    limit: int,
+    after: tuple[str, str] | None = None,
+    order: SortOrder = "desc",
+    mode: str | None = None,
+    is_active: bool | None = None,
+    created_after: str | None = None,
+    created_before: str | None = None,
+) -> list[SessionSummary]:
+    """In-memory equivalent of the SQLite listing query: filter, sort by (created_at, session_id), cut."""
+    descending = order == "desc"
+    selected = []
+    for s in summaries:
+        if mode is not None and s.mode != mode:
+            continue
+        if is_active is not None and s.is_active != is_active:
+            continue
+        if created_after is not None and s.created_at < created_after:
+            continue
+        if created_before is not None and s.created_at >= created_before:
+            continue
+        if after is not None:
+            key = (s.created_at, s.session_id)
+            if (key >= after) if descending else (key <= after):
+                continue
+        selected.append(s)
+    selected.sort(key=lambda s: (s.created_at, s.session_id), reverse=descending)
+    return selected[:limit]
+
+
+class SessionIndex:
+    """
+    Append-only log of session summaries for the JSON backend, so listings never
+    open the session documents. Each process tails the log into memory (reading
+    only bytes appended since its last look) and rewrites it when it is mostly
+    superseded entries. Appends and rewrites take an flock on a sibling .lock file.
+    """
+
+    def __init__(self, path: Path, rebuild: Callable[[], Iterable[SessionSummary]]) -> None:
+        self.path = path
+        self._rebuild = rebuild
+        self._entries: dict[str, SessionSummary] = {}
+        self._offset = 0
+        self._inode: int | None = None
+        self._lines = 0
+        self._lock = threading.RLock()
+
+    def upsert(self, summary: SessionSummary) -> None:
+        self._append({"op": "put", "s": summary.model_dump()})
+
+    def remove(self, session_id: str) -> None:
+        self._append({"op": "del", "id": session_id})
+
+    def summaries(self) -> list[SessionSummary]:
+        with self._lock:
+            self._ensure_exists()
+            self._refresh()
+            return list(self._entries.values())
+
+    @contextmanager
+    def _file_lock(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path.with_suffix(".lock"), "a") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _ensure_exists(self) -> None:
+        """First use on an existing data dir: build the log from the session files once."""
+        if self.path.exists():
+            return
+        with self._file_lock():
+            if not self.path.exists():
+                self._write_snapshot({s.session_id: s for s in self._rebuild()})
+
+    def _append(self, record: dict) -> None:
+        with self._lock:
+            self._ensure_exists()
+            with self._file_lock():
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(record) + "\n")
+                self._refresh()
+                if self._lines > 2 * len(self._entries) + 100:
+                    self._write_snapshot(self._entries)
+
+    def _write_snapshot(self, entries: dict[str, SessionSummary]) -> None:
+        """Rewrite the log as one put per live session. Caller holds the file lock."""
+        tmp = self.path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            for summary in entries.values():
+                f.write(json.dumps({"op": "put", "s": summary.model_dump()}) + "\n")
+        os.replace(tmp, self.path)
+        self._inode = None
+        self._refresh()
+
+    def _refresh(self) -> None:
+        """Apply records appended since the last read; start over if the log was rewritten."""
+        try:
+            stat = self.path.stat()
+        except FileNotFoundError:
+            return
+        if stat.st_ino != self._inode or stat.st_size < self._offset:
+            self._entries = {}
+            self._offset = 0
+            self._lines = 0
+            self._inode = stat.st_ino
+        if stat.st_size == self._offset:
+            return
+        with open(self.path, "rb") as f:
+            f.seek(self._offset)
+            chunk = f.read()
+        end = chunk.rfind(b"\n") + 1  # ignore a trailing partial line until it is complete
+        for line in chunk[:end].splitlines():
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if record["op"] == "put":
+                summary = SessionSummary(**record["s"])
+                self._entries[summary.session_id] = summary
+            else:
+                self._entries.pop(record["id"], None)
+            self._lines += 1
+        self._offset += end
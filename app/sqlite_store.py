@@ -0,0 +1,298 @@
+"""
+SQLite session store (selected with LEXAGENT_STORAGE=sqlite).
+One database file in WAL mode instead of one JSON file per session; tasks and
+context notes live in their own tables so listings never parse whole documents.
+"""
+
+import json
+import sqlite3
+import threading
+from pathlib import Path
+
+from app.models import AgentState, SessionConflictError, SessionSummary
+from app.serialization import state_from_dict
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    session_id TEXT PRIMARY KEY,
+    goal TEXT NOT NULL,
+    current_step INTEGER NOT NULL,
+    is_active INTEGER NOT NULL,
+    mode TEXT NOT NULL,
+    final_report_path TEXT,
+    created_at TEXT NOT NULL,
+    context_summary TEXT,
+    summarized_notes INTEGER NOT NULL DEFAULT 0,
+    version INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_sessions_created_at ON sessions(created_at);
+CREATE INDEX IF NOT EXISTS idx_sessions_mode ON sessions(mode);
+CREATE INDEX IF NOT EXISTS idx_sessions_is_active ON sessions(is_active);
+
+CREATE TABLE IF NOT EXISTS tasks (
+    session_id TEXT NOT NULL REFERENCES sessions(session_id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    id TEXT NOT NULL,
+    title TEXT NOT NULL,
+    description TEXT NOT NULL,
+    status TEXT NOT NULL,
+    tool_used TEXT,
+    result TEXT,
+    reflection TEXT,
+    sources TEXT NOT NULL,
+    PRIMARY KEY (session_id, position)
+);
+
+CREATE TABLE IF NOT EXISTS context_notes (
+    session_id TEXT NOT NULL REFERENCES sessions(session_id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    note TEXT NOT NULL,
+    PRIMARY KEY (session_id, position)
+);
+"""
+
+_SESSION_COLUMNS = (
+    "session_id, goal, current_step, is_active, mode, final_report_path, created_at, "
+    "context_summary, summarized_notes, version"
+)
+# Columns added after the first release: (name, definition) for ALTER TABLE on older databases
+_ADDED_SESSION_COLUMNS = (
+    ("context_summary", "TEXT"),
+    ("summarized_notes", "INTEGER NOT NULL DEFAULT 0"),
+    ("version", "INTEGER NOT NULL DEFAULT 0"),
+)
+_TASK_COLUMNS = (
+    "id, title, description, status, tool_used, result, reflection, sources"
+)
+
+
+class SqliteSessionStore:
+    """save/load/list_all/delete for AgentState backed by a single SQLite database."""
+
+    def __init__(self, db_path: Path) -> None:
+        self.db_path = db_path
+        self._local = threading.local()
+        self._init_lock = threading.Lock()
+        self._initialized = False
+
+    def _connect(self) -> sqlite3.Connection:
+        """One connection per thread; WAL lets readers run alongside the writer."""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            return conn
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA foreign_keys=ON")
+        conn.execute("PRAGMA busy_timeout=30000")
+        with self._init_lock:
+            if not self._initialized:
+                conn.executescript(_SCHEMA)
+                existing = {row[1] for row in conn.execute("PRAGMA table_info(sessions)")}
+                for name, definition in _ADDED_SESSION_COLUMNS:
+                    if name not in existing:
+                        conn.execute(f"ALTER TABLE sessions ADD COLUMN {name} {definition}")
+                self._initialized = True
+        self._local.conn = conn
+        return conn
+
+    def save(self, state: AgentState) -> None:
+        conn = self._connect()
+        sid = state.session_id
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            stored = conn.execute(
+                "SELECT version FROM sessions WHERE session_id = ?", (sid,),
+            ).fetchone()
+            if stored is not None and stored[0] != state.version:
+                raise SessionConflictError(sid)
+            conn.execute(
+                f"INSERT INTO sessions ({_SESSION_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(session_id) DO UPDATE SET goal=excluded.goal, "
+                "current_step=excluded.current_step, is_active=excluded.is_active, "
+                "mode=excluded.mode, final_report_path=excluded.final_report_path, "
+                "created_at=excluded.created_at, context_summary=excluded.context_summary, "
+                "summarized_notes=excluded.summarized_notes, version=excluded.version",
+                (
+                    sid,
+                    state.goal,
+                    state.current_step,
+                    int(state.is_active),
+                    state.mode,
+                    state.final_report_path,
+                    state.created_at,
+                    state.context_summary,
+                    state.summarized_notes,
+                    state.version + 1,
+                ),
+            )
+            conn.execute("DELETE FROM tasks WHERE session_id = ?", (sid,))
+            conn.executemany(
+                f"INSERT INTO tasks (session_id, position, {_TASK_COLUMNS}) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (
+                        sid,
+                        i,
+                        t.id,
+                        t.title,
+                        t.description,
+                        t.status,
+                        t.tool_used,
+                        t.result,
+                        t.reflection,
+                        json.dumps(t.sources),
+                    )
+                    for i, t in enumerate(state.tasks)
+                ],
+            )
+            conn.execute("DELETE FROM context_notes WHERE session_id = ?", (sid,))
+            conn.executemany(
+                "INSERT INTO context_notes (session_id, position, note) VALUES (?, ?, ?)",
+                [(sid, i, note) for i, note in enumerate(state.context_notes)],
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        state.version += 1
+
+    def load(self, session_id: str) -> AgentState | None:
+        conn = self._connect()
+        row = conn.execute(
+            f"SELECT {_SESSION_COLUMNS} FROM sessions WHERE session_id = ?", (session_id,),
+        ).fetchone()
+        if row is None:
+            return None
+        tasks = conn.execute(
+            f"SELECT {_TASK_COLUMNS} FROM tasks WHERE session_id = ? ORDER BY position",
+            (session_id,),
+        ).fetchall()
+        notes = conn.execute(
+            "SELECT note FROM context_notes WHERE session_id = ? ORDER BY position",
+            (session_id,),
+        ).fetchall()
+        return _build_state(row, tasks, [n[0] for n in notes])
+
+    def list_all(self) -> list[AgentState]:
+        conn = self._connect()
+        rows = conn.execute(
+            f"SELECT {_SESSION_COLUMNS} FROM sessions ORDER BY created_at",
+        ).fetchall()
+        tasks_by_session: dict[str, list[tuple]] = {}
+        for row in conn.execute(
+            f"SELECT session_id, {_TASK_COLUMNS} FROM tasks ORDER BY session_id, position",
+        ):
+            tasks_by_session.setdefault(row[0], []).append(row[1:])
+        notes_by_session: dict[str, list[str]] = {}
+        for sid, note in conn.execute(
+            "SELECT session_id, note FROM context_notes ORDER BY session_id, position",
+        ):
+            notes_by_session.setdefault(sid, []).append(note)
+        return [
+            _build_state(row, tasks_by_session.get(row[0], []), notes_by_session.get(row[0], []))
+            for row in rows
+        ]
+
+    def list_summaries(
+        self,
+        limit: int,
+        after: tuple[str, str] | None = None,
+        order: str = "desc",
+        mode: str | None = None,
+        is_active: bool | None = None,
+        created_after: str | None = None,
+        created_before: str | None = None,
+    ) -> list[SessionSummary]:
+        """Up to `limit` summaries past the `after` keyset, straight from the indexed sessions table."""
+        where, params = [], []
+        if mode is not None:
+            where.append("mode = ?")
+            params.append(mode)
+        if is_active is not None:
+            where.append("is_active = ?")
+            params.append(int(is_active))
+        if created_after is not None:
+            where.append("created_at >= ?")
+            params.append(created_after)
+        if created_before is not None:
+            where.append("created_at < ?")
+            params.append(created_before)
+        if after is not None:
+            where.append(f"(created_at, session_id) {'<' if order == 'desc' else '>'} (?, ?)")
+            params.extend(after)
+        direction = "DESC" if order == "desc" else "ASC"
+        sql = (
+            "SELECT session_id, goal, mode, current_step, is_active, created_at FROM sessions"
+            + (f" WHERE {' AND '.join(where)}" if where else "")
+            + f" ORDER BY created_at {direction}, session_id {direction} LIMIT ?"
+        )
+        rows = self._connect().execute(sql, (*params, limit)).fetchall()
+        return [
+            SessionSummary(
+                session_id=r[0],
+                goal=r[1],
+                mode=r[2],
+                current_step=r[3],
+                is_active=bool(r[4]),
+                created_at=r[5],
+            )
+            for r in rows
+        ]
+
+    def stamp(self, session_id: str) -> int | None:
+        """Stored version (changes with every save); None if the session does not exist."""
+        row = self._connect().execute(
+            "SELECT version FROM sessions WHERE session_id = ?", (session_id,),
+        ).fetchone()
+        return row[0] if row is not None else None
+
+    def delete(self, session_id: str) -> bool:
+        conn = self._connect()
+        cursor = conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+        return cursor.rowcount > 0
+
+
+def _build_state(row: tuple, task_rows: list[tuple], notes: list[str]) -> AgentState:
+    (
+        session_id,
+        goal,
+        current_step,
+        is_active,
+        mode,
+        final_report_path,
+        created_at,
+        context_summary,
+        summarized_notes,
+        version,
+    ) = row
+    tasks = [
+        {
+            "id": t[0],
+            "title": t[1],
+            "description": t[2],
+            "status": t[3],
+            "tool_used": t[4],
+            "result": t[5],
+            "reflection": t[6],
+            "sources": json.loads(t[7]),
+        }
+        for t in task_rows
+    ]
+    return state_from_dict(
+        {
+            "session_id": session_id,
+            "goal": goal,
+            "tasks": tasks,
+            "context_notes": notes,
+            "current_step": current_step,
+            "is_active": bool(is_active),
+            "mode": mode,
+            "final_report_path": final_report_path,
+            "created_at": created_at,
+            "context_summary": context_summary,
+            "summarized_notes": summarized_notes,
+            "version": version,
+        }
+    )
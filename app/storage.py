@@ -1,43 +1,238 @@
-import json
+import asyncio
+import atexit
 import os
+import re
 from pathlib import Path
 
-from app.models import AgentState
+from app.file_lock import exclusive
+from app.metrics import track_stage
+from app.models import AgentState, SessionConflictError, SessionPage, SessionSummary
+from app.serialization import dump_state, load_state
+from app.session_cache import WriteBehindSessionCache
+from app.session_index import (
+    SessionIndex,
+    SortOrder,
+    decode_cursor,
+    encode_cursor,
+    filter_summaries,
+    summarize,
+)
 
 # Configurable via env for Railway (e.g. volume at /app/persist → LEXAGENT_DATA_DIR=/app/persist/data)
 _DEFAULT_DATA = Path(__file__).parent.parent / "data"
 DATA_DIR = Path(os.environ.get("LEXAGENT_DATA_DIR", str(_DEFAULT_DATA)))
 
+# "json" (default): one DATA_DIR/{session_id}.json per session.
+# "sqlite": a single WAL-mode database at LEXAGENT_DB_PATH (see app/sqlite_store.py).
+# "journal": per-session event logs + snapshots under DATA_DIR/journal (see app/journal_store.py).
+STORAGE_BACKEND = os.environ.get("LEXAGENT_STORAGE", "json").strip().lower()
+DB_PATH = Path(os.environ.get("LEXAGENT_DB_PATH", str(DATA_DIR / "lexagent.db")))
+JOURNAL_COMPACT_EVENTS = int(os.environ.get("LEXAGENT_JOURNAL_COMPACT_EVENTS", "50"))
 
-def save_session(state: AgentState) -> None:
-    DATA_DIR.mkdir(parents=True, exist_ok=True)
-    path = DATA_DIR / f"{state.session_id}.json"
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(state.model_dump(), f, indent=2)
+# Write-behind cache of live sessions (see app/session_cache.py); size 0 disables it.
+# Cached sessions are revalidated against the store on every load, so other processes'
+# saves are seen; deferred saves reach them within the flush interval.
+SESSION_CACHE_SIZE = int(os.environ.get("LEXAGENT_SESSION_CACHE_SIZE", "256"))
+SESSION_FLUSH_INTERVAL = float(os.environ.get("LEXAGENT_SESSION_FLUSH_INTERVAL", "1.0"))
 
+# dump_state() writes version as the last field, so its tail is enough to check it
+_VERSION_TAIL = re.compile(rb'"version":\s*(\d+)\s*\}\s*$')
 
-def load_session(session_id: str) -> AgentState | None:
-    path = DATA_DIR / f"{session_id}.json"
-    if not path.exists():
+
+def _stored_version(path: Path) -> int | None:
+    """Version of the document at path; None if there is none (missing or just created)."""
+    try:
+        f = open(path, "rb")
+    except FileNotFoundError:
         return None
-    with open(path, encoding="utf-8") as f:
-        data = json.load(f)
-    return AgentState(**data)
+    with f:
+        end = f.seek(0, os.SEEK_END)
+        if end == 0:
+            return None
+        f.seek(max(end - 64, 0))
+        match = _VERSION_TAIL.search(f.read())
+        if match:
+            return int(match.group(1))
+        f.seek(0)
+        return load_state(f.read()).version  # written before version was the last field
+
+
+class JsonSessionStore:
+    """One compact JSON document per session under DATA_DIR (older pretty-printed files still load)."""
+
+    def __init__(self, data_dir: Path) -> None:
+        self.data_dir = data_dir
+        self.index = SessionIndex(data_dir / "index" / "sessions.log", self._scan_summaries)
+
+    def _scan_summaries(self) -> list[SessionSummary]:
+        return [summarize(state) for state in self.list_all()]
+
+    def save(self, state: AgentState) -> None:
+        self.data_dir.mkdir(parents=True, exist_ok=True)
+        path = self.data_dir / f"{state.session_id}.json"
+        # Lock the session file itself (created empty for a new session)
+        with exclusive(path):
+            stored = _stored_version(path)
+            if stored is not None and stored != state.version:
+                raise SessionConflictError(state.session_id)
+            state.version += 1
+            tmp = path.with_suffix(f".{os.getpid()}.tmp")
+            try:
+                # Readers never see a partial document; lock waiters notice the new inode
+                tmp.write_bytes(dump_state(state))
+                os.replace(tmp, path)
+            except BaseException:
+                tmp.unlink(missing_ok=True)
+                state.version -= 1
+                if stored is None:
+                    path.unlink(missing_ok=True)
+                raise
+        self.index.upsert(summarize(state))
+
+    def load(self, session_id: str) -> AgentState | None:
+        path = self.data_dir / f"{session_id}.json"
+        try:
+            data = path.read_bytes()
+        except FileNotFoundError:
+            return None
+        # Empty while a save that creates the session holds its lock
+        return load_state(data) if data else None
+
+    def stamp(self, session_id: str) -> tuple[int, int] | None:
+        """File mtime and size (change with every save); None if the session does not exist."""
+        try:
+            st = (self.data_dir / f"{session_id}.json").stat()
+        except FileNotFoundError:
+            return None
+        return (st.st_mtime_ns, st.st_size) if st.st_size else None
+
+    def list_all(self) -> list[AgentState]:
+        self.data_dir.mkdir(parents=True, exist_ok=True)
+        sessions = []
+        for file in self.data_dir.glob("*.json"):
+            data = file.read_bytes()
+            if data:
+                sessions.append(load_state(data))
+        return sessions
+
+    def list_summaries(self, limit: int, **query) -> list[SessionSummary]:
+        return filter_summaries(self.index.summaries(), limit, **query)
+
+    def delete(self, session_id: str) -> bool:
+        path = self.data_dir / f"{session_id}.json"
+        if not path.exists():
+            return False
+        path.unlink()
+        self.index.remove(session_id)
+        return True
+
+
+def _create_store():
+    if STORAGE_BACKEND == "sqlite":
+        from app.sqlite_store import SqliteSessionStore
+
+        return SqliteSessionStore(DB_PATH)
+    if STORAGE_BACKEND == "journal":
+        from app.journal_store import JournalSessionStore
+
+        return JournalSessionStore(DATA_DIR / "journal", compact_after=JOURNAL_COMPACT_EVENTS)
+    if STORAGE_BACKEND != "json":
+        raise ValueError(
+            f"Unknown LEXAGENT_STORAGE backend: {STORAGE_BACKEND!r} (use 'json', 'sqlite' or 'journal')"
+        )
+    return JsonSessionStore(DATA_DIR)
+
+
+_store = _create_store()
+_cache = (
+    WriteBehindSessionCache(_store, SESSION_CACHE_SIZE, SESSION_FLUSH_INTERVAL)
+    if SESSION_CACHE_SIZE > 0
+    else None
+)
+
+
+def save_session(state: AgentState, flush: bool = False) -> None:
+    """
+    Persist a session. With the session cache enabled the write is deferred and
+    coalesced; pass flush=True at transitions that must be on disk immediately.
+    """
+    with track_stage("save_session"):
+        if _cache is None:
+            _store.save(state)
+        else:
+            _cache.save(state, flush=flush)
+
+
+def load_session(session_id: str) -> AgentState | None:
+    with track_stage("load_session"):
+        if _cache is None:
+            return _store.load(session_id)
+        return _cache.load(session_id)
+
+
+async def save_session_async(state: AgentState, flush: bool = False) -> None:
+    """save_session() on a worker thread: backends block on file locks or a busy database."""
+    await asyncio.to_thread(save_session, state, flush)
+
+
+async def load_session_async(session_id: str) -> AgentState | None:
+    """load_session() on a worker thread (see save_session_async)."""
+    return await asyncio.to_thread(load_session, session_id)
+
+
+def flush_sessions() -> None:
+    """Write all sessions with deferred changes to the backend."""
+    if _cache is not None:
+        _cache.flush()
+
+
+def close_sessions() -> None:
+    """Stop the background flusher and write everything pending (server shutdown)."""
+    if _cache is not None:
+        _cache.close()
+
+
+atexit.register(close_sessions)
 
 
 def list_sessions() -> list[AgentState]:
-    DATA_DIR.mkdir(parents=True, exist_ok=True)
-    sessions = []
-    for file in DATA_DIR.glob("*.json"):
-        with open(file, encoding="utf-8") as f:
-            data = json.load(f)
-        sessions.append(AgentState(**data))
-    return sessions
+    flush_sessions()
+    return _store.list_all()
+
+
+def list_session_summaries(
+    limit: int = 50,
+    cursor: str | None = None,
+    order: SortOrder = "desc",
+    mode: str | None = None,
+    is_active: bool | None = None,
+    created_after: str | None = None,
+    created_before: str | None = None,
+) -> SessionPage:
+    """
+    One page of session summaries, newest first by default.
+    Filters: mode, is_active, created_at in [created_after, created_before).
+    Pass the returned next_cursor back as cursor to get the following page.
+    Raises ValueError for a malformed cursor.
+    """
+    after = decode_cursor(cursor) if cursor else None
+    flush_sessions()
+    # Ask for one extra row to know whether there is a next page
+    rows = _store.list_summaries(
+        limit + 1,
+        after=after,
+        order=order,
+        mode=mode,
+        is_active=is_active,
+        created_after=created_after,
+        created_before=created_before,
+    )
+    items = rows[:limit]
+    next_cursor = encode_cursor(items[-1]) if len(rows) > limit else None
+    return SessionPage(items=items, next_cursor=next_cursor)
 
 
 def delete_session(session_id: str) -> bool:
-    path = DATA_DIR / f"{session_id}.json"
-    if not path.exists():
-        return False
-    path.unlink()
-    return True
+    if _cache is None:
+        return _store.delete(session_id)
+    return _cache.delete(session_id)
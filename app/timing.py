@@ -0,0 +1,224 @@
+"""
+Per-request latency attribution without Langfuse.
+Every stage timed by app.metrics.track_stage (LLM prompts by trace name,
+search, result validation, session load/save) is also added to the current
+request's StageTimings; ServerTimingMiddleware returns them as a
+Server-Timing header (per stage: total duration, call count). Queued steps
+store their timings on the job; GET /jobs/{id} adds them to its own header as
+job-<stage>.
+
+Opt-in profiling: a request with X-Profile: <LEXAGENT_PROFILE_TOKEN> (or every
+request, with LEXAGENT_PROFILE=1) is sampled by a thread that reads the
+handler's stack every LEXAGENT_PROFILE_INTERVAL seconds: the event loop thread
+for async handlers and queued steps (X-Profile on POST /agent/{id}/execute
+profiles the step, in whichever process runs it), and the threadpool thread
+running a sync endpoint (routes use ProfiledRoute) while it runs. The samples
+are written in collapsed-stack format (flamegraph.pl, speedscope, inferno) to
+LEXAGENT_PROFILE_DIR. The event loop thread is shared, so concurrent requests
+show up in each other's profiles: profile on a quiet instance.
+"""
+
+import functools
+import inspect
+import os
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+
+from fastapi.routing import APIRoute
+
+PROFILE_ALL = os.environ.get("LEXAGENT_PROFILE", "").lower() in ("1", "true", "yes")
+PROFILE_TOKEN = os.environ.get("LEXAGENT_PROFILE_TOKEN", "")
+# Default LEXAGENT_DATA_DIR/profiles, resolved in profile_path()
+PROFILE_DIR = os.environ.get("LEXAGENT_PROFILE_DIR")
+PROFILE_INTERVAL = float(os.environ.get("LEXAGENT_PROFILE_INTERVAL", "0.005"))
+
+
+class StageTimings:
+    """Durations of the stages run for one request or job, summed per stage."""
+
+    def __init__(self) -> None:
+        self.started = time.perf_counter()
+        self._stages: dict[str, list[float]] = {}  # stage -> [seconds, calls]
+        self._lock = threading.Lock()
+
+    def add(self, stage: str, seconds: float, calls: int = 1) -> None:
+        with self._lock:
+            totals = self._stages.setdefault(stage, [0.0, 0])
+            totals[0] += seconds
+            totals[1] += calls
+
+    def as_dict(self) -> dict[str, float]:
+        """Milliseconds per stage, in the order the stages first ran."""
+        with self._lock:
+            return {stage: round(seconds * 1000, 1) for stage, (seconds, _) in self._stages.items()}
+
+    def header(self) -> str:
+        with self._lock:
+            # calls is 0 for stages copied from a job, which only stores durations
+            items = [
+                f'{_token(stage)};dur={seconds * 1000:.1f}' + (f';desc="{calls}x"' if calls else "")
+                for stage, (seconds, calls) in self._stages.items()
+            ]
+        items.append(f"total;dur={(time.perf_counter() - self.started) * 1000:.1f}")
+        return ", ".join(items)
+
+
+def _token(stage: str) -> str:
+    return "".join(c if c.isalnum() or c in "-_." else "-" for c in stage)
+
+
+_timings: ContextVar[StageTimings | None] = ContextVar("stage_timings", default=None)
+
+
+def start_timings() -> StageTimings:
+    """Collect stage timings for the current request (or job) from here on."""
+    timings = StageTimings()
+    _timings.set(timings)
+    return timings
+
+
+def record(stage: str, seconds: float) -> None:
+    timings = _timings.get()
+    if timings is not None:
+        timings.add(stage, seconds)
+
+
+def record_job(timings_ms: dict[str, float]) -> None:
+    """Add a finished job's stored per-stage milliseconds to the current request as job-<stage>."""
+    timings = _timings.get()
+    if timings is not None:
+        for stage, ms in timings_ms.items():
+            timings.add(f"job-{stage}", ms / 1000, calls=0)
+
+
+def profile_requested(headers) -> bool:
+    """True for LEXAGENT_PROFILE=1, or an X-Profile header matching LEXAGENT_PROFILE_TOKEN."""
+    if PROFILE_ALL:
+        return True
+    return bool(PROFILE_TOKEN) and headers.get("x-profile") == PROFILE_TOKEN
+
+
+class SamplingProfiler:
+    """Samples one thread's Python stack from a background thread and counts collapsed stacks."""
+
+    def __init__(self, thread_id: int, interval: float = PROFILE_INTERVAL) -> None:
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples: dict[str, int] = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def folded(self) -> str:
+        """One "frame;frame;... count" line per distinct stack, outermost frame first."""
+        return "".join(f"{stack} {count}\n" for stack, count in sorted(self.samples.items()))
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            frames = []
+            while frame is not None:
+                code = frame.f_code
+                filename = Path(code.co_filename).name
+                frames.append(f"{code.co_name} ({filename}:{code.co_firstlineno})")
+                frame = frame.f_back
+            stack = ";".join(reversed(frames))
+            self.samples[stack] = self.samples.get(stack, 0) + 1
+
+
+def profile_path(label: str) -> Path:
+    # Imported here: app.storage times its calls through app.metrics, which imports this module
+    from app.storage import DATA_DIR
+
+    directory = Path(PROFILE_DIR) if PROFILE_DIR else DATA_DIR / "profiles"
+    name = "".join(c if c.isalnum() or c in "-_" else "_" for c in label).strip("_")
+    return directory / f"{time.strftime('%Y%m%d-%H%M%S')}-{name}-{uuid.uuid4().hex[:6]}.folded"
+
+
+_profiler: ContextVar[SamplingProfiler | None] = ContextVar("profiler", default=None)
+
+
+@contextmanager
+def profiled(path: Path | None):
+    """Sample the current thread while the block runs and write the profile to `path` (None: off)."""
+    if path is None:
+        yield
+        return
+    profiler = SamplingProfiler(threading.get_ident())
+    token = _profiler.set(profiler)
+    profiler.start()
+    try:
+        yield
+    finally:
+        profiler.stop()
+        _profiler.reset(token)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(profiler.folded(), encoding="utf-8")
+
+
+def sampled_in_thread(func):
+    """Wrap a sync endpoint so a profiled request samples the threadpool thread running it."""
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        profiler = _profiler.get()
+        if profiler is None:
+            return func(*args, **kwargs)
+        # The event loop thread only awaits the threadpool meanwhile
+        caller, profiler.thread_id = profiler.thread_id, threading.get_ident()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            profiler.thread_id = caller
+
+    return wrapper
+
+
+class ProfiledRoute(APIRoute):
+    """APIRoute whose sync endpoints are profiled on the thread that runs them."""
+
+    def __init__(self, path: str, endpoint, **kwargs) -> None:
+        if not inspect.iscoroutinefunction(endpoint):
+            endpoint = sampled_in_thread(endpoint)
+        super().__init__(path, endpoint, **kwargs)
+
+
+class ServerTimingMiddleware:
+    """ASGI middleware: Server-Timing on every HTTP response, and opt-in profiling."""
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        timings = start_timings()
+        headers = {k.decode("latin-1"): v.decode("latin-1") for k, v in scope["headers"]}
+        path = None
+        if profile_requested(headers):
+            path = profile_path(f"{scope['method']}-{scope['path']}")
+
+        async def send_with_timing(message) -> None:
+            if message["type"] == "http.response.start":
+                extra = [(b"server-timing", timings.header().encode("latin-1"))]
+                if path is not None:
+                    extra.append((b"x-profile-file", path.name.encode("latin-1")))
+                message = {**message, "headers": [*message.get("headers", []), *extra]}
+            await send(message)
+
+        with profiled(path):
+            await self.app(scope, receive, send_with_timing)
@@ -1,31 +1,48 @@
+import gzip
 import os
+import re
 from datetime import datetime
 from pathlib import Path
 
-from tavily import TavilyClient
+from app import cassette
+from app.cache import TTLCache
+from app.clients import get_async_tavily_client, get_tavily_client
+from app.context import cache_bypassed
+from app.metrics import track_stage
+from app.resilience import tavily_upstream
+from app.storage import DATA_DIR
 
-from app.context import get_api_keys
+try:
+    import brotli  # optional: pip install "lexagent[brotli]"
+except ImportError:
+    brotli = None
 
 # Configurable via env for Railway (e.g. volume at /app/persist → LEXAGENT_REPORTS_DIR=/app/persist/reports)
 _DEFAULT_REPORTS = Path(__file__).parent.parent / "reports"
 REPORTS_DIR = Path(os.environ.get("LEXAGENT_REPORTS_DIR", str(_DEFAULT_REPORTS)))
 
+SEARCH_MAX_RESULTS = 5
 
-def search_web(query: str) -> dict:
+# Search result cache: memory LRU in front of DATA_DIR/cache/search. TTL 0 disables it.
+search_cache = TTLCache(
+    "search",
+    max_entries=int(os.environ.get("LEXAGENT_SEARCH_CACHE_SIZE", "512")),
+    ttl_seconds=float(os.environ.get("LEXAGENT_SEARCH_CACHE_TTL", "21600")),
+    disk_dir=DATA_DIR / "cache" / "search",
+)
+
+def search_cache_key(query: str, max_results: int = SEARCH_MAX_RESULTS) -> str:
     """
-    Search the web using Tavily and return raw results.
-    The agent layer is responsible for compressing these into
-    context notes — raw results are never stored in AgentState.
-    Uses TAVILY_API_KEY from env, or request-scoped override from context.
-    """
-    api_keys = get_api_keys()
-    tavily_key = api_keys.get("tavily") or os.environ.get("TAVILY_API_KEY", "")
-    client = TavilyClient(api_key=tavily_key)
-    response = client.search(
-        query=query,
-        max_results=5,
-        include_raw_content=False,
-    )
+    Normalize a query so trivially different spellings share a cache entry:
+    case-folded, punctuation dropped, whitespace collapsed. Every word is kept
+    in order, since "transfers from the EU to the US" is a different search
+    from "transfers to the EU from the US".
+    """
+    terms = re.findall(r"[\w§]+", query.casefold())
+    return f"{max_results}:{' '.join(terms)}"
+
+
+def _format_results(query: str, response: dict) -> dict:
     results = []
     for r in response.get("results", []):
         results.append({
@@ -39,9 +56,98 @@ def search_web(query: str) -> dict:
     }
 
 
+def _cached_results(query: str) -> dict | None:
+    if cache_bypassed():
+        return None
+    results = search_cache.get(search_cache_key(query))
+    if results is None:
+        return None
+    return {"query": query, "results": [dict(r) for r in results]}
+
+
+def _cassette_request(query: str) -> dict:
+    return {"query": query, "max_results": SEARCH_MAX_RESULTS}
+
+
+def search_web(query: str) -> dict:
+    """
+    Search the web using Tavily and return raw results.
+    The agent layer is responsible for compressing these into
+    context notes — raw results are never stored in AgentState.
+    Uses TAVILY_API_KEY from env, or request-scoped override from context,
+    through a pooled client (see app.clients), under the "search" stage's
+    deadline and retry policy (see app.resilience).
+    Results are served from search_cache when the normalized query was seen recently.
+    """
+    with track_stage("search"):
+        cached = _cached_results(query)
+        if cached is not None:
+            return cached
+
+        def search() -> dict:
+            client = get_tavily_client()
+            return tavily_upstream.call(
+                "search",
+                lambda timeout: client.search(
+                    query=query,
+                    max_results=SEARCH_MAX_RESULTS,
+                    include_raw_content=False,
+                    timeout=timeout,
+                ),
+            )
+
+        response = cassette.call("search", "search", _cassette_request(query), search)
+        formatted = _format_results(query, response)
+        if formatted["results"]:
+            search_cache.set(search_cache_key(query), formatted["results"])
+        return formatted
+
+
+async def search_web_async(query: str) -> dict:
+    """
+    Async variant of search_web() built on AsyncTavilyClient, so the
+    search round trip does not hold a threadpool worker.
+    """
+    with track_stage("search"):
+        cached = _cached_results(query)
+        if cached is not None:
+            return cached
+
+        async def search() -> dict:
+            client = get_async_tavily_client()
+            return await tavily_upstream.call_async(
+                "search",
+                lambda timeout: client.search(
+                    query=query,
+                    max_results=SEARCH_MAX_RESULTS,
+                    include_raw_content=False,
+                    timeout=timeout,
+                ),
+            )
+
+        response = await cassette.call_async("search", "search", _cassette_request(query), search)
+        formatted = _format_results(query, response)
+        if formatted["results"]:
+            search_cache.set(search_cache_key(query), formatted["results"])
+        return formatted
+
+
+# Precompressed copies stored next to each report: Content-Encoding -> file suffix
+REPORT_ENCODINGS = {"br": ".br", "gzip": ".gz"}
+
+
+def _write_atomic(path: Path, data: bytes) -> None:
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
+
 def save_report(session_id: str, goal: str, content: str) -> str:
     """
     Save a markdown report to /reports/{session_id}.md.
+    Also stores gzip (and, with the brotli package, brotli) copies so the
+    report endpoint never compresses on the fly; they are written after the
+    markdown, so a copy older than the .md is stale and ignored.
     Returns the file path as a string.
     """
     REPORTS_DIR.mkdir(parents=True, exist_ok=True)
@@ -49,6 +155,12 @@ def save_report(session_id: str, goal: str, content: str) -> str:
     path = REPORTS_DIR / filename
     timestamp = datetime.utcnow().strftime("%Y-%m-%d %H:%M UTC")
     full_content = f"# Legal Research Report\n\n**Goal:** {goal}\n\n**Generated:** {timestamp}\n\n---\n\n{content}"
-    with open(path, "w", encoding="utf-8") as f:
-        f.write(full_content)
+    data = full_content.encode("utf-8")
+    _write_atomic(path, data)
+    _write_atomic(path.with_name(filename + REPORT_ENCODINGS["gzip"]), gzip.compress(data, mtime=0))
+    if brotli is not None:
+        _write_atomic(
+            path.with_name(filename + REPORT_ENCODINGS["br"]),
+            brotli.compress(data, mode=brotli.MODE_TEXT),
+        )
     return str(path)
@@ -0,0 +1,95 @@
+"""
+Lazy Langfuse integration.
+Importing langfuse (and, through langfuse.openai, the OpenAI SDK) takes about
+a second, so app modules use these stand-ins instead of importing it at
+module level: observe() wraps a function with Langfuse's @observe on its
+first call, propagate_attributes() and get_langfuse() import on first use.
+warm_up() (started in the background by the API's lifespan, so it does not
+delay listening) does the imports and creates the default clients, so normally
+no request pays for them.
+"""
+
+import asyncio
+import functools
+import inspect
+import logging
+import threading
+
+from app.clients import import_sdks, warm_clients
+
+logger = logging.getLogger(__name__)
+
+_client_lock = threading.Lock()
+_client_loaded = False
+_client = None
+
+
+def get_langfuse():
+    """The Langfuse client, or None if it cannot be created (credentials missing, not installed)."""
+    global _client, _client_loaded
+    if _client_loaded:
+        return _client
+    with _client_lock:
+        if not _client_loaded:
+            try:
+                import_sdks()
+                from langfuse import get_client
+
+                _client = get_client()
+            except Exception:
+                # Langfuse is optional; the agent falls back to inline prompts
+                _client = None
+            _client_loaded = True
+    return _client
+
+
+def observe(**kwargs):
+    """Same arguments as langfuse.observe; the Langfuse decorator is applied on the first call."""
+
+    def decorate(fn):
+        wrapped = None
+
+        def resolve():
+            nonlocal wrapped
+            if wrapped is None:
+                import_sdks()
+                from langfuse import observe as langfuse_observe
+
+                wrapped = langfuse_observe(**kwargs)(fn)
+            return wrapped
+
+        if inspect.iscoroutinefunction(fn):
+
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kw):
+                if wrapped is None:
+                    # Import off the event loop: /health and other requests keep being served
+                    await asyncio.to_thread(import_sdks)
+                return await resolve()(*args, **kw)
+
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kw):
+            return resolve()(*args, **kw)
+
+        return wrapper
+
+    return decorate
+
+
+def propagate_attributes(**kwargs):
+    import_sdks()
+    from langfuse import propagate_attributes as langfuse_propagate_attributes
+
+    return langfuse_propagate_attributes(**kwargs)
+
+
+def warm_up() -> None:
+    """Import Langfuse and the SDKs, create the Langfuse and default API clients (blocking)."""
+    try:
+        import_sdks()
+        get_langfuse()
+        warm_clients()
+    except Exception:
+        logger.exception("Warm-up failed; SDKs will be imported by the first request instead")
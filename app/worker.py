@@ -0,0 +1,43 @@
+"""
+Standalone research worker: runs queued execution steps from the job database.
+Start the API with LEXAGENT_JOB_WORKERS=0 so it only enqueues, and scale these
+processes separately. Every process must see the same LEXAGENT_JOBS_DB and
+session storage.
+API keys sent as request headers are not stored in the queue: a step queued
+with them fails here instead of running with this process's environment keys
+(and the API rejects them when it has no in-process workers).
+
+Usage:
+    uv run python -m app.worker [--concurrency N]
+"""
+
+import argparse
+import asyncio
+
+from app.clients import close_clients
+from app.jobs import JOB_WORKERS, JobWorkerPool, job_store
+from app.main import prompt_registry, run_step_job
+from app.storage import close_sessions
+
+
+async def run(concurrency: int) -> None:
+    pool = JobWorkerPool(job_store, run_step_job, concurrency)
+    prompt_registry.start()
+    try:
+        await pool.run_forever()
+    finally:
+        await pool.stop()
+        prompt_registry.stop()
+        close_sessions()
+        await close_clients()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run queued LexAgent execution steps.")
+    parser.add_argument("--concurrency", type=int, default=max(JOB_WORKERS, 1))
+    args = parser.parse_args()
+    print(f"Running {args.concurrency} worker(s) on {job_store.db_path}")
+    try:
+        asyncio.run(run(args.concurrency))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,83 @@
+"""
+Micro-benchmark: prompt-injection scan, old per-call regex list vs the precompiled scanner.
+
+    python -m benchmarks.bench_security [--repeat N]
+
+Inputs are ~5 KB (the search-result content limit): realistic legal text and
+adversarial strings that made the old `.*?` / `on\\w+` patterns backtrack.
+"""
+
+import argparse
+import re
+import timeit
+from functools import partial
+
+from app.security import PromptInjectionError, sanitize_user_input
+
+_LEGACY_PATTERNS = [
+    r"(?i)(ignore|disregard|forget).*?(previous|prior|above|all).*?(instruction|prompt|message|rule)",
+    r"(?i)(system|admin).*?prompt",
+    r"(?i)(jailbreak|bypass|override|circumvent).*?(restriction|safeguard|filter|guideline)",
+    r"(?i)you\s+are\s+now\s+",
+    r"(?i)do\s+(anything|whatever)\s+now",
+    r"(?i)<\s*(script|iframe|embed|object)",
+    r"(?i)on\w+\s*=",
+    r"(?i)(;|&&|\|\|)\s*(curl|wget|exec|sh|bash)",
+]
+
+_LEGAL = (
+    "Under § 573 BGB the landlord may terminate a residential tenancy only where there is a "
+    "legitimate interest, in particular a culpable, not insignificant breach of contractual "
+    "obligations, personal need of the premises, or an obstacle to appropriate economic use. "
+    "The notice periods under § 573c BGB depend on the duration of the tenancy; the system of "
+    "graduated periods protects long-standing tenants. Courts have held that all information "
+    "relevant to the termination must be stated in the notice. "
+)
+
+INPUTS = {
+    "realistic, one line": (_LEGAL * 20)[:5000],
+    "realistic, paragraphs": ("\n".join([_LEGAL] * 20))[:5000],
+    "adversarial: system…": ("system " * 800)[:5000],
+    "adversarial: ignore all…": ("ignore " + "all " * 1250)[:5000],
+    "adversarial: ononon…": ("on" * 2500)[:5000],
+}
+
+
+def legacy_sanitize(text: str, max_length: int = 5000) -> str:
+    """The scanner as it was: patterns re-listed per call, re.search each, Python-level control count."""
+    if len(text) > max_length:
+        raise PromptInjectionError("too long")
+    for pattern in _LEGACY_PATTERNS:
+        if re.search(pattern, text):
+            raise PromptInjectionError(f"Pattern: {pattern}")
+    if sum(1 for c in text if ord(c) < 32 and c not in "\n\t\r") > 5:
+        raise PromptInjectionError("control characters")
+    return text
+
+
+def _scan(fn, text: str) -> None:
+    try:
+        fn(text, max_length=5000)
+    except PromptInjectionError:
+        pass
+
+
+def bench(fn, repeat: int) -> float:
+    """Best per-call time in microseconds."""
+    return min(timeit.repeat(fn, number=repeat, repeat=5)) / repeat * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'input':<26} {'legacy µs':>12} {'scanner µs':>12} {'speedup':>8}")
+    for name, text in INPUTS.items():
+        old = bench(partial(_scan, legacy_sanitize, text), args.repeat)
+        new = bench(partial(_scan, sanitize_user_input, text), args.repeat)
+        print(f"{name:<26} {old:>12.1f} {new:>12.1f} {old / new:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Micro-benchmark: AgentState persistence, old path vs app.serialization.
+
+    python -m benchmarks.bench_serialization [--repeat N]
+
+"legacy" is what JsonSessionStore used to do (json.dump(model_dump(), indent=2)
+and AgentState(**json.load(...))). Sizes cover a typical 6-task plan and the
+long tail (50 and 500 tasks).
+"""
+
+import argparse
+import json
+import timeit
+from functools import partial
+
+from app.models import AgentState, Task
+from app.serialization import dump_state, load_state
+
+
+def make_state(n_tasks: int) -> AgentState:
+    tasks = [
+        Task(
+            title=f"Research point {i}",
+            description=f"Analyse § {i} BGB and relevant case law. " * 3,
+            status="done",
+            tool_used="web_search",
+            result="Summary of findings with citations. " * 40,
+            reflection="Sufficient; moving on.",
+            sources=[f"https://example.com/source/{i}/{j}" for j in range(5)],
+        )
+        for i in range(n_tasks)
+    ]
+    return AgentState(
+        goal="Compare tenancy termination rules in Germany",
+        tasks=tasks,
+        context_notes=[t.result for t in tasks],
+        current_step=n_tasks,
+        mode="done",
+    )
+
+
+def legacy_dump(state: AgentState) -> bytes:
+    return json.dumps(state.model_dump(), indent=2).encode("utf-8")
+
+
+def legacy_load(data: bytes) -> AgentState:
+    return AgentState(**json.loads(data))
+
+
+def bench(fn, repeat: int) -> float:
+    """Best per-call time in microseconds."""
+    return min(timeit.repeat(fn, number=repeat, repeat=5)) / repeat * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"{'tasks':>5} {'path':<10} {'bytes':>9} {'dump µs':>10} {'load µs':>10}")
+    for n in (6, 50, 500):
+        state = make_state(n)
+        repeat = max(1, args.repeat // max(1, n // 10))
+        legacy = legacy_dump(state)
+        compact = dump_state(state)
+        rows = [
+            ("legacy", legacy, partial(legacy_dump, state), partial(legacy_load, legacy)),
+            ("compact", compact, partial(dump_state, state), partial(load_state, compact)),
+        ]
+        for name, data, dump, load in rows:
+            print(
+                f"{n:>5} {name:<10} {len(data):>9} "
+                f"{bench(dump, repeat):>10.1f} {bench(load, repeat):>10.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
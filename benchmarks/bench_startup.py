@@ -0,0 +1,186 @@
+"""
+Cold start benchmark: what a scale-to-zero instance pays before it is useful.
+
+    python -m benchmarks.bench_startup [--runs 5] [--save-baseline]
+
+- import: `import app.main` in a fresh interpreter (the SDKs are not imported
+  there any more; see app.tracing)
+- health: launching uvicorn until the first 200 from GET /health
+- first request: latency of the first POST /agent/start (planning, an LLM
+  call against benchmarks.fake_upstreams), sent --idle seconds after /health
+  first answered, with the background warm-up on (the default) and off
+  (LEXAGENT_WARMUP=0: the request imports the SDKs itself). With --idle 0 the
+  request races the warm-up, as when the platform holds the request that woke
+  the instance.
+
+Medians over --runs are compared with benchmarks/baselines/startup.json like
+benchmarks.load_test does (--tolerance, exit status 1 on a regression; the
+baseline is machine specific). Add -X importtime to see where import time goes:
+
+    python -X importtime -c "import app.main" 2>&1 | sort -t'|' -k2 -n | tail -20
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+import uvicorn
+
+from benchmarks.fake_upstreams import add_arguments, config_from_args, create_app
+from benchmarks.load_test import _free_port
+
+BASELINE_PATH = Path(__file__).parent / "baselines" / "startup.json"
+
+_IMPORT_SNIPPET = (
+    "import time; t = time.perf_counter(); import app.main; print(time.perf_counter() - t)"
+)
+
+
+def import_seconds() -> float:
+    out = subprocess.run(
+        [sys.executable, "-c", _IMPORT_SNIPPET], capture_output=True, text=True, check=True,
+        env={**os.environ, "LANGFUSE_TRACING_ENABLED": "false"},
+    )
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+async def _poll(client: httpx.AsyncClient, server: subprocess.Popen, request) -> None:
+    """Repeat request() until it returns a 2xx response."""
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"server exited with status {server.returncode}")
+        try:
+            if (await request()).is_success:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.005)
+    raise RuntimeError("server did not answer in time")
+
+
+async def launch_seconds(env: dict, idle: float) -> tuple[float, float]:
+    """Seconds from launching uvicorn to the first /health 200, and the first plan's latency."""
+    tmp = tempfile.mkdtemp(prefix="lexagent-startup-")
+    env = {
+        **os.environ,
+        "LEXAGENT_DATA_DIR": f"{tmp}/data",
+        "LEXAGENT_REPORTS_DIR": f"{tmp}/reports",
+        "LANGFUSE_TRACING_ENABLED": "false",
+        "LEXAGENT_PROMPT_REFRESH_INTERVAL": "0",
+        **env,
+    }
+    port = _free_port()
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1",
+         "--port", str(port), "--log-level", "warning", "--no-access-log"],
+        env=env,
+    )
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=60) as client:
+            await _poll(client, server, lambda: client.get("/health"))
+            health = time.perf_counter() - started
+            await asyncio.sleep(idle)
+            started = time.perf_counter()
+            await _poll(client, server, lambda: client.post(
+                "/agent/start", json={"goal": "Kündigungsfristen im deutschen Arbeitsrecht"},
+            ))
+            first = time.perf_counter() - started
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+    return health, first
+
+
+async def run(args: argparse.Namespace) -> dict:
+    imports = [import_seconds() for _ in range(args.runs)]
+
+    fake_port = _free_port()
+    fakes = uvicorn.Server(uvicorn.Config(
+        create_app(config_from_args(args)), host="127.0.0.1", port=fake_port,
+        log_level="warning", access_log=False,
+    ))
+    fakes_task = asyncio.create_task(fakes.serve())
+    env = {
+        "OPENAI_API_KEY": "sk-startup",
+        "TAVILY_API_KEY": "tvly-startup",
+        "OPENAI_BASE_URL": f"http://127.0.0.1:{fake_port}/v1",
+        "TAVILY_BASE_URL": f"http://127.0.0.1:{fake_port}",
+    }
+    launches: dict[str, list[tuple[float, float]]] = {"warmup": [], "no_warmup": []}
+    try:
+        while not fakes.started:
+            await asyncio.sleep(0.05)
+        for _ in range(args.runs):
+            for name, warmup in (("warmup", "1"), ("no_warmup", "0")):
+                launches[name].append(
+                    await launch_seconds({**env, "LEXAGENT_WARMUP": warmup}, args.idle)
+                )
+    finally:
+        fakes.should_exit = True
+        await fakes_task
+
+    def median_ms(values) -> float:
+        return round(statistics.median(values) * 1000, 1)
+
+    return {
+        "config": {"runs": args.runs, "idle": args.idle, "llm_latency_ms": args.llm_latency_ms},
+        "import_ms": median_ms(imports),
+        **{
+            name: {
+                "health_ms": median_ms([health for health, _ in runs]),
+                "first_request_ms": median_ms([first for _, first in runs]),
+            }
+            for name, runs in launches.items()
+        },
+    }
+
+
+def compare(result: dict, baseline: dict, tolerance: float) -> list[str]:
+    regressions = []
+    pairs = [("import_ms", result["import_ms"], baseline.get("import_ms"))]
+    for variant in ("warmup", "no_warmup"):
+        for key in ("health_ms", "first_request_ms"):
+            base = baseline.get(variant, {}).get(key)
+            pairs.append((f"{variant}.{key}", result[variant][key], base))
+    for name, value, base in pairs:
+        if base and value > base * (1 + tolerance):
+            regressions.append(f"{name}: {value} ms vs {base} ms baseline")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cold start benchmark.")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--idle", type=float, default=3.0,
+                        help="Seconds between /health answering and the first request")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true")
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    result = asyncio.run(run(args))
+    print(f"import app.main                 {result['import_ms']:>8.1f} ms")
+    for variant in ("warmup", "no_warmup"):
+        print(f"launch → /health 200 ({variant:<9}) {result[variant]['health_ms']:>8.1f} ms")
+        print(f"first plan request   ({variant:<9}) {result[variant]['first_request_ms']:>8.1f} ms")
+    if args.save_baseline:
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.baseline.write_text(json.dumps(result, indent=2) + "\n")
+        print(f"\nBaseline saved to {args.baseline}")
+    elif args.baseline.exists():
+        regressions = compare(result, json.loads(args.baseline.read_text()), args.tolerance)
+        for line in regressions:
+            print(f"  regression: {line}")
+        if regressions:
+            sys.exit(1)
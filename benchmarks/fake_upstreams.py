@@ -0,0 +1,192 @@
+"""
+Local stand-ins for the OpenAI chat completions API and Tavily search, for
+load tests that must not spend API money. Point the app at them with
+OPENAI_BASE_URL=http://127.0.0.1:PORT/v1 and TAVILY_BASE_URL=http://127.0.0.1:PORT.
+
+Responses have the shape the agent parses: JSON mode returns a plan
+({"tasks": [...]}) or a summary/reflection pair depending on the prompt, plain
+calls return `completion_words` words, streamed calls send them as SSE deltas
+followed by a usage chunk. Each request sleeps for a lognormal latency
+(median, sigma) first.
+
+    python -m benchmarks.fake_upstreams [--port 8100] [--llm-latency-ms 400] ...
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import random
+import time
+import uuid
+from dataclasses import dataclass
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+_WORDS = (
+    "the court held that a landlord must state every reason for termination in the notice "
+    "while the tenant may object under section 574 where hardship outweighs the interest "
+    "of the owner and the regulation applies to all processing of personal data by employers"
+).split()
+
+
+@dataclass
+class FakeConfig:
+    llm_latency_ms: float = 400.0
+    llm_sigma: float = 0.5
+    search_latency_ms: float = 600.0
+    search_sigma: float = 0.4
+    completion_words: int = 150
+    plan_tasks: int = 4
+    search_results: int = 5
+    result_chars: int = 1500
+    seed: int | None = None
+
+
+class _Latency:
+    """Lognormal delay with the given median; sigma 0 is a constant delay."""
+
+    def __init__(self, median_ms: float, sigma: float, rng: random.Random) -> None:
+        self.mu = math.log(max(median_ms, 0.001) / 1000)
+        self.sigma = sigma
+        self.rng = rng
+
+    async def wait(self) -> None:
+        await asyncio.sleep(self.rng.lognormvariate(self.mu, self.sigma))
+
+
+def _text(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(_WORDS) for _ in range(words))
+
+
+def _usage(messages: list[dict], content: str) -> dict:
+    # ~4 characters per token, close enough for throughput numbers
+    prompt = sum(len(m.get("content") or "") for m in messages) // 4
+    completion = len(content) // 4
+    return {"prompt_tokens": prompt, "completion_tokens": completion,
+            "total_tokens": prompt + completion}
+
+
+def create_app(config: FakeConfig) -> FastAPI:
+    rng = random.Random(config.seed)
+    llm_latency = _Latency(config.llm_latency_ms, config.llm_sigma, rng)
+    search_latency = _Latency(config.search_latency_ms, config.search_sigma, rng)
+    app = FastAPI(title="LexAgent fake upstreams")
+    app.state.counts = {"chat": 0, "search": 0}
+
+    def completion_content(body: dict) -> str:
+        messages = body.get("messages", [])
+        system = messages[0].get("content", "") if messages else ""
+        if (body.get("response_format") or {}).get("type") != "json_object":
+            # The query-refinement prompt asks for one short search query
+            words = 8 if "search query" in system else config.completion_words
+            return _text(rng, words)
+        if "reflection" in system:
+            return json.dumps({
+                "summary": _text(rng, config.completion_words),
+                "reflection": _text(rng, 20),
+            })
+        # Unique titles, so searches (and their caches) differ between sessions
+        nonce = uuid.uuid4().hex[:6]
+        return json.dumps({"tasks": [
+            {"title": f"Research point {i + 1} ({nonce})", "description": _text(rng, 25)}
+            for i in range(config.plan_tasks)
+        ]})
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        app.state.counts["chat"] += 1
+        await llm_latency.wait()
+        content = completion_content(body)
+        usage = _usage(body.get("messages", []), content)
+        base = {
+            "id": f"chatcmpl-{uuid.uuid4().hex[:12]}",
+            "created": int(time.time()),
+            "model": body.get("model", "gpt-4o-mini"),
+        }
+        if not body.get("stream"):
+            return JSONResponse({
+                **base,
+                "object": "chat.completion",
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": content},
+                    "finish_reason": "stop",
+                }],
+                "usage": usage,
+            })
+
+        async def events():
+            chunk = {**base, "object": "chat.completion.chunk"}
+            for word in content.split(" "):
+                delta = {"index": 0, "delta": {"content": word + " "}, "finish_reason": None}
+                yield f"data: {json.dumps({**chunk, 'choices': [delta]})}\n\n"
+            stop = {"index": 0, "delta": {}, "finish_reason": "stop"}
+            yield f"data: {json.dumps({**chunk, 'choices': [stop]})}\n\n"
+            if (body.get("stream_options") or {}).get("include_usage"):
+                yield f"data: {json.dumps({**chunk, 'choices': [], 'usage': usage})}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    @app.post("/search")
+    async def search(request: Request):
+        body = await request.json()
+        app.state.counts["search"] += 1
+        await search_latency.wait()
+        query = body.get("query", "")
+        count = min(int(body.get("max_results") or config.search_results), config.search_results)
+        results = [
+            {
+                "title": f"{query[:60]} — source {i + 1}",
+                "url": f"https://example.org/{uuid.uuid4().hex[:10]}",
+                "content": _text(rng, config.result_chars // 5)[: config.result_chars],
+                "score": round(1 - i / 10, 2),
+            }
+            for i in range(count)
+        ]
+        return {"query": query, "results": results, "response_time": 0.0}
+
+    return app
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    defaults = FakeConfig()
+    parser.add_argument("--llm-latency-ms", type=float, default=defaults.llm_latency_ms,
+                        help="Median chat completion latency")
+    parser.add_argument("--llm-sigma", type=float, default=defaults.llm_sigma,
+                        help="Lognormal sigma of the LLM latency (0 = constant)")
+    parser.add_argument("--search-latency-ms", type=float, default=defaults.search_latency_ms)
+    parser.add_argument("--search-sigma", type=float, default=defaults.search_sigma)
+    parser.add_argument("--completion-words", type=int, default=defaults.completion_words)
+    parser.add_argument("--plan-tasks", type=int, default=defaults.plan_tasks)
+    parser.add_argument("--search-results", type=int, default=defaults.search_results)
+    parser.add_argument("--result-chars", type=int, default=defaults.result_chars)
+    parser.add_argument("--seed", type=int, default=None)
+
+
+def config_from_args(args: argparse.Namespace) -> FakeConfig:
+    return FakeConfig(
+        llm_latency_ms=args.llm_latency_ms,
+        llm_sigma=args.llm_sigma,
+        search_latency_ms=args.search_latency_ms,
+        search_sigma=args.search_sigma,
+        completion_words=args.completion_words,
+        plan_tasks=args.plan_tasks,
+        search_results=args.search_results,
+        result_chars=args.result_chars,
+        seed=args.seed,
+    )
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--port", type=int, default=8100)
+    add_arguments(parser)
+    args = parser.parse_args()
+    uvicorn.run(create_app(config_from_args(args)), host="127.0.0.1", port=args.port,
+                log_level="warning")
@@ -0,0 +1,315 @@
+"""
+Offline load test: N concurrent research sessions against a real uvicorn
+process whose OpenAI and Tavily calls go to local stand-ins
+(benchmarks.fake_upstreams), so no API money is spent.
+
+    python -m benchmarks.load_test [--sessions 20] [--concurrency 10] [--save-baseline]
+
+Each session runs POST /agent/start, then POST /agent/{id}/execute and a
+long poll of GET /jobs/{id} until the report is done, then GET
+/agent/{id}/report. Reports req/s, p50/p95/p99 per endpoint (client side),
+p50/p95/p99 per stage (from the server's /metrics histograms, so bucket
+resolution) and the server's CPU time and peak RSS.
+
+Results are compared with benchmarks/baselines/load_test.json: a p95, req/s,
+CPU or RSS figure more than --tolerance worse than the baseline is flagged and
+the exit status is 1. Baselines are machine specific; re-record with
+--save-baseline on the machine that runs the comparison. The server inherits
+LEXAGENT_* variables from the environment, so configurations can be compared.
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import re
+import resource
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+import uvicorn
+
+from benchmarks.fake_upstreams import add_arguments, config_from_args, create_app
+
+BASELINE_PATH = Path(__file__).parent / "baselines" / "load_test.json"
+_GOAL = "What notice periods apply when a landlord terminates a residential tenancy? (case {})"
+_BUCKET = re.compile(r'lexagent_stage_duration_seconds_bucket\{stage="([^"]+)",le="([^"]+)"\} (\S+)')
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def percentile(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[max(math.ceil(q * len(ordered)) - 1, 0)]
+
+
+def summarize(values: list[float]) -> dict:
+    return {
+        "count": len(values),
+        "p50_ms": round(percentile(values, 0.50) * 1000, 1),
+        "p95_ms": round(percentile(values, 0.95) * 1000, 1),
+        "p99_ms": round(percentile(values, 0.99) * 1000, 1),
+    }
+
+
+def histogram_quantile(buckets: list[tuple[float, float]], q: float) -> float:
+    """Prometheus-style quantile from cumulative (le, count) buckets, interpolated linearly."""
+    total = buckets[-1][1]
+    rank = q * total
+    lower, below = 0.0, 0.0
+    for bound, count in buckets:
+        if count >= rank:
+            if math.isinf(bound):
+                return lower
+            return lower + (bound - lower) * (rank - below) / max(count - below, 1e-9)
+        lower, below = bound, count
+    return lower
+
+
+def stage_percentiles(metrics_text: str) -> dict:
+    buckets: dict[str, list[tuple[float, float]]] = {}
+    for stage, le, count in _BUCKET.findall(metrics_text):
+        buckets.setdefault(stage, []).append((float(le), float(count)))
+    return {
+        stage: {
+            "count": int(rows[-1][1]),
+            **{
+                f"p{int(q * 100)}_ms": round(histogram_quantile(rows, q) * 1000, 1)
+                for q in (0.50, 0.95, 0.99)
+            },
+        }
+        for stage, rows in sorted(buckets.items())
+        if rows[-1][1]
+    }
+
+
+class Recorder:
+    def __init__(self) -> None:
+        self.latencies: dict[str, list[float]] = {}
+        self.requests = 0
+        self.errors: dict[str, int] = {}
+
+    async def request(self, client: httpx.AsyncClient, name: str, method: str, url: str, **kw):
+        start = time.perf_counter()
+        response = await client.request(method, url, **kw)
+        self.requests += 1
+        if name:
+            self.latencies.setdefault(name, []).append(time.perf_counter() - start)
+        if response.status_code >= 400:
+            self.errors[name or url] = self.errors.get(name or url, 0) + 1
+            response.raise_for_status()
+        return response
+
+
+async def run_session(client: httpx.AsyncClient, rec: Recorder, goal: str) -> None:
+    r = await rec.request(client, "POST /agent/start", "POST", "/agent/start", json={"goal": goal})
+    session_id = r.json()["session_id"]
+    while True:
+        step_start = time.perf_counter()
+        r = await rec.request(
+            client, "POST /agent/{id}/execute", "POST", f"/agent/{session_id}/execute",
+        )
+        job = r.json()
+        while job["status"] in ("queued", "running"):
+            r = await rec.request(client, "", "GET", f"/jobs/{job['job_id']}", params={"wait": 30})
+            job = r.json()
+        rec.latencies.setdefault("step (execute → job done)", []).append(
+            time.perf_counter() - step_start
+        )
+        if job["status"] != "succeeded":
+            rec.errors["step"] = rec.errors.get("step", 0) + 1
+            return
+        if job["result"]["is_done"]:
+            break
+    await rec.request(client, "GET /agent/{id}/report", "GET", f"/agent/{session_id}/report")
+
+
+async def drive(base_url: str, goals: list[str], concurrency: int) -> tuple[Recorder, float, str]:
+    rec = Recorder()
+    limit = asyncio.Semaphore(concurrency)
+    timeout = httpx.Timeout(60.0)
+    limits = httpx.Limits(max_connections=concurrency * 2)
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limits) as client:
+
+        async def one(goal: str) -> None:
+            async with limit:
+                try:
+                    await run_session(client, rec, goal)
+                except httpx.HTTPError as e:
+                    rec.errors[type(e).__name__] = rec.errors.get(type(e).__name__, 0) + 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one(goal) for goal in goals))
+        wall = time.perf_counter() - start
+        metrics_text = (await client.get("/metrics")).text
+    return rec, wall, metrics_text
+
+
+async def wait_ready(base_url: str, server: subprocess.Popen, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        while time.monotonic() < deadline:
+            if server.poll() is not None:
+                raise RuntimeError(f"server exited with status {server.returncode}")
+            try:
+                if (await client.get("/health")).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError("server did not become ready")
+
+
+async def run_app(env: dict, goals: list[str], concurrency: int) -> dict:
+    """
+    Start the app under uvicorn with `env` on top of os.environ (and temporary
+    data/report dirs), drive the sessions and stop it. Returns the measurements.
+    """
+    tmp = tempfile.mkdtemp(prefix="lexagent-load-")
+    env = {
+        **os.environ,
+        "LEXAGENT_DATA_DIR": f"{tmp}/data",
+        "LEXAGENT_REPORTS_DIR": f"{tmp}/reports",
+        # No traces or prompt fetches: they would go to a real Langfuse project (or time out)
+        "LANGFUSE_TRACING_ENABLED": "false",
+        "LEXAGENT_PROMPT_REFRESH_INTERVAL": "0",
+        **env,
+    }
+    port = _free_port()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1",
+         "--port", str(port), "--log-level", "warning", "--no-access-log"],
+        env=env,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        await wait_ready(base_url, server)
+        rec, wall, metrics_text = await drive(base_url, goals, concurrency)
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+    # Resource usage of waited-for children; ru_maxrss is KiB on Linux, bytes on macOS
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    peak_rss_mb = usage.ru_maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024)
+    return {
+        "wall_seconds": round(wall, 2),
+        "requests_per_second": round(rec.requests / wall, 2),
+        "sessions_per_minute": round(len(goals) / wall * 60, 2),
+        "cpu_seconds": round(usage.ru_utime + usage.ru_stime, 2),
+        "peak_rss_mb": round(peak_rss_mb, 1),
+        "errors": rec.errors,
+        "endpoints": {name: summarize(v) for name, v in sorted(rec.latencies.items())},
+        "stages": stage_percentiles(metrics_text),
+    }
+
+
+async def run(args: argparse.Namespace) -> dict:
+    fake_port = _free_port()
+    fakes = uvicorn.Server(uvicorn.Config(
+        create_app(config_from_args(args)), host="127.0.0.1", port=fake_port,
+        log_level="warning", access_log=False,
+    ))
+    fakes_task = asyncio.create_task(fakes.serve())
+    env = {
+        "OPENAI_API_KEY": "sk-load-test",
+        "TAVILY_API_KEY": "tvly-load-test",
+        "OPENAI_BASE_URL": f"http://127.0.0.1:{fake_port}/v1",
+        "TAVILY_BASE_URL": f"http://127.0.0.1:{fake_port}",
+    }
+    goals = [_GOAL.format(i) for i in range(args.sessions)]
+    try:
+        measured = await run_app(env, goals, args.concurrency)
+    finally:
+        fakes.should_exit = True
+        await fakes_task
+    return {
+        "config": {
+            "sessions": args.sessions,
+            "concurrency": args.concurrency,
+            "llm_latency_ms": args.llm_latency_ms,
+            "search_latency_ms": args.search_latency_ms,
+            "plan_tasks": args.plan_tasks,
+        },
+        **measured,
+    }
+
+
+def compare(result: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Figures more than `tolerance` (fraction) worse than the baseline."""
+    regressions = []
+    if baseline.get("config") != result["config"]:
+        print("Note: baseline was recorded with a different configuration", baseline.get("config"))
+
+    def check(name: str, current: float, previous: float, higher_is_better: bool = False) -> None:
+        if not previous:
+            return
+        change = (previous - current) / previous if higher_is_better else (current - previous) / previous
+        if change > tolerance:
+            regressions.append(f"{name}: {previous} -> {current} ({change:+.0%} worse)")
+
+    check("requests_per_second", result["requests_per_second"],
+          baseline.get("requests_per_second", 0), higher_is_better=True)
+    check("peak_rss_mb", result["peak_rss_mb"], baseline.get("peak_rss_mb", 0))
+    check("cpu_seconds", result["cpu_seconds"], baseline.get("cpu_seconds", 0))
+    for section in ("endpoints", "stages"):
+        for name, stats in result[section].items():
+            previous = baseline.get(section, {}).get(name)
+            if previous:
+                check(f"{section}.{name}.p95_ms", stats["p95_ms"], previous["p95_ms"])
+    return regressions
+
+
+def print_report(result: dict) -> None:
+    print(f"\n{result['config']['sessions']} sessions, concurrency "
+          f"{result['config']['concurrency']}: {result['wall_seconds']}s")
+    print(f"  {result['requests_per_second']} req/s, {result['sessions_per_minute']} sessions/min, "
+          f"server CPU {result['cpu_seconds']}s, peak RSS {result['peak_rss_mb']} MB")
+    if result["errors"]:
+        print(f"  errors: {result['errors']}")
+    for section in ("endpoints", "stages"):
+        print(f"\n{section:<34} {'count':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+        for name, s in result[section].items():
+            print(f"  {name:<32} {s['count']:>6} {s['p50_ms']:>9} {s['p95_ms']:>9} {s['p99_ms']:>9}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline load test against local fake upstreams.")
+    parser.add_argument("--sessions", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="Fraction a figure may be worse than the baseline (default 0.25)")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--json", type=Path, help="Also write the results to this file")
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    result = asyncio.run(run(args))
+    print_report(result)
+    if args.json:
+        args.json.write_text(json.dumps(result, indent=2) + "\n")
+    if args.save_baseline:
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.baseline.write_text(json.dumps(result, indent=2) + "\n")
+        print(f"\nBaseline saved to {args.baseline}")
+    elif args.baseline.exists():
+        regressions = compare(result, json.loads(args.baseline.read_text()), args.tolerance)
+        if regressions:
+            print("\nRegressions against the baseline:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print("\nNo regressions against the baseline.")
+    if result["errors"]:
+        sys.exit(1)
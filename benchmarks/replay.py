@@ -0,0 +1,90 @@
+"""
+Replay recorded sessions against the current build, offline.
+
+Record on a deployment (or locally) with LEXAGENT_CASSETTE_MODE=record: each
+session's OpenAI and Tavily calls land in LEXAGENT_CASSETTE_DIR/{session}.jsonl.gz
+(see app.cassette). Then:
+
+    python -m benchmarks.replay path/to/cassettes [--latency-scale 1] [--concurrency 10]
+
+re-runs every recorded goal (start → execute loop → report) through a
+uvicorn process in replay mode, which answers upstream calls from the
+cassettes after the recorded (scaled) latency, and prints the same figures as
+benchmarks.load_test: req/s, endpoint and stage percentiles, CPU time and peak
+RSS. With --baseline, results are compared like load_test's (a replay
+baseline is specific to the cassette set and machine).
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+from pathlib import Path
+
+from app.cassette import read_cassette
+from benchmarks.load_test import compare, print_report, run_app
+
+
+def recorded_goals(directory: Path) -> list[str]:
+    """Goal of every recorded session, in file name order."""
+    goals = []
+    for path in sorted(directory.glob("*.jsonl.gz")):
+        for entry in read_cassette(path):
+            if entry["kind"] == "session":
+                goals.append(entry["goal"])
+                break
+    return goals
+
+
+async def replay(args: argparse.Namespace) -> dict:
+    goals = recorded_goals(args.cassettes)
+    if args.sessions:
+        goals = goals[: args.sessions]
+    if not goals:
+        raise SystemExit(f"No recorded sessions in {args.cassettes}")
+    env = {
+        "LEXAGENT_CASSETTE_MODE": "replay",
+        "LEXAGENT_CASSETTE_DIR": str(args.cassettes.resolve()),
+        "LEXAGENT_CASSETTE_LATENCY_SCALE": str(args.latency_scale),
+        # Never used in replay mode, but the clients refuse to start without them
+        "OPENAI_API_KEY": "sk-replay",
+        "TAVILY_API_KEY": "tvly-replay",
+    }
+    measured = await run_app(env, goals, args.concurrency)
+    return {
+        "config": {
+            "sessions": len(goals),
+            "concurrency": args.concurrency,
+            "cassettes": str(args.cassettes),
+            "latency_scale": args.latency_scale,
+        },
+        **measured,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay recorded sessions offline.")
+    parser.add_argument("cassettes", type=Path, help="LEXAGENT_CASSETTE_DIR of the recording")
+    parser.add_argument("--latency-scale", type=float, default=1.0,
+                        help="Multiplier for recorded upstream latency (0 = no delay)")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--sessions", type=int, default=0, help="Replay only the first N sessions")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    parser.add_argument("--baseline", type=Path, help="Compare with (or, with --save-baseline, write) this file")
+    parser.add_argument("--save-baseline", action="store_true")
+    args = parser.parse_args()
+
+    result = asyncio.run(replay(args))
+    print_report(result)
+    if args.baseline and args.save_baseline:
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.baseline.write_text(json.dumps(result, indent=2) + "\n")
+        print(f"\nBaseline saved to {args.baseline}")
+    elif args.baseline:
+        regressions = compare(result, json.loads(args.baseline.read_text()), args.tolerance)
+        for line in regressions:
+            print(f"  regression: {line}")
+        if regressions:
+            sys.exit(1)
+    if result["errors"]:
+        sys.exit(1)
@@ -1,4 +1,4 @@
-import { AgentState, APIKeys, ExecuteResponse, GoalRequest, Session } from '../types';
+import { AgentState, APIKeys, ExecuteResponse, GoalRequest, Job, Session, SessionPage } from '../types';
 
 export type { APIKeys } from '../types';
 
@@ -13,11 +13,20 @@ function headersWithApiKeys(apiKeys?: APIKeys | null): Record<string, string> {
 
 export async function fetchSessions(): Promise<Session[]> {
   try {
-    const response = await fetch(`${API_URL}/sessions`);
-    if (!response.ok) {
-      throw new Error(`Failed to fetch sessions: ${response.statusText}`);
-    }
-    return await response.json();
+    // GET /sessions is paged: follow next_cursor until the last page
+    const sessions: Session[] = [];
+    let cursor: string | null = null;
+    do {
+      const query: string = cursor ? `&cursor=${encodeURIComponent(cursor)}` : '';
+      const response = await fetch(`${API_URL}/sessions?limit=200${query}`);
+      if (!response.ok) {
+        throw new Error(`Failed to fetch sessions: ${response.statusText}`);
+      }
+      const page: SessionPage = await response.json();
+      sessions.push(...page.items);
+      cursor = page.next_cursor;
+    } while (cursor);
+    return sessions;
   } catch (error) {
     console.error('Error fetching sessions:', error);
     return [];
@@ -81,33 +90,56 @@ export async function startSession(
   }
 }
 
+async function errorDetail(response: Response): Promise<string> {
+  try {
+    const json = await response.json();
+    return json.detail ?? '';
+  } catch {
+    return await response.text();
+  }
+}
+
+/**
+ * Queue the next step (202 + job) and long-poll GET /jobs/{id} until it finishes,
+ * so no single request stays open for the whole search + LLM pipeline.
+ */
 export async function executeStep(
   sessionId: string,
   apiKeys?: APIKeys | null
 ): Promise<ExecuteResponse> {
   try {
-    const headers = headersWithApiKeys(apiKeys);
-    const controller = new AbortController();
-    const timeoutId = setTimeout(() => controller.abort(), 180_000); // 3 min per task
-    const response = await fetch(`${API_URL}/agent/${sessionId}/execute`, {
-      method: 'POST',
-      ...(Object.keys(headers).length ? { headers } : {}),
-      signal: controller.signal,
-    });
-    clearTimeout(timeoutId);
-
+    // Same key on the retry: the server returns the job it already queued instead of a second step
+    const headers = { ...headersWithApiKeys(apiKeys), 'Idempotency-Key': crypto.randomUUID() };
+    const post = () =>
+      fetch(`${API_URL}/agent/${sessionId}/execute`, { method: 'POST', headers });
+    let response: Response;
+    try {
+      response = await post();
+    } catch {
+      response = await post();
+    }
     if (!response.ok) {
-      let detail = '';
-      try {
-        const json = await response.json();
-        detail = json.detail ?? '';
-      } catch {
-        detail = await response.text();
-      }
+      const detail = await errorDetail(response);
       throw new Error(detail || `Failed to execute step: ${response.status}`);
     }
 
-    return await response.json();
+    let job: Job = await response.json();
+    const deadline = Date.now() + 600_000; // 10 min per step
+    while (job.status === 'queued' || job.status === 'running') {
+      if (Date.now() > deadline) {
+        throw new Error('Step is still running. Refresh the session to see its progress.');
+      }
+      const poll = await fetch(`${API_URL}/jobs/${job.job_id}?wait=25`);
+      if (!poll.ok) {
+        const detail = await errorDetail(poll);
+        throw new Error(detail || `Failed to fetch step status: ${poll.status}`);
+      }
+      job = await poll.json();
+    }
+    if (job.status === 'failed' || !job.result) {
+      throw new Error(job.error || `Step failed: ${job.status_code ?? 500}`);
+    }
+    return job.result;
   } catch (error) {
     console.error('Error executing step:', error);
     if (error instanceof Error && error.message === 'Failed to fetch') {
@@ -115,9 +147,6 @@ export async function executeStep(
         `Cannot connect to the LexAgent API. Ensure the backend is running at ${API_URL}.`
       );
     }
-    if (error instanceof Error && error.name === 'AbortError') {
-      throw new Error('Request timed out. Each task can take 1–2 minutes. Try again.');
-    }
     throw error;
   }
 }
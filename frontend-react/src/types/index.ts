@@ -24,14 +24,30 @@ export interface AgentState {
   goal: string;
   tasks: Task[];
   context_notes: string[];
+  context_summary?: string | null;
+  summarized_notes?: number;
   current_step: number;
   is_active: boolean;
   mode: AgentMode;
   final_report_path: string | null;
   created_at: string;
+  version?: number;
 }
 
-export type Session = AgentState;
+/** Lightweight session projection returned by GET /sessions. */
+export interface Session {
+  session_id: string;
+  goal: string;
+  mode: AgentMode;
+  current_step: number;
+  is_active: boolean;
+  created_at: string;
+}
+
+export interface SessionPage {
+  items: Session[];
+  next_cursor: string | null;
+}
 
 export interface GoalRequest {
   goal: string;
@@ -45,6 +61,28 @@ export interface ExecuteResponse {
   message: string;
 }
 
+export type JobStatus = 'queued' | 'running' | 'succeeded' | 'failed';
+
+/** Queued execution step returned (202) by POST /agent/{id}/execute. */
+export interface Job {
+  job_id: string;
+  session_id: string;
+  status: JobStatus;
+  attempts: number;
+  no_cache: boolean;
+  profile: boolean;
+  /** Queued with X-OpenAI-API-Key / X-Tavily-API-Key (only the queuing API process can run it) */
+  request_keys: boolean;
+  result: ExecuteResponse | null;
+  error: string | null;
+  status_code: number | null;
+  /** Milliseconds per stage (refine-query, search, ...) of the last attempt */
+  timings: Record<string, number> | null;
+  created_at: string;
+  started_at: string | null;
+  finished_at: string | null;
+}
+
 export interface APIError {
   message: string;
   code?: string;